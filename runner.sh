@@ -54,6 +54,11 @@ get_github_url() {
     fi
 }
 
+# Read a single KEY=value from .env (empty if unset)
+get_env_value() {
+    grep "^$1=" "$PROJECT_ROOT/.env" 2>/dev/null | cut -d'=' -f2
+}
+
 # Get docker compose command with appropriate config files
 get_compose_cmd() {
     # Check if COMPOSE_FILE is already set (user override)
@@ -62,10 +67,12 @@ get_compose_cmd() {
         return
     fi
 
-    # Check if GitHub App auth is configured
+    local overrides=""
+
     if [ -f "$PROJECT_ROOT/.env" ]; then
-        local app_id=$(grep "^APP_ID=" "$PROJECT_ROOT/.env" 2>/dev/null | cut -d'=' -f2)
-        local pem_file=$(grep "^APP_PRIVATE_KEY_FILE=" "$PROJECT_ROOT/.env" 2>/dev/null | cut -d'=' -f2)
+        # Check if GitHub App auth is configured
+        local app_id=$(get_env_value APP_ID)
+        local pem_file=$(get_env_value APP_PRIVATE_KEY_FILE)
 
         # If APP_ID is set and PEM file exists, use app-auth override
         if [ -n "$app_id" ] && [ -n "$pem_file" ]; then
@@ -74,13 +81,43 @@ get_compose_cmd() {
             [[ "$pem_file" == ./* ]] && pem_path="$PROJECT_ROOT/${pem_file:2}"
 
             if [ -f "$pem_path" ]; then
-                echo "docker compose -f docker-compose.yml -f docker-compose.app-auth.yml"
-                return
+                overrides="$overrides -f docker-compose.app-auth.yml"
             else
                 echo -e "${YELLOW}Warning: APP_ID set but PEM file not found: $pem_file${NC}" >&2
                 echo -e "${YELLOW}Falling back to ACCESS_TOKEN authentication${NC}" >&2
             fi
         fi
+
+        # Shared tool-cache with single-writer broker
+        if [ "$(get_env_value TOOL_CACHE_BROKER)" = "true" ]; then
+            overrides="$overrides -f docker-compose.tool-cache.yml"
+        fi
+
+        # JIT runner config broker (agents skip self-registration)
+        if [ "$(get_env_value JIT_BROKER)" = "true" ]; then
+            overrides="$overrides -f docker-compose.jit-broker.yml"
+        fi
+
+        # Registry pull-through mirror + image pre-warmer
+        if [ "$(get_env_value IMAGE_CACHE)" = "true" ]; then
+            overrides="$overrides -f docker-compose.image-cache.yml"
+        fi
+
+        # Per-job DinD resource telemetry (after tool-cache: its hooks chain)
+        if [ "$(get_env_value DIND_TELEMETRY)" = "true" ]; then
+            overrides="$overrides -f docker-compose.dind-telemetry.yml"
+        fi
+
+        # Several DinD daemons with a placement controller (after jit-broker:
+        # its agent entrypoint chains to the broker's)
+        if [ "$(get_env_value MULTI_DIND)" = "true" ]; then
+            overrides="$overrides -f docker-compose.multi-dind.yml"
+        fi
+    fi
+
+    if [ -n "$overrides" ]; then
+        echo "docker compose -f docker-compose.yml$overrides"
+        return
     fi
 
     # Default: just docker compose
@@ -139,10 +176,15 @@ cmd_stop() {
 cmd_status() {
     local compose_cmd=$(get_compose_cmd)
 
-    print_header "Status"
-
     cd "$PROJECT_ROOT"
 
+    if [ "${1:-}" = "--json" ]; then
+        $compose_cmd run --rm --no-deps fleet-status --status --json
+        return $?
+    fi
+
+    print_header "Status"
+
     if ! $compose_cmd ps --quiet 2>/dev/null | grep -q .; then
         echo -e "${YELLOW}No containers running.${NC}"
         echo ""
@@ -162,6 +204,10 @@ cmd_status() {
     echo "  Runner Count:   $runner_count"
     echo ""
 
+    echo -e "${BLUE}Fleet (GitHub + Docker):${NC}"
+    $compose_cmd run --rm --no-deps fleet-status 2>/dev/null || echo "  Unable to query GitHub"
+    echo ""
+
     echo -e "${BLUE}Resource Usage:${NC}"
     docker stats --no-stream --format "  {{.Name}}: CPU {{.CPUPerc}}, Mem {{.MemUsage}}" $($compose_cmd ps -q 2>/dev/null) 2>/dev/null || echo "  Unable to get stats"
     echo ""
@@ -432,6 +478,74 @@ cmd_cleanup_runners() {
     $compose_cmd run --rm --no-deps cleanup-manager --now "$@"
 }
 
+cmd_dind_gc() {
+    print_header "DinD Cache Eviction"
+    check_env
+
+    local compose_cmd=$(get_compose_cmd)
+    cd "$PROJECT_ROOT"
+
+    # One LRU check against the running DinD daemon: evicts only when
+    # DinD's images + build cache are above DIND_GC_HIGH_WATERMARK of
+    # DIND_GC_CAPACITY_GB. The warm cache below that watermark is kept
+    # (unlike `cleanup --full`).
+    echo -e "${BLUE}Running one-off DinD cache check via dind-cache-manager...${NC}"
+    $compose_cmd run --rm --no-deps dind-cache-manager --dind-gc --once
+}
+
+cmd_cleanup_report() {
+    print_header "Cleanup Pass History"
+    check_env
+
+    local compose_cmd=$(get_compose_cmd)
+    cd "$PROJECT_ROOT"
+
+    # Reads the pass ledger on the cleanup-state volume; no GitHub calls.
+    $compose_cmd run --rm --no-deps cleanup-manager --report "${1:-20}"
+}
+
+cmd_simulate_pacing() {
+    print_header "Cleanup Pacing Simulator"
+    check_env
+
+    local compose_cmd=$(get_compose_cmd)
+    cd "$PROJECT_ROOT"
+
+    # Virtual time, simulated GitHub: no API calls, no quota spent.
+    # Options: --days D --every H --policies plan,even
+    #          --leaks-per-hour N --others-per-hour N
+    $compose_cmd run --rm --no-deps cleanup-manager --simulate-pacing "$@"
+}
+
+cmd_utilization() {
+    print_header "Runner Utilization"
+    check_env
+
+    local compose_cmd=$(get_compose_cmd)
+    cd "$PROJECT_ROOT"
+
+    # Reads the samples of the runner-utilization service (profile
+    # utilization) on the cleanup-state volume; no GitHub calls.
+    $compose_cmd run --rm --no-deps cleanup-manager --utilization-report --days "${1:-7}"
+}
+
+cmd_bench_agents() {
+    print_header "Agent Startup Benchmark"
+    check_env
+
+    local compose_cmd=$(get_compose_cmd)
+    cd "$PROJECT_ROOT"
+
+    # No options: observe the running agents for an hour.
+    # --burst N [--rounds R]: start N extra agents at once, R times.
+    # --report: print the recorded percentiles only.
+    if [ "${1:-}" = "--report" ]; then
+        $compose_cmd run --rm --no-deps agent-bench --agent-bench-report
+        return
+    fi
+    $compose_cmd run --rm --no-deps agent-bench --agent-bench "$@"
+}
+
 cmd_help() {
     echo -e "${BLUE}"
     echo "============================================================================="
@@ -443,7 +557,7 @@ cmd_help() {
     echo -e "${CYAN}Operations:${NC}"
     echo "  start [N]         Start N runners (default: 1)"
     echo "  stop              Stop all runners"
-    echo "  status            Show status and resources"
+    echo "  status [--json]   Show status, GitHub registrations and resources"
     echo "  scale N           Scale to N runners"
     echo "  logs [service]    Show logs (agent, docker-in-docker)"
     echo ""
@@ -452,6 +566,11 @@ cmd_help() {
     echo "  cleanup --full                Full cleanup (volumes + images, scoped)"
     echo "  cleanup-runners [opts]        Mass-delete offline runners from GitHub"
     echo "  cleanup-runners --dry-run     Preview which runners would be deleted"
+    echo "  cleanup-report [N]            Trends/regressions over the last N cleanup passes"
+    echo "  simulate-pacing [opts]        Compare cleanup pacing policies in virtual time"
+    echo "  dind-gc                       LRU-evict DinD images/cache above watermark"
+    echo "  bench-agents [opts]           Agent start->online latency (--burst N, --report)"
+    echo "  utilization [DAYS]            Busy/online percentiles, heatmap, scale/DinD sizing"
     echo "  deploy                        Pull updates, set permissions"
     echo "  deploy --init                 Initial deployment with setup"
     echo ""
@@ -485,7 +604,8 @@ case "${1:-help}" in
         cmd_stop
         ;;
     status)
-        cmd_status
+        shift
+        cmd_status "$@"
         ;;
     scale)
         shift
@@ -499,6 +619,25 @@ case "${1:-help}" in
         shift
         cmd_cleanup_runners "$@"
         ;;
+    cleanup-report)
+        shift
+        cmd_cleanup_report "$@"
+        ;;
+    simulate-pacing)
+        shift
+        cmd_simulate_pacing "$@"
+        ;;
+    dind-gc)
+        cmd_dind_gc
+        ;;
+    utilization)
+        shift
+        cmd_utilization "$@"
+        ;;
+    bench-agents)
+        shift
+        cmd_bench_agents "$@"
+        ;;
     deploy)
         shift
         cmd_deploy "$@"
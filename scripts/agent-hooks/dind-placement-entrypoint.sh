@@ -0,0 +1,37 @@
+#!/bin/bash
+# =============================================================================
+# GitHub Runner - Agent Entrypoint: Pick a DinD Shard
+# =============================================================================
+# Replaces the image entrypoint when docker-compose.multi-dind.yml is
+# active. Asks the dind-placement controller for the least-loaded healthy
+# DinD daemon and exports it as DOCKER_HOST for this agent's job. If the
+# controller is unreachable the default DOCKER_HOST (docker-in-docker)
+# stays. Hands over to the JIT broker entrypoint when that override is
+# active too, otherwise to the image's normal entrypoint.
+# =============================================================================
+
+CONTROLLER="${DIND_PLACEMENT_URL:-http://dind-placement:8782}"
+
+# docker-compose.app-auth.yml normally exports the PEM in its own
+# entrypoint override, which this one replaces.
+if [ -z "${APP_PRIVATE_KEY:-}" ] && [ -r /opt/github-app.pem ]; then
+    APP_PRIVATE_KEY="$(cat /opt/github-app.pem)"
+    export APP_PRIVATE_KEY
+fi
+
+answer=$(curl -sf --max-time 10 -X POST -H 'Content-Type: application/json' \
+    -d "{\"client\": \"$(hostname)\"}" \
+    "$CONTROLLER/assign") || answer=""
+host=$(printf '%s' "$answer" | jq -r '.docker_host // empty' 2>/dev/null)
+
+if [ -n "$host" ]; then
+    echo "dind-placement: using $host"
+    export DOCKER_HOST="$host"
+else
+    echo "dind-placement: controller unavailable, staying on $DOCKER_HOST"
+fi
+
+if [ -n "${JIT_BROKER_SOCKET:-}" ] && [ -x /opt/agent-hooks/jit-entrypoint.sh ]; then
+    exec /opt/agent-hooks/jit-entrypoint.sh "$@"
+fi
+exec /entrypoint.sh "$@"
@@ -0,0 +1,56 @@
+#!/bin/bash
+# =============================================================================
+# GitHub Runner - Agent Entrypoint: Lease Registration From JIT Broker
+# =============================================================================
+# Replaces the image entrypoint when docker-compose.jit-broker.yml is
+# active. Asks the jit-broker (unix socket on a shared volume) for a
+# pre-generated registration:
+#   jit   -> start the listener with the JIT config, skipping config.sh
+#   token -> run the normal entrypoint with RUNNER_TOKEN (no own token call)
+# Any failure (broker down, socket missing, empty pool and GitHub
+# unreachable) falls back to the image's normal self-registration.
+# =============================================================================
+
+SOCK="${JIT_BROKER_SOCKET:-/run/jit-broker/broker.sock}"
+
+# docker-compose.app-auth.yml normally exports the PEM in its own
+# entrypoint override, which this one replaces - keep the fallback path
+# working for App auth.
+if [ -z "${APP_PRIVATE_KEY:-}" ] && [ -r /opt/github-app.pem ]; then
+    APP_PRIVATE_KEY="$(cat /opt/github-app.pem)"
+    export APP_PRIVATE_KEY
+fi
+
+lease=""
+if [ -S "$SOCK" ]; then
+    lease=$(curl -sf --max-time 30 --unix-socket "$SOCK" \
+        -X POST -H 'Content-Type: application/json' \
+        -d "{\"client\": \"$(hostname)\"}" \
+        http://jit-broker/lease) || lease=""
+fi
+
+mode=$(printf '%s' "$lease" | jq -r '.mode // empty' 2>/dev/null)
+
+case "$mode" in
+    jit)
+        config=$(printf '%s' "$lease" | jq -r '.encoded_jit_config')
+        name=$(printf '%s' "$lease" | jq -r '.name')
+        echo "jit-broker: starting as $name (JIT config, no self-registration)"
+        mkdir -p "${RUNNER_WORKDIR:-/tmp/runner/work}"
+        export RUNNER_ALLOW_RUNASROOT=1
+        cd /actions-runner || exit 1
+        exec ./run.sh --jitconfig "$config"
+        ;;
+    token)
+        echo "jit-broker: using brokered registration token"
+        RUNNER_TOKEN=$(printf '%s' "$lease" | jq -r '.token')
+        export RUNNER_TOKEN
+        # Without these the image entrypoint would fetch its own token
+        unset ACCESS_TOKEN APP_ID APP_LOGIN APP_PRIVATE_KEY
+        exec /entrypoint.sh "$@"
+        ;;
+    *)
+        echo "jit-broker: unavailable, falling back to self-registration"
+        exec /entrypoint.sh "$@"
+        ;;
+esac
@@ -0,0 +1,22 @@
+#!/bin/sh
+# =============================================================================
+# GitHub Runner - Job-Completed Hook: Close Job in DinD Telemetry
+# =============================================================================
+# Runs inside the agent (ACTIONS_RUNNER_HOOK_JOB_COMPLETED) after each job.
+# Runs the tool-cache promote hook first (when the tool-cache override is
+# active), then tells the dind-telemetry collector the job is over.
+# Failures never fail the job.
+# =============================================================================
+
+COLLECTOR="${DIND_TELEMETRY_URL:-http://dind-telemetry:8781}"
+
+if [ -n "${TOOL_CACHE_BROKER_URL:-}" ] && [ -x /opt/agent-hooks/tool-cache-promote.sh ]; then
+    /opt/agent-hooks/tool-cache-promote.sh
+fi
+
+if command -v curl >/dev/null 2>&1; then
+    curl -fsS --max-time 5 -X POST -H 'Content-Type: application/json' \
+        -d "{\"repository\": \"${GITHUB_REPOSITORY:-}\", \"run_id\": \"${GITHUB_RUN_ID:-}\", \"run_attempt\": \"${GITHUB_RUN_ATTEMPT:-1}\", \"job\": \"${GITHUB_JOB:-}\"}" \
+        "$COLLECTOR/jobs/end" >/dev/null 2>&1
+fi
+exit 0
@@ -0,0 +1,25 @@
+#!/bin/sh
+# =============================================================================
+# GitHub Runner - Job-Started Hook: Report Job to DinD Telemetry
+# =============================================================================
+# Runs inside the agent (ACTIONS_RUNNER_HOOK_JOB_STARTED) before each job.
+# Tells the dind-telemetry collector which job this runner starts, so
+# containers the job creates in the shared DinD daemon can be charged to
+# it. The runner accepts one hook per event, so this one also runs the
+# tool-cache link hook when docker-compose.tool-cache.yml is active.
+# Failures never fail the job.
+# =============================================================================
+
+COLLECTOR="${DIND_TELEMETRY_URL:-http://dind-telemetry:8781}"
+
+if command -v curl >/dev/null 2>&1; then
+    curl -fsS --max-time 5 -X POST -H 'Content-Type: application/json' \
+        -d "{\"repository\": \"${GITHUB_REPOSITORY:-}\", \"run_id\": \"${GITHUB_RUN_ID:-}\", \"run_attempt\": \"${GITHUB_RUN_ATTEMPT:-1}\", \"workflow\": \"${GITHUB_WORKFLOW:-}\", \"job\": \"${GITHUB_JOB:-}\", \"runner\": \"${RUNNER_NAME:-$(hostname)}\"}" \
+        "$COLLECTOR/jobs/start" >/dev/null 2>&1 \
+        || echo "dind-telemetry: collector unreachable, job not attributed"
+fi
+
+if [ -n "${TOOL_CACHE_BROKER_URL:-}" ] && [ -x /opt/agent-hooks/tool-cache-link.sh ]; then
+    /opt/agent-hooks/tool-cache-link.sh
+fi
+exit 0
@@ -0,0 +1,32 @@
+#!/bin/sh
+# =============================================================================
+# GitHub Runner - Job-Started Hook: Link Shared Tool Cache
+# =============================================================================
+# Runs inside the agent (ACTIONS_RUNNER_HOOK_JOB_STARTED) before each job.
+# The shared tool-cache volume is mounted READ-ONLY at
+# $TOOL_CACHE_SHARED_DIR; the runner's own $RUNNER_TOOL_CACHE stays
+# private and writable. Every complete shared version is symlinked into
+# the private cache, so setup-* actions get an instant cache hit, while
+# versions missing from the shared cache are still downloaded locally
+# without ever writing to the shared volume.
+# =============================================================================
+
+SHARED="${TOOL_CACHE_SHARED_DIR:-/opt/toolcache-shared}"
+LOCAL="${RUNNER_TOOL_CACHE:-/opt/hostedtoolcache}"
+
+[ -d "$SHARED" ] || exit 0
+mkdir -p "$LOCAL" || exit 0
+
+linked=0
+for marker in "$SHARED"/*/*/*.complete; do
+    [ -e "$marker" ] || continue
+    rel="${marker#"$SHARED"/}"
+    entry="${rel%.complete}"
+    [ -d "$SHARED/$entry" ] || continue
+    [ -e "$LOCAL/$entry" ] && continue
+    mkdir -p "$(dirname "$LOCAL/$entry")"
+    ln -s "$SHARED/$entry" "$LOCAL/$entry" && touch "$LOCAL/$entry.complete" && linked=$((linked + 1))
+done
+
+echo "tool-cache: linked $linked shared tool version(s) from $SHARED"
+exit 0
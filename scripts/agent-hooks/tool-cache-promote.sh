@@ -0,0 +1,46 @@
+#!/bin/sh
+# =============================================================================
+# GitHub Runner - Job-Completed Hook: Promote Tools to Shared Cache
+# =============================================================================
+# Runs inside the agent (ACTIONS_RUNNER_HOOK_JOB_COMPLETED) after each job.
+# Any tool version this job installed into the private $RUNNER_TOOL_CACHE
+# (i.e. a real directory, not a symlink into the shared cache) is
+# streamed as a tarball to the tool-cache broker. The broker is the only
+# writer of the shared volume: it unpacks into a staging area and
+# renames into place under a per-version lock, so concurrent agents
+# promoting the same version populate it exactly once.
+# Failures never fail the job.
+# =============================================================================
+
+LOCAL="${RUNNER_TOOL_CACHE:-/opt/hostedtoolcache}"
+BROKER="${TOOL_CACHE_BROKER_URL:-http://tool-cache-broker:8780}"
+
+[ -d "$LOCAL" ] || exit 0
+command -v curl >/dev/null 2>&1 || exit 0
+
+for marker in "$LOCAL"/*/*/*.complete; do
+    [ -e "$marker" ] || continue
+    rel="${marker#"$LOCAL"/}"
+    entry="${rel%.complete}"
+    [ -d "$LOCAL/$entry" ] || continue
+    [ -L "$LOCAL/$entry" ] && continue
+
+    tool="${entry%%/*}"
+    rest="${entry#*/}"
+    version="${rest%%/*}"
+    arch="${rest#*/}"
+
+    # Skip the upload entirely if another agent already promoted it
+    if curl -fsS -X POST "$BROKER/ensure?tool=$tool&version=$version&arch=$arch" >/dev/null 2>&1; then
+        continue
+    fi
+
+    tmp="$(mktemp)"
+    if tar -C "$LOCAL/$entry" -cf "$tmp" . 2>/dev/null; then
+        curl -fsS -X PUT -H "Content-Type: application/x-tar" --data-binary "@$tmp" \
+            "$BROKER/upload?tool=$tool&version=$version&arch=$arch" >/dev/null 2>&1 \
+            && echo "tool-cache: promoted $entry"
+    fi
+    rm -f "$tmp"
+done
+exit 0
@@ -0,0 +1,366 @@
+"""
+Cleanup Manager - Agent Startup Benchmark
+
+Measures how long an ephemeral `agent` container takes from start to a
+usable runner on GitHub, and from exit to deregistration, by
+correlating host Docker container events with the runner list:
+
+    started       container `start` event (exact, from the daemon)
+    registration  start -> runner name first appears in the list
+    startup       start -> runner reported online and idle
+    teardown      container `die` event -> runner gone from the list
+
+Runner and container are matched by name: with RANDOM_RUNNER_SUFFIX=false
+(set in docker-compose.yml) an agent registers as
+<RUNNER_NAME_PREFIX>-<hostname>, and the hostname is the 12-character
+container ID. JIT agents (docker-compose.jit-broker.yml) are matched
+through the broker's lease records instead.
+
+Two ways to collect samples:
+  - observe: watch the running stack for a while; every ephemeral
+    agent restart after a job is one sample
+  - burst:   clone N extra agent containers from a running one, start
+    them at once, wait until they are online, stop and remove them,
+    and repeat for R rounds - a repeatable scale-up measurement
+
+GitHub-side times have the resolution of AGENT_BENCH_POLL_SECONDS (one
+runner-list call per poll; the poll backs off when the quota is at the
+reserve floor). Samples are kept per image in agent-bench.json and
+summarized as percentiles per image tag.
+"""
+
+import math
+import time
+import uuid
+from dataclasses import asdict, dataclass
+
+import shutdown
+from auth import resolve_token
+from config import Settings
+from console import cleanup_logger, console
+from docker_api import DockerAPIError, DockerClient
+from github_api import list_runners
+from rate_limit import RateLimit
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "agent-bench.json"
+MAX_SAMPLES_PER_IMAGE = 500
+# What the JIT broker / DinD placement overrides add to an agent: a
+# clone must not lease a pooled config that carries the production labels
+CLONE_DROP_ENV = ("JIT_BROKER_SOCKET=", "DIND_PLACEMENT_URL=")
+JIT_BROKER_MOUNT = "/run/jit-broker"
+COMPOSE_SERVICE_LABEL = "com.docker.compose.service"
+COMPOSE_PROJECT_LABEL = "com.docker.compose.project"
+BENCH_LABEL = "com.bauer-group.agent-bench"
+
+
+@dataclass
+class Sample:
+    container: str
+    image: str
+    started: float
+    registered: float | None = None
+    online: float | None = None
+    died: float | None = None
+    deregistered: float | None = None
+    runner: str = ""
+    runner_id: int = 0
+
+    def registration(self) -> float | None:
+        return self.registered - self.started if self.registered else None
+
+    def startup(self) -> float | None:
+        return self.online - self.started if self.online else None
+
+    def teardown(self) -> float | None:
+        return self.deregistered - self.died if self.deregistered and self.died else None
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+class AgentBench:
+    """Correlates agent container lifecycles with runner registrations."""
+
+    def __init__(
+        self,
+        settings: Settings,
+        docker: DockerClient | None = None,
+        fetch_runners=None,
+    ):
+        self.settings = settings
+        self.docker = docker or DockerClient(settings.agent_bench_docker_host)
+        self._fetch_runners = fetch_runners or self._github_runners
+        self.prefix = settings.runner_name_prefix
+        self.rate = RateLimit(reserve_pct=settings.cleanup_reserve_pct)
+        self._token: str | None = None
+        self._open: dict[str, Sample] = {}
+        self.done: list[Sample] = []
+        # Registrations of closed samples. A restarted ephemeral agent
+        # re-registers under the same name, but always with a new id.
+        self._retired: set[int] = set()
+        self.since = time.time()
+        self._broker_state = state_path(settings, "jit-broker.json")
+
+    # ---- Data sources ----
+
+    def _github_runners(self) -> list[dict]:
+        if self._token is None:
+            self._token, _ = resolve_token(self.settings)
+        return list(list_runners(self.settings.api_scope, self._token, self.rate))
+
+    def _agent_filters(self) -> dict:
+        labels = [f"{COMPOSE_SERVICE_LABEL}=agent"]
+        if self.settings.agent_bench_project:
+            labels.append(f"{COMPOSE_PROJECT_LABEL}={self.settings.agent_bench_project}")
+        return {"label": labels}
+
+    def _is_agent(self, attrs: dict) -> bool:
+        """Compose agent of the watched project, or one of our burst clones."""
+        if BENCH_LABEL in attrs:
+            return True
+        project = self.settings.agent_bench_project
+        return attrs.get(COMPOSE_SERVICE_LABEL) == "agent" and (
+            not project or attrs.get(COMPOSE_PROJECT_LABEL) == project
+        )
+
+    def _jit_names(self) -> dict[str, str]:
+        """Runner name -> agent hostname from the JIT broker's leases."""
+        leased = (load_json(self._broker_state, {}) or {}).get("leased", {})
+        return {lease["name"]: lease.get("client", "") for lease in leased.values()}
+
+    # ---- Correlation ----
+
+    def _on_event(self, ev: dict) -> None:
+        cid = ev.get("id") or (ev.get("Actor") or {}).get("ID") or ""
+        attrs = (ev.get("Actor") or {}).get("Attributes") or {}
+        ts = ev.get("timeNano", 0) / 1e9 or float(ev.get("time") or time.time())
+        action = ev.get("Action") or ev.get("status")
+        if not self._is_agent(attrs):
+            return
+        if action == "start":
+            old = self._open.pop(cid, None)
+            if old:
+                self._close(old)
+            self._open[cid] = Sample(cid[:12], attrs.get("image", "?"), ts)
+        elif action == "die" and cid in self._open:
+            self._open[cid].died = ts
+
+    def _close(self, sample: Sample) -> None:
+        if sample.runner_id:
+            self._retired.add(sample.runner_id)
+        self.done.append(sample)
+
+    def _match(self, sample: Sample, runners: dict[str, dict], jit: dict[str, str]) -> dict | None:
+        if sample.runner_id:
+            found = runners.get(sample.runner)
+            return found if found and found.get("id") == sample.runner_id else None
+        names = [f"{self.prefix}-{sample.container}"]
+        names += [name for name, client in jit.items() if client == sample.container]
+        for name in names:
+            found = runners.get(name)
+            if found and found.get("id") not in self._retired:
+                return found
+        return None
+
+    def poll(self) -> None:
+        """One correlation step: new container events + current runner list."""
+        now = time.time()
+        # Docker ANDs label filters, so agents and burst clones (which
+        # carry no compose labels) are told apart here, not by the daemon
+        filters = {"type": ["container"], "event": ["start", "die"]}
+        for ev in self.docker.events(self.since, now, filters):
+            self._on_event(ev)
+        self.since = now
+        if not self._open:
+            return
+
+        runners = {
+            r.get("name", ""): r
+            for r in self._fetch_runners()
+            if r.get("name", "").startswith(self.prefix)
+        }
+        seen_at = time.time()
+        jit = self._jit_names()
+        timeout = self.settings.agent_bench_timeout_seconds
+        for cid, sample in list(self._open.items()):
+            runner = self._match(sample, runners, jit)
+            if runner is not None:
+                sample.runner = runner.get("name", "")
+                sample.runner_id = runner.get("id", 0)
+                if sample.registered is None:
+                    sample.registered = seen_at
+                if sample.online is None and runner.get("status") == "online":
+                    sample.online = seen_at
+            if sample.died is not None:
+                gone = sample.runner and runner is None
+                never_registered = not sample.runner and seen_at - sample.died > timeout
+                if gone:
+                    sample.deregistered = seen_at
+                if gone or never_registered:
+                    self._close(self._open.pop(cid))
+            elif seen_at - sample.started > timeout and sample.online is None:
+                cleanup_logger.warning(f"Agent {sample.container} not online after {timeout}s")
+                self._close(self._open.pop(cid))
+
+    def _wait_poll(self) -> bool:
+        """Sleep one poll interval (longer at the quota floor). False on shutdown."""
+        delay = self.settings.agent_bench_poll_seconds
+        if self.rate.usable() == 0:
+            delay = max(delay, self.rate.seconds_to_reset() + 2)
+            cleanup_logger.warning("Rate limit at reserve floor, pausing runner polls until reset")
+        return not shutdown.wait(delay)
+
+    # ---- Modes ----
+
+    def observe(self, duration: float) -> None:
+        cleanup_logger.info(f"Observing agent restarts for {duration:.0f}s...")
+        end = time.time() + duration
+        while time.time() < end:
+            self.poll()
+            if not self._wait_poll():
+                break
+
+    def _template(self) -> dict:
+        agents = self.docker.containers(filters=self._agent_filters())
+        if not agents:
+            raise RuntimeError("No running agent container to clone for the burst")
+        return self.docker.inspect_container(agents[0]["Id"])
+
+    def _clone_body(self, tpl: dict, run_id: str) -> dict:
+        cfg = tpl.get("Config") or {}
+        host = dict(tpl.get("HostConfig") or {})
+        host["RestartPolicy"] = {"Name": "no"}
+        host.pop("PortBindings", None)
+        host["Binds"] = [
+            b for b in host.get("Binds") or [] if b.split(":")[1:2] != [JIT_BROKER_MOUNT]
+        ]
+        host["Mounts"] = [
+            m for m in host.get("Mounts") or [] if m.get("Target") != JIT_BROKER_MOUNT
+        ]
+        env = [
+            e for e in cfg.get("Env") or []
+            if not e.startswith(
+                ("LABELS=", "RANDOM_RUNNER_SUFFIX=", "NO_DEFAULT_LABELS=", *CLONE_DROP_ENV)
+            )
+        ]
+        # Bench runners register through the image's own entrypoint (the
+        # JIT and placement entrypoints are dropped with their socket and
+        # URL) and only carry a bench label (not even self-hosted), so no
+        # workflow job picks them up
+        env += [
+            f"LABELS={self.settings.agent_bench_runner_label}",
+            "NO_DEFAULT_LABELS=true",
+            "RANDOM_RUNNER_SUFFIX=false",
+        ]
+        networks = ((tpl.get("NetworkSettings") or {}).get("Networks") or {}).keys()
+        return {
+            "Image": cfg.get("Image"),
+            "Env": env,
+            # No Entrypoint: the image default, not the template's override
+            "Cmd": cfg.get("Cmd"),
+            "WorkingDir": cfg.get("WorkingDir"),
+            "Labels": {BENCH_LABEL: run_id},
+            "HostConfig": host,
+            "NetworkingConfig": {"EndpointsConfig": {net: {} for net in networks}},
+        }
+
+    def burst(self, size: int, rounds: int) -> None:
+        tpl = self._template()
+        for rnd in range(1, rounds + 1):
+            if shutdown.requested():
+                return
+            run_id = uuid.uuid4().hex[:8]
+            body = self._clone_body(tpl, run_id)
+            ids = []
+            cleanup_logger.info(f"Round {rnd}/{rounds}: starting {size} agents at once")
+            try:
+                for i in range(size):
+                    params = {"name": f"agent-bench-{run_id}-{i}"}
+                    ids.append(self.docker.request("POST", "/containers/create", params, body)["Id"])
+                for cid in ids:
+                    self.docker.request("POST", f"/containers/{cid}/start")
+                short = {cid[:12] for cid in ids}
+                self._until(lambda: self._all_online(short))
+            finally:
+                self._teardown(ids)
+
+    def _all_online(self, short: set[str]) -> bool:
+        """Every container in `short` started and is online (or gave up)."""
+        pending = [s for s in self._open.values() if s.container in short]
+        seen = {s.container for s in pending} | {s.container for s in self.done}
+        return short <= seen and all(s.online for s in pending)
+
+    def _teardown(self, ids: list[str]) -> None:
+        grace = self.settings.agent_bench_stop_grace
+        for cid in ids:
+            try:
+                self.docker.request("POST", f"/containers/{cid}/stop", {"t": grace}, timeout=grace + 30)
+            except (OSError, DockerAPIError) as e:
+                cleanup_logger.warning(f"Could not stop {cid[:12]}: {e}")
+        short = {cid[:12] for cid in ids}
+        self._until(lambda: not any(s.container in short for s in self._open.values()))
+        for cid in ids:
+            try:
+                self.docker.request("DELETE", f"/containers/{cid}", {"force": "1"})
+            except (OSError, DockerAPIError) as e:
+                cleanup_logger.warning(f"Could not remove {cid[:12]}: {e}")
+
+    def _until(self, condition) -> None:
+        deadline = time.time() + self.settings.agent_bench_timeout_seconds * 2
+        while time.time() < deadline:
+            self.poll()
+            if condition() or not self._wait_poll():
+                return
+
+    # ---- Results ----
+
+    def save(self) -> None:
+        path = state_path(self.settings, STATE_FILE)
+        doc = load_json(path, {}) or {}
+        for s in self.done:
+            doc.setdefault(s.image, []).append(asdict(s))
+        for image in doc:
+            del doc[image][:-MAX_SAMPLES_PER_IMAGE]
+        save_json(path, doc)
+
+
+def print_summary(settings: Settings, samples: list[Sample] | None = None) -> None:
+    """Percentiles per image tag (this run's samples, or all recorded ones)."""
+    from rich.table import Table
+
+    if samples is None:
+        doc = load_json(state_path(settings, STATE_FILE), {}) or {}
+        samples = [Sample(**s) for rows in doc.values() for s in rows]
+    if not samples:
+        console.print("[dim]No agent startup samples recorded yet.[/]")
+        return
+
+    by_image: dict[str, list[Sample]] = {}
+    for s in samples:
+        by_image.setdefault(s.image, []).append(s)
+
+    table = Table(title="Agent lifecycle latency per image (seconds)")
+    for col in ("Image", "Metric", "n", "p50", "p90", "p99", "max"):
+        table.add_column(col, justify="left" if col in ("Image", "Metric") else "right")
+    for image, group in sorted(by_image.items()):
+        for row, metric in enumerate(("registration", "startup", "teardown")):
+            label = image if row == 0 else ""
+            values = [v for v in (getattr(s, metric)() for s in group) if v is not None]
+            if not values:
+                table.add_row(label, metric, "0", "-", "-", "-", "-")
+                continue
+            table.add_row(
+                label,
+                metric,
+                str(len(values)),
+                f"{_percentile(values, 50):.1f}",
+                f"{_percentile(values, 90):.1f}",
+                f"{_percentile(values, 99):.1f}",
+                f"{max(values):.1f}",
+            )
+    console.print(table)
@@ -0,0 +1,349 @@
+"""
+Cleanup Manager - Crashed-Agent Watcher
+
+Most leaked registrations come from agents that die before they can
+deregister: SIGKILL after stop_grace_period, OOM kill, or the listener
+giving up when DinD disconnects. The scheduled cleanup pass only finds
+them days later with a full runner listing. This watcher follows the
+host Docker event stream instead and removes each leak right away:
+
+    1. An `agent` container dies with a non-clean exit (anything but
+       0 or 143 = graceful SIGTERM, or any exit after an `oom` event).
+    2. Its runner name is derived from the container: with
+       RANDOM_RUNNER_SUFFIX=false an agent registers as
+       <RUNNER_NAME_PREFIX>-<container id>; JIT agents are looked up in
+       the broker's leases.
+    3. After AGENT_WATCH_DELAY_SECONDS (GitHub needs a moment to notice
+       the listener is gone) one lookup by name and one DELETE, paced
+       by the same RateLimit as the cleanup pass.
+
+Only offline registrations are deleted. A runner GitHub still reports
+online (a killed listener's session has not timed out yet) is retried
+later; one whose container restarted is dropped, since the restarted
+agent registers under the same name again (JIT agents lease a new one). After
+AGENT_WATCH_MAX_ATTEMPTS the entry is dropped and left to the scheduled
+pass. The queue and the event-stream position are persisted, so
+crashes that happen while the watcher restarts are still picked up
+(the daemon replays events since the saved position).
+
+Every AGENT_WATCH_STUCK_INTERVAL_SECONDS the watcher also sweeps for
+runners GitHub shows online and busy that hold no real capacity. Busy
+time is tracked per registration across sweeps (GitHub does not report
+it), and only runners of agent containers seen on this host are judged:
+
+    zombie  busy, but its container is gone or not running - the
+            registration is deleted right away, retried until GitHub
+            lets go of it
+    wedged  busy longer than AGENT_WATCH_BUSY_MAX_SECONDS on a running
+            container - flagged in the log; restarted only with
+            AGENT_WATCH_RESTART_WEDGED=true (jobs may legitimately set
+            timeout-minutes far above the 6h default, up to 5 days)
+"""
+
+import threading
+import time
+import urllib.error
+
+import shutdown
+from auth import resolve_token
+from config import Settings
+from console import cleanup_logger, fmt_duration
+from docker_api import DockerAPIError, DockerClient
+from github_api import delete_runner, find_runner, list_runners
+from jit_broker import API_TOKEN_TTL
+from jit_broker import STATE_FILE as JIT_STATE_FILE
+from rate_limit import tuned_rate_limit
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "agent-watch.json"
+# Graceful exits: the listener finished (0) or was stopped with SIGTERM
+# and deregistered on its way out (143)
+CLEAN_EXIT_CODES = {"0", "143"}
+# A runner still online (GitHub has not noticed the crash yet) is retried this much later
+BUSY_RETRY_SECONDS = 120
+COMPOSE_SERVICE_LABEL = "com.docker.compose.service"
+COMPOSE_PROJECT_LABEL = "com.docker.compose.project"
+# Agent containers seen on this host are remembered this long
+KNOWN_TTL = 7 * 86400
+
+_API_ERRORS = (urllib.error.URLError, OSError, ValueError, RuntimeError, KeyError)
+
+
+class CrashWatcher:
+    """Targeted deregistration of agents that died without deregistering."""
+
+    def __init__(self, settings: Settings, docker: DockerClient | None = None):
+        self.settings = settings
+        self.docker = docker or DockerClient(settings.agent_watch_docker_host)
+        self.scope = settings.api_scope
+        self.rate = tuned_rate_limit(settings, self.scope)
+        self._lock = threading.Lock()
+        self._state_file = state_path(settings, STATE_FILE)
+        state = load_json(self._state_file, {}) or {}
+        self.queue: list[dict] = list(state.get("queue", []))
+        self.since: float = float(state.get("since", time.time()))
+        self.counts: dict[str, int] = dict(state.get("counts", {}))
+        # Runner ID -> first sweep that saw it busy
+        self.busy_since: dict[str, float] = dict(state.get("busy_since", {}))
+        # Agent container ID -> last time it was seen on this host
+        self.known: dict[str, float] = dict(state.get("known", {}))
+        self._swept_at = 0.0
+        self._oom: set[str] = set()
+        self._token: str | None = None
+        self._token_at = 0.0
+
+    def save(self) -> None:
+        with self._lock:
+            doc = {
+                "queue": list(self.queue),
+                "since": self.since,
+                "counts": dict(self.counts),
+                "busy_since": dict(self.busy_since),
+                "known": dict(self.known),
+            }
+        save_json(self._state_file, doc)
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+    # ---- Docker side ----
+
+    def _filters(self) -> dict:
+        labels = [f"{COMPOSE_SERVICE_LABEL}=agent"]
+        if self.settings.agent_watch_project:
+            labels.append(f"{COMPOSE_PROJECT_LABEL}={self.settings.agent_watch_project}")
+        return {"type": ["container"], "event": ["die", "oom", "start"], "label": labels}
+
+    def runner_name(self, container: str) -> str:
+        """Runner name an agent container registered under."""
+        leased = (load_json(state_path(self.settings, JIT_STATE_FILE), {}) or {}).get("leased", {})
+        for lease in leased.values():
+            if lease.get("client") == container:
+                return lease["name"]
+        return f"{self.settings.runner_name_prefix}-{container}"
+
+    def _enqueue(self, name: str, cid: str, reason: str, force: bool = False) -> bool:
+        """Queue `name` for deregistration; False if it already is."""
+        with self._lock:
+            if any(item["name"] == name for item in self.queue):
+                return False
+            self.queue.append({
+                "name": name,
+                "container": cid,
+                "reason": reason,
+                "due": time.time() + (0 if force else self.settings.agent_watch_delay_seconds),
+                "attempts": 0,
+                "force": force,
+            })
+        return True
+
+    def on_event(self, ev: dict) -> None:
+        cid = (ev.get("id") or (ev.get("Actor") or {}).get("ID") or "")[:12]
+        action = ev.get("Action") or ev.get("status")
+        with self._lock:
+            self.known[cid] = time.time()
+        if action == "oom":
+            self._oom.add(cid)
+            return
+        if action == "start":
+            # Restarted by its restart policy: the same hostname registers
+            # the same runner name again (config.sh --replace), nothing
+            # leaked. A JIT agent leases a new name, so its old one stays.
+            own = f"{self.settings.runner_name_prefix}-{cid}"
+            with self._lock:
+                self.queue = [i for i in self.queue if i["name"] != own]
+            return
+        if action != "die":
+            return
+        exit_code = str(((ev.get("Actor") or {}).get("Attributes") or {}).get("exitCode", ""))
+        oom = cid in self._oom
+        self._oom.discard(cid)
+        if exit_code in CLEAN_EXIT_CODES and not oom:
+            return
+        reason = "OOM-killed" if oom else f"exit code {exit_code or '?'}"
+        name = self.runner_name(cid)
+        if self._enqueue(name, cid, reason):
+            cleanup_logger.warning(f"Agent {cid} died ({reason}), queued {name} for deregistration")
+
+    def watch(self) -> None:
+        """Follow die/oom events until shutdown, resuming from the saved position."""
+        while not shutdown.requested():
+            try:
+                params = {"since": f"{self.since:.3f}", "filters": self._filters()}
+                for ev in self.docker.stream("/events", params, timeout=3600):
+                    self.on_event(ev)
+                    self.since = ev.get("timeNano", 0) / 1e9 or float(ev.get("time") or self.since)
+                    self.save()
+            except (OSError, DockerAPIError) as e:
+                cleanup_logger.warning(f"Host event stream interrupted: {e}")
+            if shutdown.wait(5):
+                return
+
+    # ---- GitHub side ----
+
+    def _github_token(self) -> str:
+        if self._token is None or time.time() - self._token_at > API_TOKEN_TTL:
+            self._token, _ = resolve_token(self.settings)
+            self._token_at = time.time()
+        return self._token
+
+    def _retry(self, item: dict, delay: float, why: str) -> bool:
+        """Put `item` back for a later tick. False when out of attempts."""
+        item["attempts"] += 1
+        if item["attempts"] >= self.settings.agent_watch_max_attempts:
+            cleanup_logger.warning(
+                f"Giving up on {item['name']} after {item['attempts']} attempts ({why}); "
+                "the scheduled cleanup pass will remove it"
+            )
+            self._count("given_up")
+            return False
+        item["due"] = time.time() + delay
+        return True
+
+    def _handle(self, item: dict) -> bool:
+        """Look up and delete one queued runner. True to keep it queued."""
+        token = self._github_token()
+        try:
+            runner = find_runner(self.scope, token, item["name"], self.rate)
+        except urllib.error.HTTPError as e:
+            retry_after = getattr(e, "retry_after", None)
+            if retry_after is not None and e.code in (403, 429):
+                self.rate.react_to_secondary(retry_after)
+            why = getattr(e, "short_msg", str(e))
+            return self._retry(item, retry_after or BUSY_RETRY_SECONDS, why)
+        if runner is None:
+            cleanup_logger.status(f"  {item['name']} already gone")
+            self._count("already_gone")
+            return False
+        if not item.get("force") and (runner.get("busy") or runner.get("status") != "offline"):
+            # GitHub keeps a killed listener's session until it times out
+            return self._retry(item, BUSY_RETRY_SECONDS, "still reported online")
+
+        ok, headers, errmsg, retry_after = delete_runner(self.scope, runner["id"], token)
+        self.rate.update(headers)
+        if ok:
+            self.rate.record_success()
+            cleanup_logger.success(f"Deregistered {item['name']} ({item['reason']})")
+            self._count("deleted")
+            return False
+        if retry_after is not None and errmsg and errmsg.startswith(("HTTP 403", "HTTP 429")):
+            self.rate.react_to_secondary(retry_after)
+        return self._retry(item, retry_after or BUSY_RETRY_SECONDS, errmsg or "delete failed")
+
+    # ---- Stuck online+busy runners ----
+
+    def _agent_names(self) -> dict[str, str]:
+        """Runner name -> container ID for every agent known on this host."""
+        prefix = self.settings.runner_name_prefix
+        with self._lock:
+            names = {f"{prefix}-{cid}": cid for cid in self.known}
+        leased = (load_json(state_path(self.settings, JIT_STATE_FILE), {}) or {}).get("leased", {})
+        for lease in leased.values():
+            if lease.get("client") in names.values():
+                names[lease["name"]] = lease["client"]
+        return names
+
+    def _restart(self, cid: str) -> bool:
+        grace = self.settings.agent_watch_restart_grace
+        try:
+            self.docker.request(
+                "POST", f"/containers/{cid}/restart", {"t": grace}, timeout=grace + 30
+            )
+            return True
+        except (OSError, DockerAPIError) as e:
+            cleanup_logger.warning(f"Could not restart agent {cid}: {e}")
+            return False
+
+    def sweep(self) -> None:
+        """Cross-check busy runners against the agent containers on this host."""
+        busy = [
+            r for r in list_runners(self.scope, self._github_token(), self.rate)
+            if r.get("status") == "online" and r.get("busy")
+        ]
+        # Listed after the runners: a registration implies its container existed
+        containers = {
+            c["Id"][:12]: c.get("State", "")
+            for c in self.docker.containers(all_=True, filters={"label": self._filters()["label"]})
+        }
+        now = time.time()
+        with self._lock:
+            for cid in containers:
+                self.known[cid] = now
+            self.known = {cid: t for cid, t in self.known.items() if now - t < KNOWN_TTL}
+            # Registration IDs change on every ephemeral re-registration,
+            # so a new job on the same agent starts a fresh busy clock
+            self.busy_since = {
+                str(r["id"]): self.busy_since.get(str(r["id"]), now) for r in busy
+            }
+        names = self._agent_names()
+        max_busy = self.settings.agent_watch_busy_max_seconds
+        zombies = wedged = 0
+        for r in busy:
+            cid = names.get(r["name"])
+            if cid is None:
+                continue  # not an agent of this host
+            state = containers.get(cid, "")
+            if state in ("restarting", "created", "paused"):
+                continue  # in transition; a restarted agent re-registers the same name
+            if state != "running":
+                zombies += 1
+                if self._enqueue(r["name"], cid, f"busy zombie, container {state or 'gone'}", True):
+                    cleanup_logger.warning(
+                        f"{r['name']} is online+busy but container {cid} is {state or 'gone'}, "
+                        "queued for deregistration"
+                    )
+                    self._count("zombie")
+                continue
+            busy_for = now - self.busy_since[str(r["id"])]
+            if busy_for <= max_busy:
+                continue
+            wedged += 1
+            cleanup_logger.warning(
+                f"{r['name']} busy for {fmt_duration(busy_for)} on running container {cid}, wedged"
+            )
+            if not self.settings.agent_watch_restart_wedged:
+                self._count("wedged_flagged")
+            elif self._restart(cid):
+                cleanup_logger.info(f"Restarted wedged agent {cid}")
+                self._count("wedged_restarted")
+                with self._lock:
+                    self.busy_since[str(r["id"])] = now
+        if zombies or wedged:
+            cleanup_logger.status(
+                f"Stuck-runner sweep: {len(busy)} busy, {zombies} zombie, {wedged} wedged"
+            )
+
+    def tick(self) -> None:
+        """Work off the due part of the queue, paced like a cleanup pass."""
+        interval = self.settings.agent_watch_stuck_interval_seconds
+        if interval and time.time() - self._swept_at >= interval:
+            self._swept_at = time.time()
+            try:
+                self.sweep()
+            except (*_API_ERRORS, DockerAPIError) as e:
+                cleanup_logger.warning(f"Stuck-runner sweep failed: {e}")
+        now = time.time()
+        with self._lock:
+            due = sorted((i for i in self.queue if i["due"] <= now), key=lambda i: i["due"])
+        for n, item in enumerate(due):
+            # Two requests per entry (lookup + delete)
+            delay = self.rate.proactive_delay(2 * (len(due) - n))
+            if delay > self.settings.agent_watch_interval_seconds:
+                cleanup_logger.status(f"Rate limit pacing: {len(due) - n} deregistrations wait")
+                break
+            if n and shutdown.wait(delay):
+                break
+            try:
+                keep = self._handle(item)
+            except _API_ERRORS as e:
+                cleanup_logger.warning(f"Deregistering {item['name']} failed: {e}")
+                keep = self._retry(item, BUSY_RETRY_SECONDS, str(e))
+            if not keep:
+                with self._lock:
+                    self.queue = [i for i in self.queue if i is not item]
+        self.save()
+
+    def serve(self) -> None:
+        threading.Thread(target=self.watch, name="agent-events", daemon=True).start()
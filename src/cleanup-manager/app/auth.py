@@ -17,6 +17,9 @@ needs filesystem access to the host-mounted 0600 PEM):
        After the drop, only this in-memory copy is reachable.
     2. APP_PRIVATE_KEY_FILE path (fallback). For local dev where the
        process runs as the file's owner directly.
+
+Extra Apps of the cleanup token pool (EXTRA_APPS) follow the same
+order with APP_PRIVATE_KEY_<APP_ID> and their own PEM path.
 """
 
 import json
@@ -28,28 +31,29 @@ from pathlib import Path
 
 import jwt
 
+import tracing
 from config import Settings
 from console import cleanup_logger
 
 
-def _resolve_pem(private_key_path: Path) -> bytes:
+def _resolve_pem(private_key_path: Path, env_var: str = "APP_PRIVATE_KEY") -> bytes:
     """Return PEM bytes from env (preferred) or file (fallback)."""
-    env_pem = os.environ.get("APP_PRIVATE_KEY", "").strip()
+    env_pem = os.environ.get(env_var, "").strip()
     if env_pem:
         return env_pem.encode("ascii")
     if private_key_path.is_file():
         return private_key_path.read_bytes()
     raise FileNotFoundError(
-        f"GitHub App private key not available: APP_PRIVATE_KEY env var is "
+        f"GitHub App private key not available: {env_var} env var is "
         f"empty and the fallback path {private_key_path} is not readable. "
         "Check that the PEM is mounted into the container and that the "
         "entrypoint ran as root long enough to preload it."
     )
 
 
-def make_jwt(app_id: str, private_key_path: Path) -> str:
+def make_jwt(app_id: str, private_key_path: Path, env_var: str = "APP_PRIVATE_KEY") -> str:
     """Sign a GitHub App JWT (RS256) using the App's private key."""
-    pem = _resolve_pem(private_key_path)
+    pem = _resolve_pem(private_key_path, env_var)
     now = int(time.time())
     payload = {
         "iat": now - 60,    # 60s clock skew tolerance
@@ -76,23 +80,45 @@ def resolve_token(settings: Settings) -> tuple[str, str]:
 
     Prefers PAT if explicitly set; falls back to App installation token.
     """
-    if settings.has_pat_auth:
-        return settings.github_access_token.strip(), "PAT (GITHUB_ACCESS_TOKEN)"
-
-    if settings.has_app_auth:
-        pem_path = Path(settings.app_private_key_file)
-        cleanup_logger.info(
-            f"Using GitHub App auth (App ID {settings.app_id}, "
-            f"key at {pem_path})"
+    with tracing.span("auth.resolve_token") as sp:
+        if settings.has_pat_auth:
+            sp.set_attribute("auth.method", "pat")
+            return settings.github_access_token.strip(), "PAT (GITHUB_ACCESS_TOKEN)"
+
+        if settings.has_app_auth:
+            sp.set_attribute("auth.method", "app")
+            pem_path = Path(settings.app_private_key_file)
+            cleanup_logger.info(
+                f"Using GitHub App auth (App ID {settings.app_id}, "
+                f"key at {pem_path})"
+            )
+            app_jwt = make_jwt(settings.app_id, pem_path)
+            token = get_installation_token(app_jwt, settings.app_install_scope)
+            return token, f"GitHub App {settings.app_id} (installation token)"
+
+        raise ValueError(
+            "No usable auth in environment. Set GITHUB_ACCESS_TOKEN (PAT) or "
+            "APP_ID + a PEM file at APP_PRIVATE_KEY_FILE."
         )
-        app_jwt = make_jwt(settings.app_id, pem_path)
-        token = get_installation_token(app_jwt, settings.app_install_scope)
-        return token, f"GitHub App {settings.app_id} (installation token)"
 
-    raise ValueError(
-        "No usable auth in environment. Set GITHUB_ACCESS_TOKEN (PAT) or "
-        "APP_ID + a PEM file at APP_PRIVATE_KEY_FILE."
-    )
+
+def parse_extra_apps(spec: str) -> list[tuple[str, Path]]:
+    """Parse EXTRA_APPS ("APP_ID:PEM_PATH,...") into (app_id, path) pairs."""
+    apps = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        app_id, sep, path = item.partition(":")
+        if not sep or not app_id.strip() or not path.strip():
+            raise ValueError(f"Invalid EXTRA_APPS entry '{item}'. Use APP_ID:PEM_PATH")
+        apps.append((app_id.strip(), Path(path.strip())))
+    return apps
+
+
+def pem_env_var(app_id: str) -> str:
+    """Env var an extra App's PEM is preloaded into."""
+    return f"APP_PRIVATE_KEY_{app_id}"
 
 
 # --- internal HTTP helpers used only during auth bootstrap ---
@@ -0,0 +1,134 @@
+"""
+Cleanup Manager - GitHub API Circuit Breaker
+
+During a GitHub incident most requests fail with 5xx or time out. A pass
+that retries every candidate on its own would spend hours and quota
+against a failing backend. The breaker watches the outcome of the
+pass's requests over a rolling window instead:
+
+    closed     normal operation; once CLEANUP_CIRCUIT_MIN_REQUESTS
+               requests in the last CLEANUP_CIRCUIT_WINDOW_SECONDS
+               failed at CLEANUP_CIRCUIT_FAILURE_RATIO or more, it opens
+    open       the pass stops and checkpoints its remaining candidates;
+               no request is sent until the cooldown has passed
+    half-open  a single probe request is let through: success closes
+               the breaker, failure reopens it with double the cooldown
+               (up to MAX_COOLDOWN)
+
+Only server-side failures count (5xx, timeouts, connection errors) -
+404s, rate limits and other 4xx say nothing about GitHub's health. The
+state is persisted, so a new pass (or the scheduler's recovery probe)
+knows the breaker is open and a restart does not reset the cooldown.
+"""
+
+import time
+
+from config import Settings
+from console import cleanup_logger, fmt_duration
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "circuit.json"
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+MAX_COOLDOWN = 3600
+
+
+def is_server_failure(errmsg: str | None) -> bool:
+    """Whether a request error says GitHub itself is failing."""
+    return errmsg is not None and errmsg.startswith(("HTTP 5", "Network error"))
+
+
+class CircuitBreaker:
+    """Rolling-window error-rate breaker for the GitHub API."""
+
+    def __init__(self, settings: Settings):
+        self.enabled = settings.cleanup_circuit_breaker
+        self.window = settings.cleanup_circuit_window_seconds
+        self.min_requests = settings.cleanup_circuit_min_requests
+        self.failure_ratio = settings.cleanup_circuit_failure_ratio
+        self.base_cooldown = settings.cleanup_circuit_cooldown_seconds
+        self._state_file = state_path(settings, STATE_FILE)
+        state = load_json(self._state_file, {}) or {}
+        self.state: str = state.get("state", CLOSED)
+        self.opened_at: float = float(state.get("opened_at", 0.0))
+        self.cooldown: float = float(state.get("cooldown", self.base_cooldown))
+        # (timestamp, failed) of the requests in the window
+        self.outcomes: list[tuple[float, bool]] = []
+        if self.state == HALF_OPEN:
+            # A probe that never reported back (crash) counts as failed
+            self.state = OPEN
+
+    def save(self) -> None:
+        save_json(self._state_file, {
+            "state": self.state,
+            "opened_at": self.opened_at,
+            "cooldown": self.cooldown,
+        })
+
+    @property
+    def is_open(self) -> bool:
+        return self.enabled and self.state != CLOSED
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe may be sent (0 when closed)."""
+        if not self.is_open:
+            return 0.0
+        return max(self.opened_at + self.cooldown - time.time(), 0.0)
+
+    def ready(self) -> bool:
+        """Whether a request could be sent now, without starting the probe
+        (for checks that are not followed by a request)."""
+        return not self.is_open or (self.state == OPEN and self.retry_in() <= 0)
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now. An open breaker past its
+        cooldown lets exactly one probe through (half-open)."""
+        if not self.is_open:
+            return True
+        if self.state == OPEN and self.retry_in() <= 0:
+            self.state = HALF_OPEN
+            self.save()
+            return True
+        return False
+
+    def failures(self) -> tuple[int, int]:
+        """(failed, total) requests within the window."""
+        cutoff = time.time() - self.window
+        self.outcomes = [o for o in self.outcomes if o[0] >= cutoff]
+        return sum(1 for _, failed in self.outcomes if failed), len(self.outcomes)
+
+    def record(self, failed: bool) -> None:
+        """Account one request's outcome; may open or close the breaker."""
+        if not self.enabled:
+            return
+        now = time.time()
+        if self.state == HALF_OPEN:
+            if failed:
+                self._open(now, min(self.cooldown * 2, MAX_COOLDOWN))
+                cleanup_logger.warning(
+                    f"GitHub API probe failed, circuit stays open - "
+                    f"next probe in {fmt_duration(self.cooldown)}"
+                )
+            else:
+                self.state = CLOSED
+                self.cooldown = self.base_cooldown
+                self.outcomes = []
+                self.save()
+                cleanup_logger.success("GitHub API probe succeeded, circuit closed")
+            return
+        self.outcomes.append((now, failed))
+        bad, total = self.failures()
+        if self.state == CLOSED and total >= self.min_requests and bad / total >= self.failure_ratio:
+            self._open(now, self.base_cooldown)
+            cleanup_logger.warning(
+                f"GitHub API failing ({bad} of the last {total} requests within "
+                f"{fmt_duration(self.window)}), circuit open for {fmt_duration(self.cooldown)}"
+            )
+
+    def _open(self, now: float, cooldown: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self.cooldown = cooldown
+        self.save()
@@ -7,9 +7,10 @@ a .env file). Reuses the same variable names as the runner agents
 can share a single .env without duplication.
 """
 
+import re
 from typing import Literal
 
-from pydantic import Field, field_validator
+from pydantic import Field, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -36,6 +37,14 @@ class Settings(BaseSettings):
         default="/opt/github-app.pem",
         description="Path to the GitHub App PEM private key (mounted via app-auth override)",
     )
+    extra_access_tokens: str = Field(
+        default="",
+        description="Comma-separated extra PATs (of other users) pooled for cleanup deletes",
+    )
+    extra_apps: str = Field(
+        default="",
+        description="Comma-separated APP_ID:PEM_PATH pairs of extra Apps pooled for cleanup deletes",
+    )
 
     # === Scope (what runners to clean) ===
     org_name: str = Field(
@@ -66,7 +75,117 @@ class Settings(BaseSettings):
     cleanup_floor_delay: float = Field(
         default=0.5,
         ge=0.0,
-        description="Minimum seconds between API requests (secondary-limit guard)",
+        description="Initial seconds between API requests (secondary-limit guard)",
+    )
+    cleanup_floor_delay_min: float = Field(
+        default=0.2,
+        ge=0.0,
+        description="Lowest floor delay the AIMD recovery may converge to",
+    )
+    cleanup_floor_recover_after: int = Field(
+        default=100,
+        ge=0,
+        description="Successful requests in a row before floor delay is reduced (0 = never)",
+    )
+    cleanup_floor_recover_step: float = Field(
+        default=0.05,
+        gt=0.0,
+        description="Seconds taken off the floor delay per recovery step",
+    )
+    cleanup_pacing: Literal["plan", "even"] = Field(
+        default="plan",
+        description="'plan': spend each window's safe quota early; 'even': spread it over the window",
+    )
+    cleanup_max_duration_minutes: int = Field(
+        default=0,
+        ge=0,
+        description="Stop a pass cleanly after N minutes (0 = no limit)",
+    )
+    cleanup_window: str = Field(
+        default="",
+        description="Allowed time window 'HH:MM-HH:MM' (local TZ); a pass stops at its end",
+    )
+    cleanup_shutdown_budget: float = Field(
+        default=8.0,
+        ge=0.0,
+        description="Seconds an in-flight pass gets to checkpoint on SIGTERM (below the 10s stop grace)",
+    )
+    cleanup_lease_ttl: int = Field(
+        default=120,
+        ge=10,
+        description="Seconds before an unrenewed cleanup pass lease expires (crashed holder)",
+    )
+    cleanup_resume_max_age_hours: int = Field(
+        default=24,
+        ge=0,
+        description="A follow-up pass resumes a checkpoint up to this old instead of re-listing",
+    )
+    cleanup_owned_only: bool = Field(
+        default=False,
+        description="Only list/delete runners this stack registered (name prefix, labels, group)",
+    )
+    cleanup_priority: str = Field(
+        default="",
+        description="Deletion order: comma-separated offline, age, group_cap, labels (empty = API order)",
+    )
+    cleanup_priority_labels: str = Field(
+        default="",
+        description="Comma-separated labels whose runners the 'labels' ranking deletes first",
+    )
+    cleanup_list_hedge: bool = Field(
+        default=False,
+        description="Re-request runner list pages slower than the hedge deadline; first answer wins",
+    )
+    cleanup_list_hedge_percentile: float = Field(
+        default=0.90,
+        ge=0.5,
+        le=0.999,
+        description="Hedge deadline: this percentile of recent page latencies",
+    )
+    cleanup_list_hedge_min_delay: float = Field(
+        default=1.0,
+        ge=0.0,
+        description="Never hedge a page sooner than this many seconds",
+    )
+    cleanup_list_hedge_initial_delay: float = Field(
+        default=5.0,
+        ge=0.0,
+        description="Hedge deadline until enough page latencies are known",
+    )
+    cleanup_list_hedge_budget_pct: float = Field(
+        default=0.10,
+        ge=0.0,
+        le=1.0,
+        description="At most this many extra requests per list page request (recent history)",
+    )
+    cleanup_circuit_breaker: bool = Field(
+        default=True,
+        description="Stop a pass early while GitHub answers with 5xx / times out",
+    )
+    cleanup_circuit_window_seconds: int = Field(
+        default=120,
+        ge=10,
+        description="Rolling window the circuit breaker's error rate is measured over",
+    )
+    cleanup_circuit_min_requests: int = Field(
+        default=10,
+        ge=1,
+        description="Requests within the window before the error rate can open the circuit",
+    )
+    cleanup_circuit_failure_ratio: float = Field(
+        default=0.5,
+        gt=0.0,
+        le=1.0,
+        description="Fraction of failed requests within the window that opens the circuit",
+    )
+    cleanup_circuit_cooldown_seconds: int = Field(
+        default=300,
+        ge=10,
+        description="Seconds an open circuit waits before its first probe (doubles per failed probe)",
+    )
+    cleanup_circuit_follow_up: bool = Field(
+        default=True,
+        description="Service mode: probe an open circuit and resume the pass as soon as GitHub recovers",
     )
     cleanup_run_on_startup: bool = Field(
         default=False,
@@ -105,7 +224,376 @@ class Settings(BaseSettings):
         description="Hours between cleanup runs (interval mode). Default 168 = weekly",
     )
 
+    # === DinD cache manager (--dind-gc) ===
+    dind_host: str = Field(
+        default="tcp://docker-in-docker:2375",
+        description="Docker API endpoint of the stack's DinD daemon",
+    )
+    dind_gc_interval_seconds: int = Field(
+        default=300,
+        ge=10,
+        description="Seconds between disk-pressure checks",
+    )
+    dind_gc_high_watermark: float = Field(
+        default=0.85,
+        gt=0.0,
+        le=1.0,
+        description="Start evicting when DinD disk usage exceeds this fraction",
+    )
+    dind_gc_low_watermark: float = Field(
+        default=0.70,
+        gt=0.0,
+        le=1.0,
+        description="Stop evicting once DinD disk usage is back below this fraction",
+    )
+    dind_gc_data_path: str = Field(
+        default="",
+        description="Opt-in: measure statvfs of this read-only dind-data mount instead of the budget",
+    )
+    dind_gc_capacity_gb: float = Field(
+        default=100.0,
+        gt=0.0,
+        description="Budget in GB for DinD images + build cache the watermarks apply to",
+    )
+
+    # === DinD job telemetry (--dind-telemetry) ===
+    dind_telemetry_bind: str = Field(
+        default="0.0.0.0",
+        description="Address the telemetry HTTP API (hooks, /metrics) listens on",
+    )
+    dind_telemetry_port: int = Field(
+        default=8781,
+        ge=1,
+        le=65535,
+        description="Port of the telemetry HTTP API",
+    )
+    dind_telemetry_bucket_seconds: int = Field(
+        default=60,
+        ge=5,
+        description="Width of one daemon-total bucket (saturation resolution)",
+    )
+    dind_telemetry_window_hours: float = Field(
+        default=24.0,
+        gt=0.0,
+        description="History of daemon-total buckets kept in the ring buffer",
+    )
+    dind_telemetry_max_jobs: int = Field(
+        default=500,
+        ge=10,
+        description="Finished jobs whose usage totals are kept",
+    )
+    dind_telemetry_max_job_hours: float = Field(
+        default=24.0,
+        gt=0.0,
+        description="A job without a job-completed hook is closed after this many hours",
+    )
+    dind_telemetry_saturation_pct: float = Field(
+        default=0.9,
+        gt=0.0,
+        le=1.0,
+        description="A bucket above this fraction of the CPU or memory limit is saturated",
+    )
+    dind_cpu_limit: float = Field(
+        default=16.0,
+        gt=0.0,
+        description="CPU limit of the DinD service, per shard with multi-DinD (DIND_CPU_LIMIT)",
+    )
+    dind_memory_limit: str = Field(
+        default="32g",
+        description="Memory limit of the DinD service, per shard with multi-DinD (DIND_MEMORY_LIMIT)",
+    )
+
+    # === Multi-DinD placement (--dind-placement) ===
+    dind_shards: str = Field(
+        default="",
+        description="Comma-separated Docker API endpoints of all DinD shards (empty = DIND_HOST only)",
+    )
+    dind_placement_bind: str = Field(
+        default="0.0.0.0",
+        description="Address the placement HTTP API listens on",
+    )
+    dind_placement_port: int = Field(
+        default=8782,
+        ge=1,
+        le=65535,
+        description="Port of the placement HTTP API",
+    )
+    dind_placement_interval_seconds: int = Field(
+        default=15,
+        ge=5,
+        description="Seconds between shard health/load samples",
+    )
+    dind_placement_unhealthy_after: int = Field(
+        default=2,
+        ge=1,
+        description="Failed health checks in a row before a shard leaves rotation",
+    )
+    dind_placement_host_docker: str = Field(
+        default="",
+        description="Host Docker daemon of the agent containers; enables moving idle agents",
+    )
+    dind_placement_rebalance_threshold: float = Field(
+        default=0.3,
+        ge=0.0,
+        description="Score gap between hottest and coolest shard that moves an idle agent",
+    )
+    dind_placement_move_cooldown_seconds: int = Field(
+        default=600,
+        ge=0,
+        description="An agent is moved at most once per this many seconds",
+    )
+    dind_placement_restart_grace: int = Field(
+        default=300,
+        ge=0,
+        description="Stop grace of a moved agent (a job that just landed on it can finish)",
+    )
+
+    # === Image pre-warmer (--prewarm) ===
+    prewarm_interval_seconds: int = Field(
+        default=120,
+        ge=10,
+        description="Seconds between pull-event scans / pre-warm checks",
+    )
+    prewarm_top_n: int = Field(
+        default=10,
+        ge=1,
+        description="Number of hottest images to keep warm in DinD",
+    )
+    prewarm_half_life_hours: float = Field(
+        default=72.0,
+        gt=0.0,
+        description="Half-life of an image pull's contribution to the heat score",
+    )
+    prewarm_idle_max_containers: int = Field(
+        default=0,
+        ge=0,
+        description="DinD counts as idle with at most this many running containers",
+    )
+    prewarm_refresh_hours: float = Field(
+        default=24.0,
+        gt=0.0,
+        description="Re-pull present hot images at most this often (idle windows only)",
+    )
+
+    # === Shared tool-cache broker (--tool-cache-broker) ===
+    tool_cache_dir: str = Field(
+        default="/opt/hostedtoolcache",
+        description="Root of the shared tool-cache volume (broker is its only writer)",
+    )
+    tool_cache_bind: str = Field(
+        default="0.0.0.0",
+        description="Address the broker HTTP API listens on",
+    )
+    tool_cache_port: int = Field(
+        default=8780,
+        ge=1,
+        le=65535,
+        description="Port of the broker HTTP API",
+    )
+    tool_cache_allowed_hosts: str = Field(
+        default="github.com,githubusercontent.com,nodejs.org,python.org,go.dev,dl.google.com,download.java.net,adoptium.net",
+        description="Comma-separated hosts (and their subdomains) /ensure may download from",
+    )
+    tool_cache_gc_days: int = Field(
+        default=30,
+        ge=1,
+        description="Remove tool versions not used for N days",
+    )
+    tool_cache_populate_timeout: int = Field(
+        default=900,
+        ge=30,
+        description="Seconds a single populate (download + unpack) may take",
+    )
+    tool_cache_max_upload_mb: int = Field(
+        default=4096,
+        ge=1,
+        description="Largest tarball an agent may upload for promotion",
+    )
+
+    # === JIT runner config broker (--jit-broker) ===
+    jit_broker_mode: Literal["jit", "token"] = Field(
+        default="jit",
+        description="Hand out JIT runner configs, or shared registration tokens",
+    )
+    jit_broker_socket: str = Field(
+        default="/run/jit-broker/broker.sock",
+        description="Unix socket the broker serves agents on (shared volume)",
+    )
+    jit_pool_size: int = Field(
+        default=2,
+        ge=0,
+        le=50,
+        description="JIT configs kept pre-generated and ready to hand out",
+    )
+    jit_pool_max_age_seconds: int = Field(
+        default=1800,
+        ge=60,
+        description="Unclaimed JIT registrations older than this are deleted and replaced",
+    )
+    jit_lease_timeout_seconds: int = Field(
+        default=600,
+        ge=30,
+        description="A handed-out JIT runner still offline after this long is deleted as unused",
+    )
+    jit_refill_interval_seconds: int = Field(
+        default=15,
+        ge=1,
+        description="Seconds between pool refill / lease checks",
+    )
+    runner_name_prefix: str = Field(
+        default="self-hosted",
+        description="Name prefix of the runners this stack registers",
+    )
+    runner_labels: str = Field(
+        default="docker",
+        description="Comma-separated custom labels of the runners this stack registers",
+    )
+    runner_group: str = Field(
+        default="Default",
+        description="Runner group new registrations join (org scope)",
+    )
+    runner_workdir: str = Field(
+        default="/tmp/runner/work",
+        description="Work folder baked into JIT runner configs",
+    )
+    jit_base_labels: str = Field(
+        default="self-hosted,Linux,X64",
+        description="Default labels a JIT runner must carry explicitly (OS/arch)",
+    )
+
+    # === Crashed-agent watcher (--agent-watch) ===
+    agent_watch_docker_host: str = Field(
+        default="unix:///var/run/docker.sock",
+        description="Host Docker daemon the agent containers run on",
+    )
+    agent_watch_project: str = Field(
+        default="",
+        description="Compose project of the agents to watch (empty = any project)",
+    )
+    agent_watch_delay_seconds: int = Field(
+        default=30,
+        ge=0,
+        description="Wait after a crash before looking the runner up on GitHub",
+    )
+    agent_watch_interval_seconds: int = Field(
+        default=15,
+        ge=1,
+        description="Seconds between deregistration queue runs",
+    )
+    agent_watch_max_attempts: int = Field(
+        default=5,
+        ge=1,
+        description="Lookups/deletes per crashed agent before leaving it to the scheduled pass",
+    )
+    agent_watch_stuck_interval_seconds: int = Field(
+        default=300,
+        ge=0,
+        description="Seconds between stuck online+busy runner sweeps (0 = disabled)",
+    )
+    agent_watch_busy_max_seconds: int = Field(
+        default=21600,
+        ge=60,
+        description="Busy longer than this on a running agent counts as wedged (default job timeout: 6h)",
+    )
+    agent_watch_restart_wedged: bool = Field(
+        default=False,
+        description="Restart wedged agents instead of only flagging them in the log",
+    )
+    agent_watch_restart_grace: int = Field(
+        default=30,
+        ge=0,
+        description="Stop grace in seconds when restarting a wedged agent",
+    )
+
+    # === Runner inventory server (--inventory) ===
+    inventory_bind: str = Field(
+        default="0.0.0.0",
+        description="Address the inventory HTTP API listens on",
+    )
+    inventory_port: int = Field(
+        default=8783,
+        ge=1,
+        le=65535,
+        description="Port of the inventory HTTP API",
+    )
+    inventory_interval_seconds: int = Field(
+        default=60,
+        ge=10,
+        description="Seconds between conditional (ETag) inventory refreshes",
+    )
+
+    # === Runner utilization sampler (--utilization) ===
+    utilization_interval_seconds: int = Field(
+        default=60,
+        ge=10,
+        description="Seconds between utilization samples (ETag-conditional listing)",
+    )
+    utilization_retention_days: int = Field(
+        default=28,
+        ge=1,
+        description="Days of utilization samples kept",
+    )
+    utilization_headroom_pct: float = Field(
+        default=0.20,
+        ge=0.0,
+        le=2.0,
+        description="Headroom on top of the p95 busy count in the agent sizing hint",
+    )
+
+    # === Fleet status (--status) ===
+    status_docker_host: str = Field(
+        default="unix:///var/run/docker.sock",
+        description="Host Docker daemon the agent and DinD containers run on",
+    )
+    status_project: str = Field(
+        default="",
+        description="Compose project to report containers of (empty = any project)",
+    )
+
+    # === Agent startup benchmark (--agent-bench) ===
+    agent_bench_docker_host: str = Field(
+        default="unix:///var/run/docker.sock",
+        description="Host Docker daemon the agent containers run on",
+    )
+    agent_bench_project: str = Field(
+        default="",
+        description="Compose project of the agents to watch (empty = any project)",
+    )
+    agent_bench_poll_seconds: int = Field(
+        default=3,
+        ge=1,
+        description="Seconds between runner-list polls (resolution of the GitHub-side times)",
+    )
+    agent_bench_timeout_seconds: int = Field(
+        default=300,
+        ge=30,
+        description="Give up on an agent that is not online (or not deregistered) after this long",
+    )
+    agent_bench_runner_label: str = Field(
+        default="agent-bench",
+        description="Only label of burst runners, so no workflow job lands on them",
+    )
+    agent_bench_stop_grace: int = Field(
+        default=30,
+        ge=0,
+        description="Seconds a burst agent gets to deregister before it is killed",
+    )
+
+    # === Tracing ===
+    cleanup_trace_file: str = Field(
+        default="",
+        description="Append OTLP/JSON span batches of each pass to this file (empty = off)",
+    )
+    otel_exporter_otlp_endpoint: str = Field(
+        default="",
+        description="OTLP/HTTP collector base URL; spans are POSTed to <url>/v1/traces",
+    )
+
     # === Misc ===
+    state_dir: str = Field(
+        default="/var/lib/cleanup-manager",
+        description="Directory for persisted state (named volume in compose)",
+    )
     log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = Field(
         default="INFO",
         description="Logging verbosity",
@@ -158,6 +646,37 @@ class Settings(BaseSettings):
         """True if GitHub App credentials look usable."""
         return bool((self.app_id or "").strip())
 
+    @model_validator(mode="after")
+    def _validate_watermarks(self) -> "Settings":
+        if self.dind_gc_low_watermark >= self.dind_gc_high_watermark:
+            raise ValueError(
+                "DIND_GC_LOW_WATERMARK must be below DIND_GC_HIGH_WATERMARK"
+            )
+        return self
+
+    @field_validator("cleanup_window")
+    @classmethod
+    def _validate_window(cls, v: str) -> str:
+        v = v.strip()
+        if v and not re.fullmatch(r"([01]?\d|2[0-3]):[0-5]\d\s*-\s*([01]?\d|2[0-3]):[0-5]\d", v):
+            raise ValueError(f"Invalid cleanup window '{v}'. Use HH:MM-HH:MM, e.g. 01:00-06:00")
+        if v:
+            start, end = ([int(x) for x in part.strip().split(":")] for part in v.split("-"))
+            if start == end:
+                raise ValueError(f"Invalid cleanup window '{v}': start and end are equal")
+        return v
+
+    @field_validator("cleanup_priority")
+    @classmethod
+    def _validate_priority(cls, v: str) -> str:
+        keys = [k.strip() for k in v.split(",") if k.strip()]
+        for key in keys:
+            if key not in ("offline", "age", "group_cap", "labels"):
+                raise ValueError(
+                    f"Invalid cleanup priority '{key}'. Use offline, age, group_cap, labels"
+                )
+        return ",".join(keys)
+
     @field_validator("cleanup_schedule_day_of_week")
     @classmethod
     def _validate_dow(cls, v: str) -> str:
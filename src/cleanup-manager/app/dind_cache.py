@@ -0,0 +1,268 @@
+"""
+Cleanup Manager - DinD Image & Build-Cache Manager
+
+Keeps the dind-data volume below a disk-usage high watermark without
+throwing away the warm layer and BuildKit cache wholesale. Every tick:
+
+    1. Observe: record "last used" for every image referenced by a
+       container (running or not) and for every image named in
+       container create/start and image pull events since the previous
+       tick (a fresh pull, e.g. by the image pre-warmer, is a use - not
+       an LRU victim aged by its build date). BuildKit
+       already tracks LastUsedAt per cache record.
+    2. Measure: DinD's own images + build cache (`docker system df`)
+       against DIND_GC_CAPACITY_GB. Opt-in alternative: statvfs on a
+       read-only mount of the volume (DIND_GC_DATA_PATH) - that counts
+       everything on the host filesystem behind /var/lib/docker, so it
+       only fits a volume on a dedicated filesystem.
+    3. Evict: above the high watermark, remove images and cache records
+       in least-recently-used order until usage drops below the low
+       watermark. Images referenced by any container and cache records
+       that are in use or shared with images are never touched.
+
+Last-used times are persisted in STATE_DIR so an update of this
+container does not reset the LRU order.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from config import Settings
+from console import cleanup_logger, fmt_duration
+from docker_api import DockerAPIError, DockerClient
+from image_prewarm import normalize_ref
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "dind-cache.json"
+GB = 1024 ** 3
+
+
+@dataclass
+class EvictionCandidate:
+    kind: str          # "image" | "build-cache"
+    id: str
+    label: str
+    size: int
+    last_used: float
+    # Bytes its removal frees (an image's layers shared with other
+    # images stay on disk)
+    exclusive: int = 0
+
+
+def fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024:
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}TB"
+
+
+def _parse_docker_time(s: str) -> float:
+    """Parse Docker's RFC3339Nano timestamps (nanoseconds, trailing Z)."""
+    if not s or s.startswith("0001-"):
+        return 0.0
+    base = s.rstrip("Z").split("+")[0]
+    if "." in base:
+        head, frac = base.split(".", 1)
+        base = f"{head}.{frac[:6]}"
+        fmt = "%Y-%m-%dT%H:%M:%S.%f"
+    else:
+        fmt = "%Y-%m-%dT%H:%M:%S"
+    try:
+        return datetime.strptime(base, fmt).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class DindCacheManager:
+    """LRU eviction of DinD images and build cache driven by disk pressure."""
+
+    def __init__(self, settings: Settings, client: DockerClient | None = None):
+        self.settings = settings
+        self.client = client or DockerClient(settings.dind_host)
+        self._state_file = state_path(settings, STATE_FILE)
+        state = load_json(self._state_file, {}) or {}
+        self.last_used: dict[str, float] = dict(state.get("images", {}))
+        self.events_since: float = float(state.get("events_since", time.time()))
+
+    # ---- Observation ----
+
+    def observe(self, images: list[dict], containers: list[dict]) -> None:
+        """Refresh image last-used times from containers and recent events."""
+        now = time.time()
+        tag_to_id = {
+            normalize_ref(ref): img["Id"]
+            for img in images
+            for ref in (img.get("RepoTags") or []) + (img.get("RepoDigests") or [])
+        }
+
+        for c in containers:
+            image_id = c.get("ImageID")
+            if not image_id:
+                continue
+            if c.get("State") == "running":
+                self.last_used[image_id] = now
+            else:
+                self.last_used.setdefault(image_id, float(c.get("Created") or now))
+
+        try:
+            events = self.client.events(
+                self.events_since,
+                now,
+                {"type": ["container", "image"], "event": ["create", "start", "pull"]},
+            )
+        except (OSError, DockerAPIError) as e:
+            cleanup_logger.debug(f"Could not read DinD events: {e}")
+            events = []
+        for ev in events:
+            actor = ev.get("Actor") or {}
+            if ev.get("Type") == "image":
+                ref = actor.get("ID") or ev.get("id") or ""
+            else:
+                ref = ev.get("from") or actor.get("Attributes", {}).get("image", "")
+            image_id = ref if ref.startswith("sha256:") else (
+                tag_to_id.get(normalize_ref(ref)) if ref else None
+            )
+            if image_id:
+                ts = ev.get("timeNano", 0) / 1e9 or float(ev.get("time") or now)
+                self.last_used[image_id] = max(self.last_used.get(image_id, 0.0), ts)
+        self.events_since = now
+
+        # Never-seen images start at their creation time; forget removed ones.
+        present = {img["Id"] for img in images}
+        for img in images:
+            self.last_used.setdefault(img["Id"], float(img.get("Created") or 0))
+        self.last_used = {k: v for k, v in self.last_used.items() if k in present}
+
+    def save(self) -> None:
+        save_json(self._state_file, {"images": self.last_used, "events_since": self.events_since})
+
+    # ---- Measurement ----
+
+    def disk_usage(self, df: dict | None = None) -> tuple[float, str]:
+        """Return (used fraction, human description) of the DinD store."""
+        path = self.settings.dind_gc_data_path
+        if path:
+            if not os.path.isdir(path):
+                raise RuntimeError(f"Cannot measure DinD disk usage: {path} is not mounted")
+            st = os.statvfs(path)
+            total = st.f_blocks * st.f_frsize
+            free = st.f_bavail * st.f_frsize
+            if total > 0:
+                used = total - free
+                return used / total, f"{fmt_bytes(used)}/{fmt_bytes(total)} on {path}"
+        df = df if df is not None else self.client.system_df()
+        used = int(df.get("LayersSize") or 0) + sum(
+            int(b.get("Size") or 0) for b in df.get("BuildCache") or []
+        )
+        cap = self.settings.dind_gc_capacity_gb * GB
+        return used / cap, f"{fmt_bytes(used)}/{fmt_bytes(cap)} budget"
+
+    # ---- Eviction ----
+
+    def candidates(self, df: dict, containers: list[dict]) -> list[EvictionCandidate]:
+        """All evictable objects, least recently used first."""
+        protected = {c.get("ImageID") for c in containers}
+        out: list[EvictionCandidate] = []
+        for img in df.get("Images") or []:
+            image_id = img.get("Id")
+            if not image_id or image_id in protected or int(img.get("Containers") or 0) > 0:
+                continue
+            tags = [t for t in img.get("RepoTags") or [] if t != "<none>:<none>"]
+            size = int(img.get("Size") or 0)
+            # SharedSize is -1 when the daemon did not compute it
+            shared = max(int(img.get("SharedSize") or 0), 0)
+            out.append(EvictionCandidate(
+                kind="image",
+                id=image_id,
+                label=tags[0] if tags else image_id[7:19],
+                size=size,
+                last_used=self.last_used.get(image_id, float(img.get("Created") or 0)),
+                exclusive=max(size - shared, 0),
+            ))
+        for rec in df.get("BuildCache") or []:
+            if rec.get("InUse") or rec.get("Shared"):
+                continue
+            last = _parse_docker_time(rec.get("LastUsedAt") or "") or _parse_docker_time(
+                rec.get("CreatedAt") or ""
+            )
+            out.append(EvictionCandidate(
+                kind="build-cache",
+                id=rec.get("ID", ""),
+                label=f"{rec.get('Type', 'cache')} {(rec.get('Description') or '')[:40]}".strip(),
+                size=int(rec.get("Size") or 0),
+                last_used=last,
+                exclusive=int(rec.get("Size") or 0),
+            ))
+        out.sort(key=lambda c: c.last_used)
+        return out
+
+    def evict(self, cand: EvictionCandidate) -> int:
+        """Remove one object. Returns bytes freed (as reported or estimated)."""
+        if cand.kind == "image":
+            # force=1 only untags multi-tag images; images referenced by a
+            # container were excluded above, and Docker still refuses
+            # to remove an image a container started in the meantime.
+            self.client.request("DELETE", f"/images/{cand.id}", {"force": "1", "noprune": "0"})
+            self.last_used.pop(cand.id, None)
+            return cand.exclusive
+        result = self.client.request(
+            "POST", "/build/prune", {"filters": {"id": [cand.id]}}, timeout=120.0
+        ) or {}
+        return int(result.get("SpaceReclaimed") or cand.exclusive)
+
+    def tick(self) -> None:
+        s = self.settings
+        df = self.client.system_df()
+        containers = self.client.containers(all_=True)
+        self.observe(df.get("Images") or [], containers)
+        self.save()
+
+        usage, desc = self.disk_usage(df)
+        if usage < s.dind_gc_high_watermark:
+            cleanup_logger.debug(
+                f"DinD disk {usage:.0%} ({desc}) below high watermark "
+                f"{s.dind_gc_high_watermark:.0%}"
+            )
+            return
+
+        cleanup_logger.warning(
+            f"DinD disk {usage:.0%} ({desc}) above high watermark "
+            f"{s.dind_gc_high_watermark:.0%}, evicting LRU down to {s.dind_gc_low_watermark:.0%}"
+        )
+        now = time.time()
+        evicted = 0
+        reclaimed = 0
+        for cand in self.candidates(df, containers):
+            try:
+                freed = self.evict(cand)
+            except DockerAPIError as e:
+                # 409: a container grabbed the image since we listed
+                cleanup_logger.debug(f"Skip {cand.kind} {cand.label}: {e}")
+                continue
+            evicted += 1
+            reclaimed += freed
+            cleanup_logger.status(
+                f"  evicted {cand.kind} {cand.label} ({fmt_bytes(cand.size)}, "
+                f"idle {fmt_duration(now - cand.last_used)})"
+            )
+            if s.dind_gc_data_path:
+                usage, desc = self.disk_usage()
+            else:
+                usage -= freed / (s.dind_gc_capacity_gb * GB)
+            if usage < s.dind_gc_low_watermark:
+                break
+        self.save()
+
+        if usage < s.dind_gc_low_watermark:
+            cleanup_logger.success(
+                f"Evicted {evicted} objects ({fmt_bytes(reclaimed)}), DinD disk now {usage:.0%}"
+            )
+        else:
+            cleanup_logger.warning(
+                f"Evicted {evicted} objects ({fmt_bytes(reclaimed)}) but DinD disk is still "
+                f"{usage:.0%} - remaining data is in use by containers or volumes"
+            )
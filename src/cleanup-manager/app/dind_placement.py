@@ -0,0 +1,316 @@
+"""
+Cleanup Manager - Multi-DinD Placement Controller
+
+With docker-compose.multi-dind.yml the stack runs several DinD daemons
+(shards, DIND_SHARDS) instead of one, each with its own data volume and
+CPU/memory limits. Every agent asks this controller for a daemon when
+its container starts (scripts/agent-hooks/dind-placement-entrypoint.sh)
+and uses it as DOCKER_HOST for its one ephemeral job.
+
+Every tick the controller samples each shard:
+  - health: /_ping; DIND_PLACEMENT_UNHEALTHY_AFTER failed checks in a
+    row take the shard out of rotation, one success puts it back
+  - load:   running containers, CPU cores used (delta of cumulative CPU
+    time between ticks) and memory, from one-shot container stats
+
+A new agent goes to the healthy shard with the lowest score:
+
+    score = max(cpu used / cpu limit, memory used / memory limit)
+            + AGENT_WEIGHT * agents placed there
+            + CONTAINER_WEIGHT * running containers
+
+Agents keep their daemon for the job they run, so placement adapts on
+every ephemeral restart. Idle agents (online, not busy on GitHub) are
+moved sooner when the controller can reach the host Docker daemon
+(DIND_PLACEMENT_HOST_DOCKER): an idle agent on an unhealthy shard, or
+on a shard whose score is DIND_PLACEMENT_REBALANCE_THRESHOLD above the
+coolest one, is restarted (at most one per tick, each agent at most
+once per DIND_PLACEMENT_MOVE_COOLDOWN_SECONDS) and placed again.
+"""
+
+import threading
+import time
+import urllib.error
+from dataclasses import dataclass, field
+
+from auth import resolve_token
+from config import Settings
+from console import cleanup_logger
+from dind_telemetry import container_memory, parse_size
+from docker_api import DockerAPIError, DockerClient
+from github_api import list_runners
+from httpd import parse_json_body, start_server
+from jit_broker import API_TOKEN_TTL
+from jit_broker import STATE_FILE as JIT_STATE_FILE
+from rate_limit import RateLimit
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "dind-placement.json"
+AGENT_WEIGHT = 0.05
+CONTAINER_WEIGHT = 0.01
+AGENT_SERVICE_LABEL = "com.docker.compose.service=agent"
+
+_API_ERRORS = (urllib.error.URLError, OSError, ValueError, RuntimeError, KeyError)
+
+
+@dataclass
+class Shard:
+    """One DinD daemon and its last load sample."""
+
+    host: str
+    client: DockerClient
+    healthy: bool = True
+    failures: int = 0
+    containers: int = 0
+    cores: float = 0.0
+    mem: float = 0.0
+    sampled_at: float = 0.0
+    # Container ID -> cumulative CPU ns at the previous sample
+    cpu_ns: dict[str, float] = field(default_factory=dict)
+
+
+class PlacementController:
+    """Assigns agents to the least-loaded healthy DinD shard."""
+
+    def __init__(self, settings: Settings, clients: dict[str, DockerClient] | None = None):
+        self.settings = settings
+        hosts = [h.strip() for h in settings.dind_shards.split(",") if h.strip()]
+        hosts = hosts or [settings.dind_host]
+        clients = clients or {}
+        self.shards = {h: Shard(h, clients.get(h) or DockerClient(h)) for h in hosts}
+        self.cpu_limit = settings.dind_cpu_limit
+        self.mem_limit = parse_size(settings.dind_memory_limit)
+        self._lock = threading.Lock()
+        self._state_file = state_path(settings, STATE_FILE)
+        state = load_json(self._state_file, {}) or {}
+        # Agent hostname (12-char container ID) -> {shard, at, moved_at}
+        self.assignments: dict[str, dict] = {
+            client: a for client, a in state.get("assignments", {}).items()
+            if a.get("shard") in self.shards
+        }
+        self.host_docker = (
+            DockerClient(settings.dind_placement_host_docker)
+            if settings.dind_placement_host_docker
+            else None
+        )
+        self.rate = RateLimit(reserve_pct=settings.cleanup_reserve_pct)
+        self._token: str | None = None
+        self._token_at = 0.0
+
+    def save(self) -> None:
+        with self._lock:
+            doc = {"assignments": dict(self.assignments)}
+        save_json(self._state_file, doc)
+
+    # ---- Load ----
+
+    def _agents_on(self, host: str) -> int:
+        return sum(1 for a in self.assignments.values() if a["shard"] == host)
+
+    def score(self, shard: Shard) -> float:
+        cpu = shard.cores / self.cpu_limit if self.cpu_limit else 0.0
+        mem = shard.mem / self.mem_limit if self.mem_limit else 0.0
+        return (
+            max(cpu, mem)
+            + AGENT_WEIGHT * self._agents_on(shard.host)
+            + CONTAINER_WEIGHT * shard.containers
+        )
+
+    def sample(self, shard: Shard) -> None:
+        """Refresh health and load of one shard."""
+        if not shard.client.ping():
+            shard.failures += 1
+            if shard.healthy and shard.failures >= self.settings.dind_placement_unhealthy_after:
+                shard.healthy = False
+                cleanup_logger.warning(f"DinD shard {shard.host} unhealthy, out of rotation")
+            return
+        if not shard.healthy:
+            cleanup_logger.success(f"DinD shard {shard.host} healthy again, back in rotation")
+        shard.healthy, shard.failures = True, 0
+
+        now = time.time()
+        elapsed = now - shard.sampled_at if shard.sampled_at else 0.0
+        cpu_ns: dict[str, float] = {}
+        used_ns = mem = 0.0
+        running = shard.client.containers()
+        params = {"stream": "false", "one-shot": "true"}
+        for c in running:
+            try:
+                stats = shard.client.request("GET", f"/containers/{c['Id']}/stats", params) or {}
+            except DockerAPIError:
+                continue  # exited between list and stats
+            usage = (stats.get("cpu_stats") or {}).get("cpu_usage") or {}
+            total = float(usage.get("total_usage", 0))
+            cpu_ns[c["Id"]] = total
+            if c["Id"] in shard.cpu_ns:
+                used_ns += max(total - shard.cpu_ns[c["Id"]], 0.0)
+            mem += container_memory(stats)
+        shard.cpu_ns = cpu_ns
+        shard.containers = len(running)
+        shard.cores = used_ns / 1e9 / elapsed if elapsed > 0 else 0.0
+        shard.mem = mem
+        shard.sampled_at = now
+
+    # ---- Placement ----
+
+    def assign(self, client: str) -> dict | None:
+        """Pick the daemon for agent `client`; None when no shard is healthy."""
+        with self._lock:
+            healthy = [s for s in self.shards.values() if s.healthy]
+            if not healthy:
+                return None
+            # Re-placing an agent must not count its own previous slot
+            previous = self.assignments.pop(client, None)
+            best = min(healthy, key=lambda s: (self.score(s), self._agents_on(s.host)))
+            self.assignments[client] = {
+                "shard": best.host,
+                "at": time.time(),
+                "moved_at": (previous or {}).get("moved_at", 0.0),
+            }
+            score = self.score(best)
+        self.save()
+        cleanup_logger.status(f"  placed {client or 'agent'} on {best.host} (score {score:.2f})")
+        return {"docker_host": best.host, "score": round(score, 3)}
+
+    # ---- Rebalancing (needs the host Docker daemon) ----
+
+    def _github_token(self) -> str:
+        if self._token is None or time.time() - self._token_at > API_TOKEN_TTL:
+            self._token, _ = resolve_token(self.settings)
+            self._token_at = time.time()
+        return self._token
+
+    def _idle_agents(self) -> set[str]:
+        """Hostnames of agents whose runner is online and not running a job."""
+        prefix = self.settings.runner_name_prefix
+        leased = (load_json(state_path(self.settings, JIT_STATE_FILE), {}) or {}).get("leased", {})
+        jit = {lease["name"]: lease.get("client", "") for lease in leased.values()}
+        idle = set()
+        for r in list_runners(self.settings.api_scope, self._github_token(), self.rate):
+            if r.get("status") != "online" or r.get("busy"):
+                continue
+            name = r.get("name", "")
+            if name in jit:
+                idle.add(jit[name])
+            elif name.startswith(f"{prefix}-"):
+                idle.add(name[len(prefix) + 1:])
+        return idle
+
+    def _prune(self) -> None:
+        """Forget assignments of agent containers that no longer exist."""
+        running = {
+            c["Id"][:12]
+            for c in self.host_docker.containers(filters={"label": [AGENT_SERVICE_LABEL]})
+        }
+        with self._lock:
+            for client in [c for c in self.assignments if c not in running]:
+                del self.assignments[client]
+
+    def _pick_move(self, idle: set[str]) -> tuple[str, str] | None:
+        """(agent, reason) of the one idle agent worth moving, if any."""
+        now = time.time()
+        cooldown = self.settings.dind_placement_move_cooldown_seconds
+        with self._lock:
+            movable = {
+                client: a for client, a in self.assignments.items()
+                if client in idle and now - a.get("moved_at", 0.0) > cooldown
+            }
+            for client, a in movable.items():
+                if not self.shards[a["shard"]].healthy:
+                    return client, f"{a['shard']} is unhealthy"
+            healthy = [s for s in self.shards.values() if s.healthy]
+            if len(healthy) < 2:
+                return None
+            coolest = min(healthy, key=self.score)
+            for shard in sorted(healthy, key=self.score, reverse=True):
+                gap = self.score(shard) - self.score(coolest)
+                if gap <= self.settings.dind_placement_rebalance_threshold:
+                    return None
+                for client, a in movable.items():
+                    if a["shard"] == shard.host:
+                        return client, f"{shard.host} is {gap:.2f} above {coolest.host}"
+        return None
+
+    def rebalance(self) -> None:
+        if self.host_docker is None:
+            return
+        self._prune()
+        # Ask GitHub which agents are idle only when a move is possible at all
+        if self._pick_move(set(self.assignments)) is None:
+            return
+        try:
+            idle = self._idle_agents()
+        except _API_ERRORS as e:
+            cleanup_logger.warning(f"Cannot list runners, skipping rebalance: {e}")
+            return
+        move = self._pick_move(idle)
+        if move is None:
+            return
+        client, reason = move
+        with self._lock:
+            self.assignments[client]["moved_at"] = time.time()
+        grace = self.settings.dind_placement_restart_grace
+        cleanup_logger.info(f"Moving idle agent {client}: {reason}")
+        try:
+            # restart keeps the restart policy (stop would not come back);
+            # the agent is placed again by its entrypoint on the way up
+            self.host_docker.request(
+                "POST", f"/containers/{client}/restart", {"t": grace}, timeout=grace + 30
+            )
+        except (OSError, DockerAPIError) as e:
+            cleanup_logger.warning(f"Could not restart agent {client}: {e}")
+
+    # ---- Service ----
+
+    def tick(self) -> None:
+        for shard in self.shards.values():
+            try:
+                self.sample(shard)
+            except (OSError, DockerAPIError) as e:
+                cleanup_logger.warning(f"Sampling DinD shard {shard.host} failed: {e}")
+        self.rebalance()
+        self.save()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "shards": [
+                    {
+                        "host": s.host,
+                        "healthy": s.healthy,
+                        "agents": self._agents_on(s.host),
+                        "containers": s.containers,
+                        "cores": round(s.cores, 2),
+                        "mem": s.mem,
+                        "score": round(self.score(s), 3),
+                    }
+                    for s in self.shards.values()
+                ],
+                "assignments": dict(self.assignments),
+            }
+
+    def routes(self) -> dict:
+        def assign(query, body, _handler):
+            data = {**query, **parse_json_body(body)}
+            placed = self.assign(str(data.get("client", ""))[:128])
+            if placed is None:
+                return 503, {"error": "no healthy DinD shard"}
+            return 200, placed
+
+        def status(_query, _body, _handler):
+            return 200, self.status()
+
+        def health(_query, _body, _handler):
+            return 200, "ok"
+
+        return {
+            ("POST", "/assign"): assign,
+            ("GET", "/status"): status,
+            ("GET", "/healthz"): health,
+        }
+
+    def serve(self) -> None:
+        start_server(
+            self.settings.dind_placement_bind, self.settings.dind_placement_port, self.routes()
+        )
@@ -0,0 +1,598 @@
+"""
+Cleanup Manager - DinD Per-Job Resource Telemetry
+
+All agents share one DinD daemon (DIND_CPU_LIMIT cores, DIND_MEMORY_LIMIT
+memory). This collector shows which jobs use it:
+
+    events   /events stream of the DinD daemon: a container start opens
+             a stats stream, its exit closes it
+    stats    one /containers/<id>/stats stream per running container;
+             CPU time, block I/O and network are turned into deltas,
+             memory (minus reclaimable page cache) is a gauge
+    jobs     a job-started / job-completed hook in every agent reports
+             the job and runner it is running (POST /jobs/start|end)
+
+Each container is attributed when it starts, in this order:
+  1. label   the workflow passed `--label github.run_id=... --label
+             github.job=...` (exact)
+  2. path    a bind mount or compose working dir under RUNNER_WORKDIR
+             names the repository, and one running job is from it
+  3. timing  the jobs running at that moment (re-evaluated on every
+             sample, so long-lived helpers like a buildx builder are
+             charged to whoever is running while they work)
+Usage of a container with several candidate jobs is split evenly
+between them ("shared"); with none it is booked as `unattributed`.
+
+Memory stays bounded: per-job totals for running jobs plus the last
+DIND_TELEMETRY_MAX_JOBS finished ones (a job whose job-completed hook
+never ran is closed when its runner starts the next job, or after
+DIND_TELEMETRY_MAX_JOB_HOURS), and a ring buffer of
+DIND_TELEMETRY_BUCKET_SECONDS totals covering DIND_TELEMETRY_WINDOW_HOURS.
+A bucket above DIND_TELEMETRY_SATURATION_PCT of the CPU or memory limit
+is saturated; consecutive ones form a saturation period, reported with
+the jobs that used most CPU during it.
+
+    GET /metrics   Prometheus text (daemon totals + top jobs)
+    GET /report    JSON: top consumers and saturation periods
+    main.py --dind-telemetry-report   the same as tables
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+
+import shutdown
+from config import Settings
+from console import cleanup_logger, console
+from dind_cache import fmt_bytes
+from docker_api import DockerAPIError, DockerClient
+from httpd import parse_json_body, start_server
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "dind-telemetry.json"
+UNATTRIBUTED = "unattributed"
+# Workflows opt into exact attribution with these container labels
+RUN_ID_LABEL = "github.run_id"
+JOB_LABEL = "github.job"
+COMPOSE_WORKDIR_LABEL = "com.docker.compose.project.working_dir"
+# Jobs exported per metric family (bounded label cardinality)
+METRICS_TOP_JOBS = 20
+# A stats stream for a container that is already gone ends immediately
+STATS_TIMEOUT = 60
+
+
+def parse_size(value: str) -> float:
+    """Compose-style memory size ('32g', '512m', '1073741824') in bytes."""
+    value = value.strip().lower().rstrip("b")
+    units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value or 0)
+
+
+@dataclass
+class JobUsage:
+    """Resources one job (or the unattributed pseudo-job) used in DinD."""
+
+    key: str
+    repository: str = ""
+    workflow: str = ""
+    job: str = ""
+    runner: str = ""
+    started: float = 0.0
+    ended: float | None = None
+    containers: int = 0
+    cpu_sec: float = 0.0
+    mem_peak: float = 0.0
+    blk_read: float = 0.0
+    blk_write: float = 0.0
+    net_rx: float = 0.0
+    net_tx: float = 0.0
+    methods: dict = field(default_factory=dict)
+
+    def active_at(self, ts: float) -> bool:
+        return self.started <= ts and (self.ended is None or ts <= self.ended)
+
+
+@dataclass
+class _Tracked:
+    """A running DinD container and its previous cumulative counters."""
+
+    id: str
+    name: str
+    owners: list[str]
+    method: str
+    cpu: float | None = None
+    blk: tuple[float, float] | None = None
+    net: tuple[float, float] | None = None
+    mem: float = 0.0
+
+
+def _job_key(data: dict) -> str:
+    """owner/repo#run_id.attempt/job - unique per job attempt."""
+    return (
+        f"{data.get('repository', '')}#{data.get('run_id', '')}."
+        f"{data.get('run_attempt') or 1}/{data.get('job', '')}"
+    )
+
+
+def _blkio(stats: dict) -> tuple[float, float]:
+    read = write = 0.0
+    for entry in (stats.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []:
+        op = str(entry.get("op", "")).lower()
+        if op == "read":
+            read += entry.get("value", 0)
+        elif op == "write":
+            write += entry.get("value", 0)
+    return read, write
+
+
+def _network(stats: dict) -> tuple[float, float]:
+    nets = (stats.get("networks") or {}).values()
+    return (
+        float(sum(n.get("rx_bytes", 0) for n in nets)),
+        float(sum(n.get("tx_bytes", 0) for n in nets)),
+    )
+
+
+def container_memory(stats: dict) -> float:
+    mem = stats.get("memory_stats") or {}
+    detail = mem.get("stats") or {}
+    # cgroup v2 / v1: page cache the kernel can reclaim is not pressure
+    cache = detail.get("inactive_file", detail.get("total_inactive_file", 0))
+    return float(max(mem.get("usage", 0) - cache, 0))
+
+
+class DindTelemetry:
+    """Attributes DinD container resource usage to agent jobs."""
+
+    def __init__(self, settings: Settings, client: DockerClient | None = None):
+        self.settings = settings
+        self.client = client or DockerClient(settings.dind_host)
+        self.cpu_limit = settings.dind_cpu_limit
+        self.mem_limit = parse_size(settings.dind_memory_limit)
+        self.bucket_sec = settings.dind_telemetry_bucket_seconds
+        self._lock = threading.Lock()
+        self._containers: dict[str, _Tracked] = {}
+        self.jobs: OrderedDict[str, JobUsage] = OrderedDict()
+        self.buckets: deque[dict] = deque(
+            maxlen=max(1, int(settings.dind_telemetry_window_hours * 3600 / self.bucket_sec))
+        )
+        self._bucket_cpu: dict[str, float] = {}
+        self._bucket_mem = 0.0
+        self._bucket_start = time.time()
+        self._state_file = state_path(settings, STATE_FILE)
+        self._load()
+
+    # ---- Persistence ----
+
+    def _load(self) -> None:
+        state = load_json(self._state_file, {}) or {}
+        for row in state.get("jobs", []):
+            job = JobUsage(**row)
+            # A job still open in saved state ended while we were down
+            if job.ended is None and job.key != UNATTRIBUTED:
+                job.ended = state.get("saved_at", job.started)
+            self.jobs[job.key] = job
+        self.buckets.extend(state.get("buckets", []))
+
+    def save(self) -> None:
+        with self._lock:
+            doc = {
+                "saved_at": time.time(),
+                "cpu_limit": self.cpu_limit,
+                "mem_limit": self.mem_limit,
+                "bucket_sec": self.bucket_sec,
+                "jobs": [asdict(j) for j in self.jobs.values()],
+                "buckets": list(self.buckets),
+            }
+        save_json(self._state_file, doc)
+
+    # ---- Jobs (agent hooks) ----
+
+    def job_started(self, data: dict) -> str:
+        key = _job_key(data)
+        runner = str(data.get("runner", ""))
+        now = time.time()
+        with self._lock:
+            # A runner runs one job at a time: an open one missed its end hook
+            if runner:
+                for job in [j for j in self.jobs.values() if j.runner == runner and j.ended is None]:
+                    self._close(job, now)
+            self.jobs[key] = JobUsage(
+                key=key,
+                repository=str(data.get("repository", "")),
+                workflow=str(data.get("workflow", "")),
+                job=str(data.get("job", "")),
+                runner=runner,
+                started=now,
+            )
+            self._trim_jobs()
+        cleanup_logger.debug(f"Job started: {key} on {data.get('runner', '?')}")
+        return key
+
+    def job_ended(self, data: dict) -> str:
+        key = _job_key(data)
+        with self._lock:
+            job = self.jobs.get(key)
+            if job is not None:
+                self._close(job, time.time())
+        return key
+
+    def _close(self, job: JobUsage, ended: float) -> None:
+        """Mark a job finished (lock held)."""
+        job.ended = ended
+        self.jobs.move_to_end(job.key)
+
+    def _trim_jobs(self) -> None:
+        """Close expired open jobs, then drop the oldest finished ones
+        beyond the retention limit (lock held)."""
+        expired = time.time() - self.settings.dind_telemetry_max_job_hours * 3600
+        for job in [
+            j for j in self.jobs.values()
+            if j.ended is None and j.key != UNATTRIBUTED and j.started < expired
+        ]:
+            cleanup_logger.debug(f"Job {job.key} never reported its end, closing it")
+            self._close(job, time.time())
+        finished = [k for k, j in self.jobs.items() if j.ended is not None]
+        for key in finished[: max(0, len(finished) - self.settings.dind_telemetry_max_jobs)]:
+            del self.jobs[key]
+
+    def _active(self, ts: float) -> list[str]:
+        return [k for k, j in self.jobs.items() if k != UNATTRIBUTED and j.active_at(ts)]
+
+    # ---- Attribution ----
+
+    def _repo_hint(self, info: dict) -> str:
+        """Repository name from a bind mount or compose dir in the runner workdir."""
+        workdir = self.settings.runner_workdir.rstrip("/") + "/"
+        labels = (info.get("Config") or {}).get("Labels") or {}
+        paths = [labels.get(COMPOSE_WORKDIR_LABEL, "")]
+        paths += [m.get("Source", "") for m in info.get("Mounts") or []]
+        for path in paths:
+            if path and path.startswith(workdir):
+                return path[len(workdir):].split("/", 1)[0]
+        return ""
+
+    def _attribute(self, info: dict, ts: float) -> tuple[list[str], str]:
+        """Owners of a new container and how they were found (lock held)."""
+        labels = (info.get("Config") or {}).get("Labels") or {}
+        run_id, job = labels.get(RUN_ID_LABEL), labels.get(JOB_LABEL)
+        if run_id:
+            exact = [
+                k for k, j in self.jobs.items()
+                if f"#{run_id}." in k and (not job or j.job == job)
+            ]
+            if exact:
+                return exact[-1:], "label"
+
+        active = self._active(ts)
+        repo = self._repo_hint(info)
+        if repo:
+            same_repo = [
+                k for k in active if self.jobs[k].repository.rsplit("/", 1)[-1] == repo
+            ]
+            if same_repo:
+                return same_repo, "path" if len(same_repo) == 1 else "shared"
+        return [], "timing"
+
+    def _owners(self, tracked: _Tracked, ts: float) -> tuple[list[str], str]:
+        if tracked.method != "timing":
+            return tracked.owners, tracked.method
+        active = self._active(ts)
+        if not active:
+            return [UNATTRIBUTED], "none"
+        return active, "timing" if len(active) == 1 else "shared"
+
+    # ---- Docker side ----
+
+    def _track(self, cid: str, ts: float) -> None:
+        try:
+            info = self.client.inspect_container(cid)
+        except (OSError, DockerAPIError) as e:
+            cleanup_logger.debug(f"Cannot inspect {cid[:12]}: {e}")
+            return
+        with self._lock:
+            if cid in self._containers:
+                return
+            owners, method = self._attribute(info, ts)
+            tracked = _Tracked(cid, info.get("Name", "").lstrip("/"), owners, method)
+            self._containers[cid] = tracked
+            counted, how = self._owners(tracked, ts)
+            for key in counted:
+                job = self.jobs.get(key) or self._unattributed()
+                job.containers += 1
+                job.methods[how] = job.methods.get(how, 0) + 1
+        cleanup_logger.debug(f"Tracking {tracked.name or cid[:12]} ({how}: {', '.join(counted)})")
+        threading.Thread(
+            target=self._stats_loop, args=(cid,), name=f"stats-{cid[:12]}", daemon=True
+        ).start()
+
+    def _stats_loop(self, cid: str) -> None:
+        try:
+            for sample in self.client.stream(f"/containers/{cid}/stats", timeout=STATS_TIMEOUT):
+                if shutdown.requested():
+                    return
+                self.record(cid, sample)
+        except (OSError, DockerAPIError) as e:
+            cleanup_logger.debug(f"Stats stream of {cid[:12]} ended: {e}")
+        finally:
+            with self._lock:
+                self._containers.pop(cid, None)
+
+    def record(self, cid: str, stats: dict) -> None:
+        """Book one stats sample of container `cid` to its owners."""
+        now = time.time()
+        cpu = float(((stats.get("cpu_stats") or {}).get("cpu_usage") or {}).get("total_usage", 0))
+        blk, net, mem = _blkio(stats), _network(stats), container_memory(stats)
+        with self._lock:
+            tracked = self._containers.get(cid)
+            if tracked is None:
+                return
+            if tracked.cpu is not None:
+                owners, method = self._owners(tracked, now)
+                share = 1 / len(owners)
+                d_cpu = max(cpu - tracked.cpu, 0) / 1e9
+                for key in owners:
+                    # Owners dropped from retention are booked as unattributed
+                    job = self.jobs.get(key) or self._unattributed()
+                    job.cpu_sec += d_cpu * share
+                    job.blk_read += max(blk[0] - tracked.blk[0], 0) * share
+                    job.blk_write += max(blk[1] - tracked.blk[1], 0) * share
+                    job.net_rx += max(net[0] - tracked.net[0], 0) * share
+                    job.net_tx += max(net[1] - tracked.net[1], 0) * share
+                    self._bucket_cpu[job.key] = self._bucket_cpu.get(job.key, 0.0) + d_cpu * share
+            tracked.cpu, tracked.blk, tracked.net, tracked.mem = cpu, blk, net, mem
+            self._update_memory(now)
+
+    def _update_memory(self, now: float) -> None:
+        """Raise per-job and bucket memory peaks to the current gauges (lock held)."""
+        mem_by_job: dict[str, float] = {}
+        for tracked in self._containers.values():
+            owners, _ = self._owners(tracked, now)
+            for key in owners:
+                mem_by_job[key] = mem_by_job.get(key, 0.0) + tracked.mem / len(owners)
+        for key, mem in mem_by_job.items():
+            job = self.jobs.get(key)
+            if job is not None:
+                job.mem_peak = max(job.mem_peak, mem)
+        self._bucket_mem = max(self._bucket_mem, sum(mem_by_job.values()))
+
+    def _unattributed(self) -> JobUsage:
+        job = self.jobs.get(UNATTRIBUTED)
+        if job is None:
+            job = self.jobs[UNATTRIBUTED] = JobUsage(key=UNATTRIBUTED, started=time.time())
+        return job
+
+    def attach_running(self) -> None:
+        for c in self.client.containers():
+            self._track(c["Id"], float(c.get("Created") or time.time()))
+
+    def watch_events(self) -> None:
+        """Follow container start events until shutdown, reconnecting on errors."""
+        since = time.time()
+        filters = {"type": ["container"], "event": ["start"]}
+        while not shutdown.requested():
+            try:
+                params = {"since": f"{since:.3f}", "filters": filters}
+                for ev in self.client.stream("/events", params, timeout=3600):
+                    since = ev.get("timeNano", 0) / 1e9 or float(ev.get("time") or time.time())
+                    self._track(ev.get("id") or (ev.get("Actor") or {}).get("ID", ""), since)
+            except (OSError, DockerAPIError) as e:
+                cleanup_logger.warning(f"DinD event stream interrupted: {e}")
+            if shutdown.wait(5):
+                return
+
+    # ---- Aggregation ----
+
+    def tick(self) -> None:
+        """Close the current bucket into the ring buffer and persist."""
+        now = time.time()
+        with self._lock:
+            elapsed = max(now - self._bucket_start, 1e-6)
+            cores = sum(self._bucket_cpu.values()) / elapsed
+            top = sorted(self._bucket_cpu.items(), key=lambda kv: kv[1], reverse=True)[:3]
+            self.buckets.append({
+                "t": self._bucket_start,
+                "cores": round(cores, 3),
+                "mem": self._bucket_mem,
+                "containers": len(self._containers),
+                "top": [[k, round(v, 2)] for k, v in top],
+            })
+            self._bucket_cpu = {}
+            self._bucket_mem = 0.0
+            self._bucket_start = now
+            self._trim_jobs()
+        self.save()
+
+    # ---- Reporting ----
+
+    def report(self) -> dict:
+        with self._lock:
+            jobs = [asdict(j) for j in self.jobs.values()]
+            buckets = list(self.buckets)
+        return build_report(jobs, buckets, self.cpu_limit, self.mem_limit, self.settings)
+
+    def metrics(self) -> str:
+        with self._lock:
+            last = self.buckets[-1] if self.buckets else {"cores": 0.0, "mem": 0.0}
+            live = len(self._containers)
+            running = sorted(
+                (j for j in self.jobs.values() if j.ended is None),
+                key=lambda j: j.cpu_sec, reverse=True,
+            )[:METRICS_TOP_JOBS]
+        saturated = _saturated(last, self.cpu_limit, self.mem_limit, self.settings)
+        lines = [
+            "# HELP dind_cpu_cores_used CPU cores used by DinD containers (last bucket).",
+            "# TYPE dind_cpu_cores_used gauge",
+            f"dind_cpu_cores_used {last['cores']}",
+            f"dind_cpu_cores_limit {self.cpu_limit}",
+            "# HELP dind_memory_bytes Memory used by DinD containers (last bucket).",
+            "# TYPE dind_memory_bytes gauge",
+            f"dind_memory_bytes {last['mem']:.0f}",
+            f"dind_memory_limit_bytes {self.mem_limit:.0f}",
+            f"dind_containers {live}",
+            f"dind_saturated {int(saturated)}",
+            "# HELP dind_job_cpu_seconds_total CPU seconds of running jobs' containers.",
+            "# TYPE dind_job_cpu_seconds_total counter",
+        ]
+        for j in running:
+            labels = (
+                f'job="{_esc(j.key)}",runner="{_esc(j.runner)}",'
+                f'repository="{_esc(j.repository)}"'
+            )
+            lines.append(f"dind_job_cpu_seconds_total{{{labels}}} {j.cpu_sec:.3f}")
+            lines.append(f"dind_job_memory_peak_bytes{{{labels}}} {j.mem_peak:.0f}")
+            lines.append(f"dind_job_block_write_bytes_total{{{labels}}} {j.blk_write:.0f}")
+            lines.append(f"dind_job_network_rx_bytes_total{{{labels}}} {j.net_rx:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def routes(self) -> dict:
+        def start(_query, body, _handler):
+            return 200, {"job": self.job_started(parse_json_body(body))}
+
+        def end(_query, body, _handler):
+            return 200, {"job": self.job_ended(parse_json_body(body))}
+
+        def report(_query, _body, _handler):
+            return 200, self.report()
+
+        def metrics(_query, _body, _handler):
+            return 200, self.metrics()
+
+        def health(_query, _body, _handler):
+            return 200, "ok"
+
+        return {
+            ("POST", "/jobs/start"): start,
+            ("POST", "/jobs/end"): end,
+            ("GET", "/report"): report,
+            ("GET", "/metrics"): metrics,
+            ("GET", "/healthz"): health,
+        }
+
+    def serve(self) -> None:
+        start_server(
+            self.settings.dind_telemetry_bind, self.settings.dind_telemetry_port, self.routes()
+        )
+        try:
+            self.attach_running()
+        except (OSError, DockerAPIError) as e:
+            cleanup_logger.warning(f"Could not list running DinD containers: {e}")
+        threading.Thread(target=self.watch_events, name="dind-events", daemon=True).start()
+
+
+def _esc(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _saturated(bucket: dict, cpu_limit: float, mem_limit: float, settings: Settings) -> bool:
+    pct = settings.dind_telemetry_saturation_pct
+    if bucket["cores"] >= cpu_limit * pct:
+        return True
+    return mem_limit > 0 and bucket["mem"] >= mem_limit * pct
+
+
+def build_report(
+    jobs: list[dict], buckets: list[dict], cpu_limit: float, mem_limit: float, settings: Settings
+) -> dict:
+    """Top consumers per resource and merged saturation periods."""
+    top = {}
+    for metric in ("cpu_sec", "mem_peak", "blk_write", "net_rx"):
+        ranked = sorted(jobs, key=lambda j: j[metric], reverse=True)[:10]
+        top[metric] = [
+            {"job": j["key"], "runner": j["runner"], "value": j[metric]}
+            for j in ranked
+            if j[metric] > 0
+        ]
+
+    periods: list[dict] = []
+    current: dict | None = None
+    for b in buckets:
+        if not _saturated(b, cpu_limit, mem_limit, settings):
+            current = None
+            continue
+        bucket_sec = settings.dind_telemetry_bucket_seconds
+        if current is None or b["t"] - current["end"] > bucket_sec / 2:
+            current = {
+                "start": b["t"],
+                "end": b["t"],
+                "peak_cores": 0.0,
+                "peak_mem": 0.0,
+                "cpu_by_job": {},
+            }
+            periods.append(current)
+        current["end"] = b["t"] + bucket_sec
+        current["peak_cores"] = max(current["peak_cores"], b["cores"])
+        current["peak_mem"] = max(current["peak_mem"], b["mem"])
+        for key, cpu in b.get("top", []):
+            current["cpu_by_job"][key] = current["cpu_by_job"].get(key, 0.0) + cpu
+    for p in periods:
+        ranked = sorted(p.pop("cpu_by_job").items(), key=lambda kv: kv[1], reverse=True)
+        p["top_jobs"] = [{"job": k, "cpu_sec": round(v, 1)} for k, v in ranked[:3]]
+
+    return {
+        "cpu_limit": cpu_limit,
+        "mem_limit": mem_limit,
+        "jobs": len(jobs),
+        "top": top,
+        "saturation": periods,
+    }
+
+
+def print_report(settings: Settings) -> None:
+    """Tables of top consumers and saturation periods from the saved state."""
+    from datetime import datetime
+
+    from rich.table import Table
+
+    state = load_json(state_path(settings, STATE_FILE), {}) or {}
+    if not state.get("jobs"):
+        console.print("[dim]No DinD job telemetry recorded yet.[/]")
+        return
+    rep = build_report(
+        state["jobs"],
+        state.get("buckets", []),
+        state.get("cpu_limit", settings.dind_cpu_limit),
+        state.get("mem_limit", parse_size(settings.dind_memory_limit)),
+        settings,
+    )
+    by_key = {j["key"]: j for j in state["jobs"]}
+
+    table = Table(title=f"Top DinD consumers ({rep['jobs']} jobs tracked)")
+    for col in ("Job", "Runner", "CPU", "Mem peak", "Disk write", "Net in", "Attributed by"):
+        justify = "left" if col in ("Job", "Runner", "Attributed by") else "right"
+        table.add_column(col, justify=justify)
+    for entry in rep["top"]["cpu_sec"]:
+        j = by_key[entry["job"]]
+        table.add_row(
+            j["key"],
+            j["runner"] or "-",
+            f"{j['cpu_sec']:.0f}s",
+            fmt_bytes(j["mem_peak"]),
+            fmt_bytes(j["blk_write"]),
+            fmt_bytes(j["net_rx"]),
+            ", ".join(f"{m} {n}" for m, n in j["methods"].items()) or "-",
+        )
+    console.print(table)
+
+    if not rep["saturation"]:
+        console.print(
+            f"[green]+ No saturation (>= {settings.dind_telemetry_saturation_pct:.0%} of "
+            f"{rep['cpu_limit']:g} cores / {fmt_bytes(rep['mem_limit'])}) in the window[/]"
+        )
+        return
+    table = Table(title="Saturation periods")
+    for col in ("From", "To", "Peak cores", "Peak mem", "Top jobs (CPU s)"):
+        table.add_column(col)
+    for p in rep["saturation"]:
+        table.add_row(
+            datetime.fromtimestamp(p["start"]).strftime("%m-%d %H:%M"),
+            datetime.fromtimestamp(p["end"]).strftime("%H:%M"),
+            f"{p['peak_cores']:.1f}/{rep['cpu_limit']:g}",
+            fmt_bytes(p["peak_mem"]),
+            ", ".join(f"{t['job']} ({t['cpu_sec']:.0f})" for t in p["top_jobs"]),
+        )
+    console.print(table)
@@ -0,0 +1,207 @@
+"""
+Cleanup Manager - Docker Engine API Client
+
+Minimal stdlib client for the Docker Engine REST API. Talks to the
+stack's DinD daemon over TCP (tcp://docker-in-docker:2375) or to a
+daemon socket (unix:///var/run/docker.sock). Only the handful of
+endpoints the maintenance services need are wrapped; everything else
+goes through request()/stream().
+"""
+
+import http.client
+import json
+import socket
+from typing import Iterator
+from urllib.parse import quote, urlencode, urlparse
+
+
+class DockerAPIError(RuntimeError):
+    """Non-2xx response from the Docker Engine API."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Docker API HTTP {status}: {message}")
+        self.status = status
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over an AF_UNIX socket (daemon socket mounts)."""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class DockerClient:
+    """Synchronous Docker Engine API client for one daemon."""
+
+    def __init__(self, host: str, timeout: float = 30.0):
+        self.host = host
+        self.timeout = timeout
+        parsed = urlparse(host)
+        if parsed.scheme == "unix":
+            self._socket_path = parsed.path
+            self._netloc = None
+        elif parsed.scheme in ("tcp", "http"):
+            self._socket_path = None
+            self._netloc = (parsed.hostname or "localhost", parsed.port or 2375)
+        else:
+            raise ValueError(f"Unsupported Docker host '{host}' (use tcp:// or unix://)")
+
+    def _connect(self, timeout: float | None) -> http.client.HTTPConnection:
+        t = self.timeout if timeout is None else timeout
+        if self._socket_path:
+            return _UnixHTTPConnection(self._socket_path, t)
+        host, port = self._netloc  # type: ignore[misc]
+        return http.client.HTTPConnection(host, port, timeout=t)
+
+    @staticmethod
+    def _path(path: str, params: dict | None) -> str:
+        if not params:
+            return path
+        # Docker expects `filters` as a JSON document; plain lists are
+        # repeated query parameters (e.g. /system/df?type=a&type=b).
+        encoded = {
+            k: json.dumps(v) if isinstance(v, dict) else v
+            for k, v in params.items()
+            if v is not None
+        }
+        return f"{path}?{urlencode(encoded, doseq=True)}"
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: dict | None = None,
+        body: dict | None = None,
+        timeout: float | None = None,
+    ):
+        """Perform one request and return the decoded JSON body (or None)."""
+        conn = self._connect(timeout)
+        try:
+            payload = json.dumps(body).encode() if body is not None else None
+            headers = {"Content-Type": "application/json"} if payload is not None else {}
+            conn.request(method, self._path(path, params), body=payload, headers=headers)
+            resp = conn.getresponse()
+            raw = resp.read()
+            if resp.status >= 400:
+                raise DockerAPIError(resp.status, _error_message(raw))
+            if not raw:
+                return None
+            try:
+                return json.loads(raw)
+            except ValueError:
+                # Streaming endpoints (image pull) return newline-delimited
+                # JSON; callers of request() only need completion.
+                return None
+        finally:
+            conn.close()
+
+    def stream(
+        self, path: str, params: dict | None = None, timeout: float | None = None
+    ) -> Iterator[dict]:
+        """Yield JSON objects from a long-lived streaming endpoint (/events)."""
+        conn = self._connect(timeout)
+        try:
+            conn.request("GET", self._path(path, params))
+            resp = conn.getresponse()
+            if resp.status >= 400:
+                raise DockerAPIError(resp.status, _error_message(resp.read()))
+            while True:
+                line = resp.readline()
+                if not line:
+                    return
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        finally:
+            conn.close()
+
+    # ---- Convenience wrappers ----
+
+    def ping(self) -> bool:
+        try:
+            conn = self._connect(5.0)
+            try:
+                conn.request("GET", "/_ping")
+                return conn.getresponse().status == 200
+            finally:
+                conn.close()
+        except OSError:
+            return False
+
+    def containers(self, all_: bool = False, filters: dict | None = None) -> list[dict]:
+        params: dict = {"all": "1" if all_ else "0"}
+        if filters:
+            params["filters"] = filters
+        return self.request("GET", "/containers/json", params) or []
+
+    def inspect_container(self, container_id: str) -> dict:
+        return self.request("GET", f"/containers/{quote(container_id, safe='')}/json") or {}
+
+    def images(self) -> list[dict]:
+        return self.request("GET", "/images/json") or []
+
+    def system_df(self, types: list[str] | None = None) -> dict:
+        params = {"type": types} if types else None
+        # /system/df walks every layer; give it more time than normal calls
+        return self.request("GET", "/system/df", params, timeout=max(self.timeout, 120.0)) or {}
+
+    def pull(self, ref: str, timeout: float = 1800.0) -> None:
+        """Pull `ref` (tag defaults to :latest) and wait for completion.
+
+        The progress stream reports failures in-band as {"error": ...}
+        lines after a 200 status, so those are surfaced as DockerAPIError.
+        """
+        name = ref.rsplit("/", 1)[-1]
+        if "@" not in name and ":" not in name:
+            ref = f"{ref}:latest"
+        for msg in self.stream_post("/images/create", {"fromImage": ref}, timeout=timeout):
+            if msg.get("error"):
+                raise DockerAPIError(500, str(msg["error"]))
+
+    def stream_post(
+        self, path: str, params: dict | None = None, timeout: float | None = None
+    ) -> Iterator[dict]:
+        """Like stream(), for POST endpoints that reply with a progress stream."""
+        conn = self._connect(timeout)
+        try:
+            conn.request("POST", self._path(path, params))
+            resp = conn.getresponse()
+            if resp.status >= 400:
+                raise DockerAPIError(resp.status, _error_message(resp.read()))
+            for line in resp:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        finally:
+            conn.close()
+
+    def events(self, since: float, until: float, filters: dict | None = None) -> list[dict]:
+        """Return the finite event list between two timestamps."""
+        params: dict = {"since": f"{since:.3f}", "until": f"{until:.3f}"}
+        if filters:
+            params["filters"] = filters
+        return list(self.stream("/events", params))
+
+
+def _error_message(raw: bytes) -> str:
+    text = raw.decode(errors="replace")
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict) and "message" in data:
+            return str(data["message"])
+    except ValueError:
+        pass
+    return text.strip()[:200]
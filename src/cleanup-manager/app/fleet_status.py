@@ -0,0 +1,178 @@
+"""
+Cleanup Manager - Fleet Status
+
+One-shot joined view of the fleet for `./runner.sh status`: what GitHub
+thinks (runner counts by status and busy flag), what Docker runs (agent
+and DinD container states) and how much quota is left. The three
+sources are queried at the same time, and the runner listing fetches
+all pages after the first in parallel, so the whole view takes about
+two round trips regardless of fleet size.
+
+Agent containers are joined to their registration by name
+(<RUNNER_NAME_PREFIX>-<container id>, or the JIT broker's leases):
+    registered   online on GitHub, shown with its busy flag
+    unregistered running, but GitHub has no online runner for it yet
+                 (starting up) or any more (listener lost)
+
+`--status --json` prints the same data as JSON. A source that fails is
+reported under "errors" while the rest is still shown.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from auth import resolve_token
+from config import Settings
+from console import console, fmt_duration
+from docker_api import DockerClient
+from github_api import fetch_rate_limit, list_runners_concurrent
+from jit_broker import STATE_FILE as JIT_STATE_FILE
+from rate_limit import RateLimit
+from state import load_json, state_path
+
+
+COMPOSE_SERVICE_LABEL = "com.docker.compose.service"
+COMPOSE_PROJECT_LABEL = "com.docker.compose.project"
+
+
+def _containers(settings: Settings) -> list[dict]:
+    filters = (
+        {"label": [f"{COMPOSE_PROJECT_LABEL}={settings.status_project}"]}
+        if settings.status_project
+        else None
+    )
+    docker = DockerClient(settings.status_docker_host)
+    out = []
+    for c in docker.containers(all_=True, filters=filters):
+        labels = c.get("Labels") or {}
+        service = labels.get(COMPOSE_SERVICE_LABEL, "")
+        if service != "agent" and not service.startswith("docker-in-docker"):
+            continue
+        out.append({
+            "service": service,
+            "id": c["Id"][:12],
+            "name": (c.get("Names") or ["?"])[0].lstrip("/"),
+            "state": c.get("State", ""),
+            "status": c.get("Status", ""),
+        })
+    return sorted(out, key=lambda c: (c["service"], c["name"]))
+
+
+def _runner_names(settings: Settings, containers: list[dict]) -> dict[str, str]:
+    """Agent container ID -> runner name it registers as."""
+    names = {
+        c["id"]: f"{settings.runner_name_prefix}-{c['id']}"
+        for c in containers if c["service"] == "agent"
+    }
+    leased = (load_json(state_path(settings, JIT_STATE_FILE), {}) or {}).get("leased", {})
+    for lease in leased.values():
+        if lease.get("client") in names:
+            names[lease["client"]] = lease["name"]
+    return names
+
+
+def gather(settings: Settings) -> dict:
+    """Query GitHub runners, quota and Docker concurrently and join them."""
+    started = time.time()
+    scope = settings.api_scope
+    token, _ = resolve_token(settings)
+    rate = RateLimit(reserve_pct=settings.cleanup_reserve_pct)
+    errors: dict[str, str] = {}
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        jobs = {
+            "runners": pool.submit(list_runners_concurrent, scope, token, rate),
+            "quota": pool.submit(fetch_rate_limit, token),
+            "containers": pool.submit(_containers, settings),
+        }
+    results: dict = {}
+    for name, job in jobs.items():
+        try:
+            results[name] = job.result()
+        except Exception as e:
+            errors[name] = str(e)
+            results[name] = None
+
+    runners = results["runners"] or []
+    containers = results["containers"] or []
+    by_name = {r.get("name"): r for r in runners}
+    names = _runner_names(settings, containers)
+    for c in containers:
+        runner = by_name.get(names.get(c["id"], ""))
+        c["runner"] = names.get(c["id"])
+        c["github"] = (
+            None if c["service"] != "agent"
+            else "busy" if runner and runner.get("status") == "online" and runner.get("busy")
+            else "idle" if runner and runner.get("status") == "online"
+            else "unregistered"
+        )
+
+    online = [r for r in runners if r.get("status") == "online"]
+    quota = results["quota"] or {}
+    return {
+        "scope": scope,
+        "elapsed_sec": round(time.time() - started, 3),
+        "runners": None if results["runners"] is None else {
+            "total": len(runners),
+            "online": len(online),
+            "offline": len(runners) - len(online),
+            "busy": sum(1 for r in online if r.get("busy")),
+            "idle": sum(1 for r in online if not r.get("busy")),
+        },
+        "quota": quota or None,
+        "containers": containers if results["containers"] is not None else None,
+        "errors": errors,
+    }
+
+
+def print_status(status: dict) -> None:
+    from rich.table import Table
+
+    console.print(
+        f"[bold]Fleet status[/] [dim]({status['scope']}, gathered in "
+        f"{status['elapsed_sec']:.2f}s)[/]"
+    )
+    runners = status["runners"]
+    if runners is not None:
+        console.print(
+            f"  GitHub runners: {runners['total']} total | online {runners['online']} "
+            f"(busy {runners['busy']}, idle {runners['idle']}) | offline {runners['offline']}"
+        )
+    quota = status["quota"]
+    if quota:
+        reset_in = max(int(quota.get("reset", 0) - time.time()), 0)
+        console.print(
+            f"  Quota:          {quota.get('remaining')}/{quota.get('limit')} "
+            f"(reset in {fmt_duration(reset_in)})"
+        )
+
+    containers = status["containers"]
+    if containers:
+        table = Table(show_edge=False, pad_edge=False)
+        for col in ("Service", "Container", "State", "Status", "Runner", "GitHub"):
+            table.add_column(col)
+        for c in containers:
+            github = c["github"] or "-"
+            style = {"busy": "green", "idle": "cyan", "unregistered": "yellow"}.get(github, "dim")
+            table.add_row(
+                c["service"], c["name"], c["state"], c["status"],
+                c["runner"] or "-", f"[{style}]{github}[/]",
+            )
+        console.print(table)
+        agents = [c for c in containers if c["service"] == "agent"]
+        unregistered = [c for c in agents if c["github"] == "unregistered"]
+        if unregistered:
+            console.print(
+                f"[yellow]! {len(unregistered)} of {len(agents)} agent containers have "
+                "no online registration[/]"
+            )
+    elif containers is not None:
+        console.print("  [dim]No agent or DinD containers[/]")
+
+    for source, err in status["errors"].items():
+        console.print(f"[red]x {source}: {err}[/]")
+
+
+def print_json(status: dict) -> None:
+    print(json.dumps(status, indent=2))
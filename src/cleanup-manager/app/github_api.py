@@ -5,16 +5,31 @@ Lists organization/repo runners (paginated), filters offline + min-age,
 and deletes them via the GitHub API with adaptive pacing.
 """
 
+import http.client
 import json
+import math
 import time
 import urllib.error
+import urllib.parse
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
+import shutdown
+import tracing
 from auth import resolve_token
+from circuit import CircuitBreaker, is_server_failure
 from config import Settings
 from console import cleanup_logger, console, fmt_duration
-from rate_limit import RateLimit
+from hedge import Hedger
+from history import PassStats, new_stats, record_pass
+from lease import PassLease
+from ownership import Ownership
+from priority import DeletionQueue, observe
+from progress import PassProgress, load_resumable
+from quota_plan import QuotaPlanner
+from rate_limit import QuotaView, RateLimit, apply_preflight
+from token_pool import TokenPool
 
 
 API_BASE = "https://api.github.com"
@@ -80,6 +95,7 @@ def _api_request(
     token: str,
     method: str = "GET",
     body: bytes | None = None,
+    extra_headers: dict | None = None,
 ) -> tuple[dict | None, dict, int | None]:
     """Perform a GitHub API request.
 
@@ -93,16 +109,20 @@ def _api_request(
     req.add_header("User-Agent", "bauer-group-runner-cleanup")
     if body is not None:
         req.add_header("Content-Length", str(len(body)))
+    for name, value in (extra_headers or {}).items():
+        req.add_header(name, value)
 
     try:
         with urllib.request.urlopen(req, timeout=30) as resp:
             raw = resp.read()
             headers = dict(resp.headers)
+            _trace_response(resp.status, headers)
             data = json.loads(raw) if raw else None
             return data, headers, None
     except urllib.error.HTTPError as e:
         body_text = e.read().decode(errors="replace")
         headers = dict(e.headers or {})
+        _trace_response(e.code, headers)
         e.body_text = body_text  # type: ignore[attr-defined]
         e.gh_headers = headers  # type: ignore[attr-defined]
         e.short_msg = _summarize_error(e.code, body_text)  # type: ignore[attr-defined]
@@ -110,14 +130,41 @@ def _api_request(
         raise
 
 
-def list_runners(scope: str, token: str, rate: RateLimit):
-    """Yield all runners in `scope` (paginated 100/page)."""
+def _trace_response(status: int, headers: dict) -> None:
+    """Annotate the current span with the response status and quota."""
+    sp = tracing.current()
+    sp.set_attribute("http.status_code", status)
+    remaining = {k.lower(): v for k, v in headers.items()}.get("x-ratelimit-remaining")
+    if remaining is not None:
+        sp.set_attribute("github.ratelimit.remaining", str(remaining))
+
+
+def list_runners(
+    scope: str,
+    token: str,
+    rate: RateLimit,
+    hedger: Hedger | None = None,
+    group_id: int | None = None,
+):
+    """Yield all runners in `scope` (paginated 100/page).
+
+    With a `hedger`, a page slower than its deadline is requested twice.
+    With a `group_id` (org scope) only that runner group is listed.
+    """
+    path = f"runner-groups/{group_id}/runners" if group_id else "runners"
     page = 1
     while True:
-        url = f"{API_BASE}/{scope}/actions/runners?per_page=100&page={page}"
-        data, headers, _ = _api_request(url, token, "GET")
-        rate.update(headers)
-        runners = (data or {}).get("runners") or []
+        url = f"{API_BASE}/{scope}/actions/{path}?per_page=100&page={page}"
+        # The span must close before yielding: a suspended generator
+        # would otherwise leave it as the caller's current span.
+        with tracing.span("github.list_runners.page", {"page": page}, tracing.KIND_CLIENT) as sp:
+            if hedger is not None:
+                data, headers, _ = hedger.call(_api_request, url, token, "GET")
+            else:
+                data, headers, _ = _api_request(url, token, "GET")
+            rate.update(headers)
+            runners = (data or {}).get("runners") or []
+            sp.set_attribute("runners.count", len(runners))
         if not runners:
             return
         yield from runners
@@ -126,21 +173,193 @@ def list_runners(scope: str, token: str, rate: RateLimit):
         page += 1
 
 
+def list_runners_concurrent(
+    scope: str, token: str, rate: RateLimit, workers: int = 8
+) -> list[dict]:
+    """All runners in `scope`: page 1, then every further page at once.
+
+    Page 1's total_count says how many pages there are, so the listing
+    takes two round trips instead of one per page.
+    """
+    def page(n: int) -> dict:
+        url = f"{API_BASE}/{scope}/actions/runners?per_page=100&page={n}"
+        with tracing.span("github.list_runners.page", {"page": n}, tracing.KIND_CLIENT):
+            data, headers, _ = _api_request(url, token, "GET")
+        rate.update(headers)
+        return data or {}
+
+    first = page(1)
+    runners = list(first.get("runners") or [])
+    pages = math.ceil(int(first.get("total_count") or 0) / 100)
+    if pages > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, pages - 1)) as pool:
+            for data in pool.map(page, range(2, pages + 1)):
+                runners.extend(data.get("runners") or [])
+    return runners
+
+
+def fetch_runner_page(
+    scope: str, token: str, page: int, etag: str, rate: RateLimit
+) -> tuple[list[dict] | None, str]:
+    """One page of runners, conditional on `etag`. Returns (runners, etag).
+
+    runners is None when the page is unchanged (304) - a conditional
+    request answered that way does not count against the rate limit.
+    """
+    url = f"{API_BASE}/{scope}/actions/runners?per_page=100&page={page}"
+    headers = {"If-None-Match": etag} if etag else None
+    with tracing.span("github.list_runners.page", {"page": page}, tracing.KIND_CLIENT) as sp:
+        try:
+            data, resp_headers, _ = _api_request(url, token, "GET", extra_headers=headers)
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                raise
+            rate.update(getattr(e, "gh_headers", {}))
+            sp.set_attribute("http.not_modified", True)
+            return None, etag
+    rate.update(resp_headers)
+    new_etag = {k.lower(): v for k, v in resp_headers.items()}.get("etag", "")
+    return (data or {}).get("runners") or [], new_etag
+
+
 def delete_runner(
     scope: str, runner_id: int, token: str
 ) -> tuple[bool, dict, str | None, int | None]:
-    """Delete one runner. Returns (ok, headers, errmsg, retry_after_sec)."""
+    """Delete one runner. Returns (ok, headers, errmsg, retry_after_sec).
+
+    404 counts as success: the registration is already gone (deleted by
+    an earlier, interrupted pass or deregistered by the agent itself).
+    """
+    url = f"{API_BASE}/{scope}/actions/runners/{runner_id}"
+    with tracing.span("github.delete_runner", {"runner.id": runner_id}, tracing.KIND_CLIENT) as sp:
+        try:
+            _, headers, _ = _api_request(url, token, "DELETE")
+            return True, headers, None, None
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                sp.set_attribute("runner.already_gone", True)
+                return True, getattr(e, "gh_headers", {}), None, None
+            sp.fail(getattr(e, "short_msg", f"HTTP {e.code}"))
+            return (
+                False,
+                getattr(e, "gh_headers", {}),
+                getattr(e, "short_msg", f"HTTP {e.code}"),
+                getattr(e, "retry_after", None),
+            )
+        except (OSError, http.client.HTTPException) as e:
+            # Timeouts and dropped connections (URLError is an OSError):
+            # as transient as a 502
+            msg = f"Network error: {getattr(e, 'reason', e)}"
+            sp.fail(msg)
+            return False, {}, msg, 10
+
+
+def get_runner(scope: str, runner_id: int, token: str) -> dict | None:
+    """Fetch one runner registration, or None if it no longer exists."""
     url = f"{API_BASE}/{scope}/actions/runners/{runner_id}"
     try:
-        _, headers, _ = _api_request(url, token, "DELETE")
-        return True, headers, None, None
+        data, _, _ = _api_request(url, token, "GET")
+        return data or {}
     except urllib.error.HTTPError as e:
-        return (
-            False,
-            getattr(e, "gh_headers", {}),
-            getattr(e, "short_msg", f"HTTP {e.code}"),
-            getattr(e, "retry_after", None),
-        )
+        if e.code == 404:
+            return None
+        raise
+
+
+def fetch_rate_limit(token: str) -> dict:
+    """The "core" bucket from /rate_limit (free: does not count against it)."""
+    with tracing.span("github.rate_limit", kind=tracing.KIND_CLIENT):
+        data, _, _ = _api_request(f"{API_BASE}/rate_limit", token, "GET")
+    return ((data or {}).get("resources") or {}).get("core") or {}
+
+
+def _preflight(settings: Settings, pool: TokenPool) -> None:
+    """Seed every pooled credential's bucket before the first real request.
+
+    Without it the bucket falls back to the persisted quota model.
+    """
+    for cred in pool.credentials:
+        try:
+            core = fetch_rate_limit(cred.current_token())
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            cleanup_logger.status(f"Rate-limit preflight failed for {cred.label}: {e}")
+            continue
+        apply_preflight(settings, cred.tuning_key, cred.rate, core)
+
+
+def probe_circuit(settings: Settings) -> bool:
+    """Half-open probe of an open circuit: one single-runner list request.
+
+    True once the breaker is closed (GitHub answers again).
+    """
+    breaker = CircuitBreaker(settings)
+    if not breaker.is_open:
+        return True
+    try:
+        token, _ = resolve_token(settings)
+    except (ValueError, FileNotFoundError, RuntimeError, OSError) as e:
+        cleanup_logger.debug(f"Circuit probe skipped, no token: {e}")
+        return False
+    if not breaker.allow():
+        return False
+    url = f"{API_BASE}/{settings.api_scope}/actions/runners?per_page=1"
+    with tracing.span("github.circuit_probe", kind=tracing.KIND_CLIENT):
+        try:
+            _api_request(url, token, "GET")
+            failed = False
+        except urllib.error.HTTPError as e:
+            failed = e.code >= 500
+        except (OSError, http.client.HTTPException):
+            failed = True
+    breaker.record(failed)
+    return not breaker.is_open
+
+
+def find_runner(scope: str, token: str, name: str, rate: RateLimit) -> dict | None:
+    """Look up one runner by exact name - one request instead of a full listing."""
+    url = f"{API_BASE}/{scope}/actions/runners?name={urllib.parse.quote(name)}"
+    with tracing.span("github.find_runner", {"runner.name": name}, tracing.KIND_CLIENT):
+        data, headers, _ = _api_request(url, token, "GET")
+    rate.update(headers)
+    for runner in (data or {}).get("runners") or []:
+        if runner.get("name") == name:
+            return runner
+    return None
+
+
+def runner_group_id(scope: str, token: str, name: str) -> int:
+    """Resolve a runner group name to its id (repo scope: always Default = 1)."""
+    if not scope.startswith("orgs/") or not name or name == "Default":
+        return 1
+    data, _, _ = _api_request(f"{API_BASE}/{scope}/actions/runner-groups?per_page=100", token, "GET")
+    for group in (data or {}).get("runner_groups") or []:
+        if group.get("name") == name:
+            return int(group["id"])
+    raise ValueError(f"Runner group '{name}' not found in {scope}")
+
+
+def generate_jitconfig(
+    scope: str, token: str, name: str, labels: list[str], group_id: int, work_folder: str
+) -> dict:
+    """Register a just-in-time runner; returns {"runner": {...}, "encoded_jit_config": ...}."""
+    body = json.dumps({
+        "name": name,
+        "runner_group_id": group_id,
+        "labels": labels,
+        "work_folder": work_folder,
+    }).encode()
+    url = f"{API_BASE}/{scope}/actions/runners/generate-jitconfig"
+    with tracing.span("github.generate_jitconfig", {"runner.name": name}, tracing.KIND_CLIENT):
+        data, _, _ = _api_request(url, token, "POST", body)
+    return data or {}
+
+
+def create_registration_token(scope: str, token: str) -> dict:
+    """Create a runner registration token; returns {"token": ..., "expires_at": ...}."""
+    url = f"{API_BASE}/{scope}/actions/runners/registration-token"
+    with tracing.span("github.registration_token", kind=tracing.KIND_CLIENT):
+        data, _, _ = _api_request(url, token, "POST", b"")
+    return data or {}
 
 
 def parse_iso8601(s: str) -> float:
@@ -156,43 +375,97 @@ def parse_iso8601(s: str) -> float:
         return 0.0
 
 
-def run_cleanup(settings: Settings) -> bool:
-    """Execute one full cleanup pass.
+def run_cleanup(settings: Settings, resume: bool = False) -> bool:
+    """Execute one cleanup pass under the pass lease.
 
-    Returns True on success (zero failures), False otherwise.
-    """
-    try:
-        token, auth_label = resolve_token(settings)
-    except (ValueError, FileNotFoundError, RuntimeError) as e:
-        cleanup_logger.error(f"Auth failed: {e}")
-        return False
+    With `resume`, a pass that the previous one left unfinished
+    (deadline, shutdown) continues from its checkpoint instead of
+    listing every runner again.
 
+    Returns True on success (zero failures), False otherwise - including
+    when another process holds the lease.
+    """
+    with tracing.span("cleanup.pass", {"cleanup.resume": resume}) as sp:
+        lease = PassLease(settings)
+        if not lease.acquire():
+            holder = lease.holder() or {}
+            cleanup_logger.warning(
+                f"Another cleanup pass is running ({holder.get('owner', 'unknown owner')}), skipping"
+            )
+            sp.set_attribute("cleanup.skipped", "lease held")
+            return False
+        stats = new_stats(resume)
+        try:
+            ok = _run_pass(settings, resume, stats)
+            sp.set_attribute("cleanup.ok", ok)
+        finally:
+            lease.release()
+        if stats.outcome != "skipped":
+            stats.duration_sec = time.time() - stats.started_at
+            record_pass(settings, stats)
+        return ok
+
+
+def _select_candidates(
+    settings: Settings, scope: str, token: str, rate: RateLimit, stats: PassStats,
+    breaker: CircuitBreaker,
+) -> list[dict] | None:
+    """List runners and apply the offline + min-age filter (None on error)."""
+    if not breaker.allow():
+        cleanup_logger.warning("GitHub API circuit open, not listing runners")
+        return None
+    cleanup_logger.status("Listing runners (paginated)...")
+    hedger = Hedger(settings, rate) if settings.cleanup_list_hedge else None
+    owned = Ownership(settings, scope) if settings.cleanup_owned_only else None
+    list_start = time.time()
     try:
-        scope = settings.api_scope
+        group_id = owned.group_id(lambda name: runner_group_id(scope, token, name)) if owned else None
+        with tracing.span("github.list_runners", {"github.scope": scope}) as sp:
+            all_runners = list(list_runners(scope, token, rate, hedger, group_id))
+            sp.set_attribute("runners.total", len(all_runners))
     except ValueError as e:
         cleanup_logger.error(str(e))
-        return False
-
-    cleanup_logger.info(f"Target: {scope}")
-    cleanup_logger.info(f"Auth:   {auth_label}")
-
-    rate = RateLimit(
-        reserve_pct=settings.cleanup_reserve_pct,
-        floor_delay=settings.cleanup_floor_delay,
-    )
-
-    cleanup_logger.status("Listing runners (paginated)...")
-    try:
-        all_runners = list(list_runners(scope, token, rate))
+        return None
     except urllib.error.HTTPError as e:
+        breaker.record(e.code >= 500)
+        if owned is not None and e.code == 404:
+            # A cached group id that no longer exists; resolved again next pass
+            owned.forget_group()
         cleanup_logger.error(
             f"Failed to list runners: HTTP {e.code} - "
             f"{getattr(e, 'body_text', '')[:200]}"
         )
-        return False
+        return None
+    except (OSError, http.client.HTTPException) as e:
+        breaker.record(True)
+        cleanup_logger.error(f"Failed to list runners: {getattr(e, 'reason', e)}")
+        return None
+    finally:
+        stats.list_sec = time.time() - list_start
+        if hedger is not None:
+            stats.list_hedged = hedger.pass_hedged
+            hedger.save()
+
+    if hedger is not None and hedger.pass_hedged:
+        cleanup_logger.info(
+            f"Hedged {hedger.pass_hedged} of {hedger.pass_requests} list pages "
+            f"({hedger.pass_wins} answered first by the duplicate)"
+        )
 
+    breaker.record(False)
+    stats.listed = len(all_runners)
+    if settings.cleanup_priority:
+        observe(settings, scope, all_runners)
+    if owned is not None:
+        listed = len(all_runners)
+        all_runners = [r for r in all_runners if owned.owns(r)]
+        cleanup_logger.info(
+            f"Owned by this stack ({owned.describe()}): {len(all_runners)} of {listed} listed"
+        )
     online = [r for r in all_runners if r.get("status") == "online"]
     offline = [r for r in all_runners if r.get("status") == "offline"]
+    stats.offline = len(offline)
+    stats.note_quota(rate)
     cleanup_logger.info(
         f"Total runners: {len(all_runners)} (online: {len(online)}, offline: {len(offline)})"
     )
@@ -200,7 +473,7 @@ def run_cleanup(settings: Settings) -> bool:
 
     if not offline:
         cleanup_logger.success("Nothing to clean up - no offline runners found")
-        return True
+        return []
 
     # Apply min-age filter
     candidates = offline
@@ -215,59 +488,209 @@ def run_cleanup(settings: Settings) -> bool:
 
     if not candidates:
         cleanup_logger.success("No runners match the deletion criteria")
+    return candidates
+
+
+def _traced_sleep(seconds: float, reason: str, rate: QuotaView, stats: PassStats) -> bool:
+    """shutdown.wait() inside a "sleep" span. True if woken by shutdown."""
+    attrs = {
+        "sleep.reason": reason,
+        "sleep.planned_sec": float(seconds),
+        "github.ratelimit.remaining": rate.remaining,
+    }
+    slept_from = time.time()
+    with tracing.span("sleep", attrs) as sp:
+        woken = shutdown.wait(seconds)
+        sp.set_attribute("sleep.interrupted", woken)
+    stats.sleep_sec += time.time() - slept_from
+    return woken
+
+
+def _run_pass(settings: Settings, resume: bool, stats: PassStats) -> bool:
+    try:
+        scope = settings.api_scope
+    except ValueError as e:
+        cleanup_logger.error(str(e))
+        return False
+
+    auth_start = time.time()
+    pool = TokenPool(settings, scope)
+    try:
+        pool.load()
+    except (ValueError, FileNotFoundError, RuntimeError) as e:
+        cleanup_logger.error(f"Auth failed: {e}")
+        return False
+    finally:
+        stats.auth_sec = time.time() - auth_start
+
+    cleanup_logger.info(f"Target: {scope}")
+    cleanup_logger.info(f"Auth:   {pool.labels}")
+    _preflight(settings, pool)
+    stats.note_quota(pool.rate)
+    cleanup_logger.info(f"Preflight {pool.rate.quota_summary()}")
+
+    # The pool as one bucket: summed quota, combined request rate
+    rate = pool.rate
+    primary = pool.credentials[0]
+    if primary.rate.floor_delay != settings.cleanup_floor_delay:
+        cleanup_logger.info(
+            f"Floor delay: {primary.rate.floor_delay}s (learned by previous passes)"
+        )
+    if len(pool.credentials) > 1:
+        cleanup_logger.info(
+            f"Pooling {len(pool.credentials)} credentials, combined floor delay "
+            f"{rate.floor_delay:.3f}s"
+        )
+    planner = QuotaPlanner(settings, rate)
+    if planner.deadline is not None and planner.remaining_time() <= 0:
+        cleanup_logger.warning(
+            f"Outside the allowed cleanup window ({settings.cleanup_window}), skipping pass"
+        )
+        stats.outcome = "skipped"
         return True
+    breaker = CircuitBreaker(settings)
+    # Only look: the pass's first request (listing or delete) is the probe
+    if not breaker.ready():
+        cleanup_logger.warning(
+            f"GitHub API circuit open after repeated server errors, next probe in "
+            f"{fmt_duration(breaker.retry_in())} - skipping pass"
+        )
+        stats.outcome = "skipped"
+        return False
 
+    candidates = (
+        load_resumable(settings, scope, settings.cleanup_resume_max_age_hours * 3600)
+        if resume
+        else []
+    )
+    if candidates:
+        cleanup_logger.info(
+            f"Resuming {len(candidates)} candidates left by the previous pass (no re-listing)"
+        )
+    else:
+        cred = pool.pick()
+        candidates = _select_candidates(
+            settings, scope, cred.current_token(), cred.rate, stats, breaker
+        )
+        if candidates is None:
+            return False
+        if not candidates:
+            stats.outcome = "nothing to do"
+            stats.floor_delay = rate.floor_delay
+            return True
+    stats.candidates = len(candidates)
+
+    queue = DeletionQueue(settings, scope, candidates)
     cleanup_logger.info(f"Deleting {len(candidates)} runners (adaptive pacing)...")
+    if queue.ranking:
+        cleanup_logger.info(f"Deletion order: {queue.describe()}")
+    cleanup_logger.info(planner.summary(len(candidates)))
+
+    progress = PassProgress(settings, scope)
+    progress.start(queue.ordered())
 
     deleted = 0
     failed = 0
+    deferred = 0
+    interrupted = False
+    tripped = False
     start = time.time()
 
-    for i, r in enumerate(candidates, 1):
+    for i, r in enumerate(queue, 1):
         rid = r.get("id")
         rname = r.get("name", "?")
         candidates_left = len(candidates) - i + 1
 
-        ok_, headers, errmsg, retry_after = delete_runner(scope, rid, token)
-        rate.update(headers)
+        if shutdown.requested():
+            deferred += candidates_left
+            interrupted = True
+            break
+        if not breaker.allow():
+            deferred += candidates_left
+            tripped = True
+            break
+
+        cred = pool.pick()
+        ok_, headers, errmsg, retry_after = delete_runner(scope, rid, cred.current_token())
+        cred.rate.update(headers)
+        stats.requests += 1
+        stats.note_quota(rate)
+        breaker.record(not ok_ and is_server_failure(errmsg))
+        retry_deferred = False
 
         # Reactive: retry once on transient errors (secondary limit OR 5xx).
         # Distinguish so floor_delay is only raised for actual rate-limit
-        # hits, not for backend hiccups (HTTP 502/503/504).
-        if not ok_ and retry_after is not None:
-            is_secondary = errmsg is not None and errmsg.startswith(("HTTP 403", "HTTP 429"))
-            if is_secondary:
+        # hits, not for backend hiccups (HTTP 502/503/504). A secondary
+        # hit benches the credential; another one in rotation takes the
+        # retry without waiting.
+        is_secondary = errmsg is not None and errmsg.startswith(("HTTP 403", "HTTP 429"))
+        if not ok_ and retry_after is not None and is_secondary:
+            pool.bench(cred, retry_after)
+        wait = 0 if is_secondary and pool.in_rotation() else (retry_after or 0) + 1
+        if not ok_ and breaker.is_open:
+            # GitHub is failing: no retry, the candidate waits for recovery
+            retry_deferred = True
+        elif not ok_ and retry_after is not None and not planner.fits(wait):
+            cleanup_logger.status(
+                f"{errmsg} at request {i}, Retry-After {retry_after}s is past the "
+                f"pass deadline - leaving {rname} for the next pass"
+            )
+            retry_deferred = True
+        elif not ok_ and retry_after is not None:
+            if is_secondary and not wait:
+                cleanup_logger.status(
+                    f"Secondary rate limit at request {i}, retrying on another credential"
+                )
+            elif is_secondary:
                 cleanup_logger.warning(
                     f"Secondary rate limit at request {i}, sleeping "
                     f"{retry_after}s (Retry-After)..."
                 )
-                rate.react_to_secondary(retry_after)
             else:
                 cleanup_logger.status(
                     f"Transient: {errmsg} at request {i}, retrying in {retry_after}s..."
                 )
-            time.sleep(retry_after + 1)
-            ok_, headers, errmsg, retry_after2 = delete_runner(scope, rid, token)
-            rate.update(headers)
-            # Second hit handling
-            if not ok_ and retry_after2 is not None:
-                is_secondary2 = errmsg is not None and errmsg.startswith(("HTTP 403", "HTTP 429"))
-                if is_secondary2:
-                    rate.react_to_secondary(retry_after2)
-                    cleanup_logger.warning(
-                        f"Secondary limit hit again. floor-delay raised to "
-                        f"{rate.floor_delay}s, will retry runner {rname} next run."
-                    )
-                else:
-                    cleanup_logger.status(
-                        f"Still transient ({errmsg}), giving up on {rname} for now"
-                    )
-
+            if wait and _traced_sleep(
+                wait,
+                "secondary_rate_limit" if is_secondary else "transient_error",
+                rate,
+                stats,
+            ):
+                retry_deferred = True
+            else:
+                cred = pool.pick()
+                ok_, headers, errmsg, retry_after2 = delete_runner(
+                    scope, rid, cred.current_token()
+                )
+                cred.rate.update(headers)
+                stats.requests += 1
+                stats.note_quota(rate)
+                breaker.record(not ok_ and is_server_failure(errmsg))
+                # Second hit handling
+                if not ok_ and retry_after2 is not None:
+                    is_secondary2 = errmsg is not None and errmsg.startswith(("HTTP 403", "HTTP 429"))
+                    if is_secondary2:
+                        pool.bench(cred, retry_after2)
+                        cleanup_logger.warning(
+                            f"Secondary limit hit again. floor-delay raised to "
+                            f"{cred.rate.floor_delay}s, will retry runner {rname} next run."
+                        )
+                    else:
+                        cleanup_logger.status(
+                            f"Still transient ({errmsg}), giving up on {rname} for now"
+                        )
+
+        queue.done(r, ok_)
         if ok_:
             deleted += 1
+            cred.rate.record_success()
+        elif retry_deferred:
+            deferred += 1
         else:
             failed += 1
             cleanup_logger.warning(f"  failed: {rname} (id={rid}) - {errmsg}")
+        if not retry_deferred:
+            progress.advance(rid, ok_)
 
         # Progress every 50 + first/last
         if i == 1 or i % 50 == 0 or i == len(candidates):
@@ -284,25 +707,75 @@ def run_cleanup(settings: Settings) -> bool:
                     f"floor-delay={rate.floor_delay}s"
                 )
 
-        # Proactive: pace next request based on bucket state
-        if i < len(candidates):
-            delay = rate.proactive_delay(candidates_left - 1)
-            if delay > 60:
+        # Proactive: pace next request from the per-window plan, which is
+        # rebuilt from the bucket state updated by this response
+        if i < len(candidates) and not breaker.is_open:
+            decision = planner.next_delay(candidates_left - 1)
+            if decision.stop:
+                deferred += len(candidates) - i
+                cleanup_logger.warning(
+                    f"Stopping pass: {decision.reason}. {len(candidates) - i} candidates "
+                    f"left for the next pass | {rate.quota_summary()}"
+                )
+                break
+            if decision.delay > 60:
                 cleanup_logger.warning(
                     f"  Quota at reserve floor ({rate.remaining}/{rate.limit}, "
-                    f"reserve {rate.reserved()}). Sleeping {fmt_duration(delay)} "
+                    f"reserve {rate.reserved()}). Sleeping {fmt_duration(decision.delay)} "
                     f"until reset to leave headroom for other consumers..."
                 )
-            time.sleep(delay)
+                cleanup_logger.info(planner.summary(candidates_left - 1))
+            reason = decision.reason or f"pacing ({planner.policy})"
+            if _traced_sleep(decision.delay, reason, rate, stats):
+                deferred += len(candidates) - i
+                interrupted = True
+                break
 
     elapsed = time.time() - start
+    sp = tracing.current()
+    sp.set_attribute("cleanup.candidates", len(candidates))
+    sp.set_attribute("cleanup.deleted", deleted)
+    sp.set_attribute("cleanup.failed", failed)
+    sp.set_attribute("cleanup.deferred", deferred)
+    sp.set_attribute("cleanup.secondary_hits", rate.secondary_hits)
+    stats.delete_sec = elapsed
+    stats.deleted = deleted
+    stats.failed = failed
+    stats.deferred = deferred
+    stats.secondary_hits = rate.secondary_hits
+    stats.floor_delay = rate.floor_delay
+    pool.save_tuning()
+    status = "interrupted" if interrupted else "deferred" if deferred else "complete"
+    stats.outcome = (
+        "circuit open" if tripped else "failed" if failed and not interrupted else status
+    )
+    progress.finish(status)
+    if interrupted:
+        cleanup_logger.warning(
+            f"Interrupted by shutdown - deleted {deleted}, failed {failed}, "
+            f"{deferred} left for the next pass (progress saved)"
+        )
+        return failed == 0
+    if tripped:
+        cleanup_logger.warning(
+            f"Stopped pass on the open GitHub API circuit - deleted {deleted}, failed "
+            f"{failed}, {deferred} left for the follow-up pass (progress saved)"
+        )
+        return False
     if failed:
         cleanup_logger.warning(
             f"Done with errors - deleted {deleted}, failed {failed}, "
-            f"total time {fmt_duration(elapsed)}"
+            f"deferred {deferred}, total time {fmt_duration(elapsed)}"
         )
         return False
 
+    if deferred:
+        cleanup_logger.success(
+            f"Stopped cleanly - deleted {deleted} offline runners in "
+            f"{fmt_duration(elapsed)}, {deferred} deferred to the next pass"
+        )
+        return True
+
     cleanup_logger.success(
         f"Done - deleted {deleted} offline runners in {fmt_duration(elapsed)}"
     )
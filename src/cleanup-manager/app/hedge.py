@@ -0,0 +1,137 @@
+"""
+Cleanup Manager - Hedged GETs
+
+Some /actions/runners pages take many seconds when they land on a slow
+GitHub backend, and a pass lists its pages one after another, so one
+slow page delays the whole pass. With CLEANUP_LIST_HEDGE a page that
+has not answered by the hedge deadline is requested a second time, and
+whichever response arrives first is used. The slower request is left
+to finish in the background and its answer is dropped.
+
+    deadline   CLEANUP_LIST_HEDGE_PERCENTILE of the recent page latencies
+               (CLEANUP_LIST_HEDGE_INITIAL_DELAY until enough are known),
+               never below CLEANUP_LIST_HEDGE_MIN_DELAY
+    budget     at most CLEANUP_LIST_HEDGE_BUDGET_PCT extra requests per
+               GET over the recent history, and none while the bucket
+               has no usable quota left
+
+Only idempotent GETs are hedged. Latencies and the budget counters are
+persisted, so short passes can still hedge their occasional slow page.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+import tracing
+from config import Settings
+from rate_limit import QuotaView
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "hedge-latency.json"
+# Latencies kept for the percentile
+MAX_SAMPLES = 200
+# Below this many samples the initial delay is used
+MIN_SAMPLES = 20
+# Requests the budget looks back over (older counts are scaled down)
+BUDGET_HORIZON = 1000
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+
+class Hedger:
+    """Duplicates slow idempotent requests within a quota budget."""
+
+    def __init__(self, settings: Settings, rate: QuotaView):
+        self.rate = rate
+        self.percentile = settings.cleanup_list_hedge_percentile
+        self.budget_pct = settings.cleanup_list_hedge_budget_pct
+        self.min_delay = settings.cleanup_list_hedge_min_delay
+        self.initial_delay = settings.cleanup_list_hedge_initial_delay
+        self._lock = threading.Lock()
+        self._state_file = state_path(settings, STATE_FILE)
+        state = load_json(self._state_file, {}) or {}
+        self.samples: list[float] = [float(s) for s in state.get("samples", [])][-MAX_SAMPLES:]
+        self.requests: float = float(state.get("requests", 0))
+        self.hedged: float = float(state.get("hedged", 0))
+        # This pass only
+        self.pass_requests = 0
+        self.pass_hedged = 0
+        self.pass_wins = 0
+
+    def save(self) -> None:
+        with self._lock:
+            doc = {
+                "samples": list(self.samples),
+                "requests": self.requests,
+                "hedged": self.hedged,
+            }
+        save_json(self._state_file, doc)
+
+    def deadline(self) -> float:
+        """Seconds to wait for a response before hedging it."""
+        with self._lock:
+            if len(self.samples) < MIN_SAMPLES:
+                return max(self.initial_delay, self.min_delay)
+            return max(_percentile(self.samples, self.percentile), self.min_delay)
+
+    def _budget_left(self) -> bool:
+        with self._lock:
+            within = self.hedged + 1 <= self.budget_pct * self.requests
+        return within and self.rate.usable() > 0
+
+    def _start(self, fn, args) -> Future:
+        """Run fn(*args) on a daemon thread; record its latency when done."""
+        fut: Future = Future()
+        started = time.time()
+        ctx = contextvars.copy_context()
+
+        def run() -> None:
+            try:
+                result = ctx.run(fn, *args)
+            except BaseException as e:
+                fut.set_exception(e)
+                return
+            with self._lock:
+                self.samples.append(time.time() - started)
+                del self.samples[:-MAX_SAMPLES]
+            fut.set_result(result)
+
+        # Daemon: a losing request must not hold up the process on exit
+        threading.Thread(target=run, daemon=True).start()
+        return fut
+
+    def call(self, fn, *args):
+        """fn(*args), duplicated if it is slower than the deadline."""
+        with self._lock:
+            self.requests += 1
+            if self.requests > BUDGET_HORIZON:
+                scale = BUDGET_HORIZON / self.requests
+                self.requests *= scale
+                self.hedged *= scale
+        self.pass_requests += 1
+        primary = self._start(fn, args)
+        done, _ = wait([primary], timeout=self.deadline())
+        if done or not self._budget_left():
+            return primary.result()
+
+        with self._lock:
+            self.hedged += 1
+        self.pass_hedged += 1
+        tracing.current().set_attribute("http.hedged", True)
+        hedge = self._start(fn, args)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    if fut is hedge:
+                        self.pass_wins += 1
+                    return fut.result()
+        # Both failed: report the original request's error
+        return primary.result()
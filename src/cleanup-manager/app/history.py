@@ -0,0 +1,278 @@
+"""
+Cleanup Manager - Pass History Ledger
+
+Every cleanup pass that actually runs appends one row to a small
+SQLite database on the cleanup-state volume (cleanup-history.db):
+phase timings, runner counts, achieved request rate, secondary-limit
+hits, final floor_delay and quota at start and end. Each row also
+carries a build fingerprint (hash of the app sources + Python version),
+so a code or image update shows up as a new build in the report.
+
+`main.py --report [N]` prints the last N passes, percentiles and
+per-build medians, and flags the latest pass where it regressed
+against the ones before it.
+"""
+
+import hashlib
+import platform
+import sqlite3
+import statistics
+import time
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from pathlib import Path
+
+from config import Settings
+from console import cleanup_logger, console, fmt_duration
+from state import state_path
+
+
+DB_FILE = "cleanup-history.db"
+
+# Latest pass vs. median of the previous ones
+REGRESSION_RATE_FACTOR = 0.7     # req/s below 70% of median
+REGRESSION_LATENCY_FACTOR = 1.5  # per-request API time above 150% of median
+REGRESSION_MIN_BASELINE = 3      # passes needed before comparing
+
+
+@dataclass
+class PassStats:
+    """Measurements of one cleanup pass (one history row)."""
+
+    started_at: float = 0.0
+    outcome: str = "error"
+    resume: bool = False
+    build: str = ""
+    duration_sec: float = 0.0
+    auth_sec: float = 0.0
+    list_sec: float = 0.0
+    # List page requests that were hedged (CLEANUP_LIST_HEDGE)
+    list_hedged: int = 0
+    delete_sec: float = 0.0
+    sleep_sec: float = 0.0
+    listed: int = 0
+    offline: int = 0
+    candidates: int = 0
+    deleted: int = 0
+    failed: int = 0
+    deferred: int = 0
+    requests: int = 0
+    secondary_hits: int = 0
+    floor_delay: float = 0.0
+    quota_start: int | None = None
+    quota_end: int | None = None
+    quota_limit: int | None = None
+
+    @property
+    def req_per_sec(self) -> float:
+        return self.requests / self.delete_sec if self.delete_sec > 0 else 0.0
+
+    @property
+    def api_sec_per_request(self) -> float:
+        """Wall time per delete request excluding pacing/retry sleeps."""
+        active = self.delete_sec - self.sleep_sec
+        return active / self.requests if self.requests and active > 0 else 0.0
+
+    def note_quota(self, rate) -> None:
+        """Record quota after a response; the first call fixes quota_start."""
+        if self.quota_start is None:
+            self.quota_start = rate.remaining
+        self.quota_end = rate.remaining
+        self.quota_limit = rate.limit
+
+
+def build_fingerprint() -> str:
+    """Short hash of the app sources plus the Python version."""
+    digest = hashlib.sha256(platform.python_version().encode())
+    for path in sorted(Path(__file__).parent.glob("*.py")):
+        try:
+            digest.update(path.read_bytes())
+        except OSError:
+            continue
+    return digest.hexdigest()[:10]
+
+
+def new_stats(resume: bool) -> PassStats:
+    return PassStats(started_at=time.time(), resume=resume, build=build_fingerprint())
+
+
+# SQLite columns are untyped on purpose: PassStats is the schema
+_COLUMNS = [f.name for f in fields(PassStats)]
+
+
+def _connect(settings: Settings) -> sqlite3.Connection:
+    path = state_path(settings, DB_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS passes (id INTEGER PRIMARY KEY, {', '.join(_COLUMNS)})"
+    )
+    # Columns added by later versions of PassStats
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(passes)")}
+    for name in _COLUMNS:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE passes ADD COLUMN {name}")
+    return conn
+
+
+def record_pass(settings: Settings, stats: PassStats) -> None:
+    """Append one pass to the ledger. Never fails the pass itself."""
+    try:
+        conn = _connect(settings)
+        try:
+            with conn:
+                row = asdict(stats)
+                conn.execute(
+                    f"INSERT INTO passes ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                    [row[c] for c in _COLUMNS],
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        cleanup_logger.warning(f"Could not record pass history: {e}")
+
+
+def load_passes(settings: Settings, limit: int) -> list[PassStats]:
+    """The last `limit` passes, oldest first."""
+    if not state_path(settings, DB_FILE).exists():
+        return []
+    conn = _connect(settings)
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM passes ORDER BY started_at DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+    finally:
+        conn.close()
+    out = [PassStats(**dict(zip(_COLUMNS, row))) for row in reversed(rows)]
+    for s in out:
+        s.resume = bool(s.resume)
+    return out
+
+
+def _pct(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def regressions(passes: list[PassStats]) -> list[str]:
+    """Ways the latest pass that deleted something is worse than its predecessors."""
+    worked = [p for p in passes if p.requests > 0]
+    if len(worked) <= REGRESSION_MIN_BASELINE:
+        return []
+    latest, baseline = worked[-1], worked[:-1]
+    found = []
+
+    base_rate = statistics.median(p.req_per_sec for p in baseline)
+    if base_rate > 0 and latest.req_per_sec < base_rate * REGRESSION_RATE_FACTOR:
+        found.append(
+            f"req/s {latest.req_per_sec:.2f} vs median {base_rate:.2f} "
+            f"({latest.req_per_sec / base_rate - 1:+.0%})"
+        )
+    base_lat = statistics.median(p.api_sec_per_request for p in baseline)
+    if base_lat > 0 and latest.api_sec_per_request > base_lat * REGRESSION_LATENCY_FACTOR:
+        found.append(
+            f"API time/request {latest.api_sec_per_request * 1000:.0f}ms vs median "
+            f"{base_lat * 1000:.0f}ms ({latest.api_sec_per_request / base_lat - 1:+.0%})"
+        )
+    base_hits = statistics.median(p.secondary_hits for p in baseline)
+    if latest.secondary_hits > max(base_hits, 0):
+        found.append(f"secondary hits {latest.secondary_hits} vs median {base_hits:g}")
+    base_fail = statistics.median(p.failed / max(p.requests, 1) for p in baseline)
+    fail_ratio = latest.failed / max(latest.requests, 1)
+    if latest.failed and fail_ratio > base_fail * 2:
+        found.append(f"failure ratio {fail_ratio:.1%} vs median {base_fail:.1%}")
+    if latest.build != baseline[-1].build and found:
+        found.append(f"first seen after build change {baseline[-1].build} -> {latest.build}")
+    return found
+
+
+def print_report(settings: Settings, limit: int = 20) -> None:
+    """Print the last `limit` passes, their percentiles and regressions."""
+    from rich.table import Table
+
+    passes = load_passes(settings, limit)
+    if not passes:
+        console.print("[dim]No cleanup passes recorded yet.[/]")
+        return
+
+    table = Table(title=f"Last {len(passes)} cleanup passes")
+    for col in (
+        "Started", "Outcome", "Duration", "List", "Delete", "Listed", "Cand.",
+        "Deleted", "Failed", "req/s", "ms/req", "2nd hits", "Floor", "Quota", "Build",
+    ):
+        table.add_column(col, justify="left" if col in ("Started", "Outcome", "Build") else "right")
+    for p in passes:
+        quota = (
+            f"{p.quota_start}->{p.quota_end}" if p.quota_start is not None else "-"
+        )
+        table.add_row(
+            datetime.fromtimestamp(p.started_at).strftime("%Y-%m-%d %H:%M"),
+            p.outcome + (" (resume)" if p.resume else ""),
+            fmt_duration(p.duration_sec),
+            fmt_duration(p.list_sec),
+            fmt_duration(p.delete_sec),
+            str(p.listed),
+            str(p.candidates),
+            str(p.deleted),
+            str(p.failed),
+            f"{p.req_per_sec:.2f}",
+            f"{p.api_sec_per_request * 1000:.0f}",
+            str(p.secondary_hits),
+            f"{p.floor_delay:g}s",
+            quota,
+            p.build,
+        )
+    console.print(table)
+
+    worked = [p for p in passes if p.requests > 0]
+    if worked:
+        rates = [p.req_per_sec for p in worked]
+        lat = [p.api_sec_per_request * 1000 for p in worked]
+        durations = [p.duration_sec for p in worked]
+        console.print(
+            f"[dim]Passes with deletes: {len(worked)}[/]\n"
+            f"  req/s        p50 {_pct(rates, 50):.2f}  p90 {_pct(rates, 90):.2f}  "
+            f"min {min(rates):.2f}\n"
+            f"  ms/request   p50 {_pct(lat, 50):.0f}  p90 {_pct(lat, 90):.0f}  "
+            f"p99 {_pct(lat, 99):.0f}\n"
+            f"  duration     p50 {fmt_duration(_pct(durations, 50))}  "
+            f"p90 {fmt_duration(_pct(durations, 90))}"
+        )
+
+        by_build: dict[str, list[PassStats]] = {}
+        for p in worked:
+            by_build.setdefault(p.build, []).append(p)
+        if len(by_build) > 1:
+            console.print("[dim]Per build (oldest first):[/]")
+            for build, group in by_build.items():
+                console.print(
+                    f"  {build}  passes {len(group):>3}  "
+                    f"req/s p50 {statistics.median(p.req_per_sec for p in group):.2f}  "
+                    f"ms/req p50 {statistics.median(p.api_sec_per_request for p in group) * 1000:.0f}"
+                )
+
+    listed = [p for p in passes if p.listed > 0]
+    if listed:
+        list_times = [p.list_sec for p in listed]
+        hedged = sum(p.list_hedged or 0 for p in listed)
+        console.print(
+            f"[dim]Passes that listed: {len(listed)}[/]\n"
+            f"  listing      p50 {fmt_duration(_pct(list_times, 50))}  "
+            f"p99 {fmt_duration(_pct(list_times, 99))}"
+            + (f"  ({hedged} pages hedged)" if hedged else "")
+        )
+
+    found = regressions(passes)
+    if found:
+        console.print("[yellow]! Latest pass regressed:[/]")
+        for line in found:
+            console.print(f"  [yellow]- {line}[/]")
+    elif len(worked) > REGRESSION_MIN_BASELINE:
+        console.print("[green]+ Latest pass within the usual range[/]")
@@ -0,0 +1,132 @@
+"""
+Cleanup Manager - Local HTTP/JSON Server
+
+Tiny route-table wrapper around http.server.ThreadingHTTPServer for the
+sidecar services that answer agents and internal consumers on the
+runner network. Handlers receive (query, body, handler) and return
+(status, payload); dict/list payloads are serialized as JSON, str as
+text/plain.
+
+Binary uploads (application/octet-stream, application/x-tar) are not
+buffered: the route streams them from handler.rfile itself.
+
+start_unix_server() serves the same route table on a unix socket, for
+services that are reached through a shared volume instead of the
+network (curl --unix-socket).
+"""
+
+import json
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable
+from urllib.parse import parse_qs, urlparse
+
+from console import cleanup_logger
+
+STREAMED_TYPES = ("application/octet-stream", "application/x-tar")
+
+Route = Callable[[dict, bytes, BaseHTTPRequestHandler], tuple[int, object]]
+
+
+def _make_handler(routes: dict[tuple[str, str], Route]):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "cleanup-manager"
+
+        def _dispatch(self, method: str) -> None:
+            parsed = urlparse(self.path)
+            route = routes.get((method, parsed.path))
+            if route is None:
+                self._send(404, {"error": f"no route for {method} {parsed.path}"})
+                return
+            query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+            length = int(self.headers.get("Content-Length") or 0)
+            streamed = self.headers.get_content_type() in STREAMED_TYPES
+            body = self.rfile.read(length) if length and not streamed else b""
+            try:
+                status, payload = route(query, body, self)
+            except ValueError as e:
+                status, payload = 400, {"error": str(e)}
+            except Exception as e:
+                cleanup_logger.error(f"{method} {parsed.path} failed: {e}")
+                status, payload = 500, {"error": str(e)}
+            self._send(status, payload)
+
+        def _send(self, status: int, payload) -> None:
+            if isinstance(payload, (dict, list)):
+                data = json.dumps(payload, indent=2).encode()
+                ctype = "application/json"
+            else:
+                data = str(payload or "").encode()
+                ctype = "text/plain; charset=utf-8"
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            self._dispatch("GET")
+
+        def do_POST(self) -> None:
+            self._dispatch("POST")
+
+        def do_PUT(self) -> None:
+            self._dispatch("PUT")
+
+        def address_string(self) -> str:
+            # Unix-socket peers have no address
+            return self.client_address[0] if self.client_address else "unix"
+
+        def log_message(self, fmt: str, *args) -> None:
+            cleanup_logger.debug(f"{self.address_string()} {fmt % args}")
+
+    return Handler
+
+
+def start_server(
+    bind: str, port: int, routes: dict[tuple[str, str], Route]
+) -> ThreadingHTTPServer:
+    """Start serving `routes` in a daemon thread and return the server."""
+    server = ThreadingHTTPServer((bind, port), _make_handler(routes))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name=f"httpd-{port}", daemon=True)
+    thread.start()
+    cleanup_logger.info(f"Listening on http://{bind}:{port}")
+    return server
+
+
+class _ThreadingUnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def start_unix_server(
+    path: str, routes: dict[tuple[str, str], Route], mode: int = 0o666
+) -> socketserver.ThreadingUnixStreamServer:
+    """Serve `routes` on unix socket `path` (replacing a stale one) in a daemon thread."""
+    sock = Path(path)
+    sock.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        sock.unlink()
+    except FileNotFoundError:
+        pass
+    server = _ThreadingUnixHTTPServer(str(sock), _make_handler(routes))
+    os.chmod(sock, mode)
+    thread = threading.Thread(target=server.serve_forever, name=f"httpd-{sock.name}", daemon=True)
+    thread.start()
+    cleanup_logger.info(f"Listening on unix://{sock}")
+    return server
+
+
+def parse_json_body(body: bytes) -> dict:
+    if not body:
+        return {}
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise ValueError(f"invalid JSON body: {e}") from e
+    if not isinstance(data, dict):
+        raise ValueError("JSON body must be an object")
+    return data
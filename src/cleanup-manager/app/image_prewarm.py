@@ -0,0 +1,205 @@
+"""
+Cleanup Manager - DinD Image Pre-Warmer
+
+Learns which images jobs pull into the DinD daemon and keeps the
+hottest ones warm, so a fresh dind-data volume (first start,
+`runner.sh cleanup --full`, DinD restart) does not make every job pay
+for cold registry downloads.
+
+Every tick:
+    1. Record: image pull events since the previous tick update a
+       per-image hit count and an exponentially decayed heat score
+       (PREWARM_HALF_LIFE_HOURS), which blends frequency and recency.
+    2. Restore: hot images missing from the daemon are pulled right
+       away - that only happens after a volume wipe or DinD restart.
+    3. Refresh: during idle windows (no more than
+       PREWARM_IDLE_MAX_CONTAINERS running job containers) hot images
+       older than PREWARM_REFRESH_HOURS are re-pulled to pick up new
+       tag digests before the next job needs them.
+
+Every pull the pre-warmer makes is timed; `main.py --prewarm-report`
+prints per-image pull latency next to the heat ranking. Pulls go
+through DinD's registry mirror when docker-compose.image-cache.yml is
+active, which keeps the layers on the local pull-through cache.
+"""
+
+import math
+import time
+
+from config import Settings
+from console import cleanup_logger, console, fmt_duration
+from docker_api import DockerAPIError, DockerClient
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "image-prewarm.json"
+MAX_LATENCY_SAMPLES = 20
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def normalize_ref(ref: str) -> str:
+    """Make refs comparable: implicit :latest, no docker.io/library/ prefix,
+    no tag next to a digest (Docker keeps `repo@sha256:...` in RepoDigests)."""
+    for prefix in ("docker.io/library/", "docker.io/"):
+        if ref.startswith(prefix):
+            ref = ref[len(prefix):]
+            break
+    if "@" in ref:
+        repo, digest = ref.split("@", 1)
+        if ":" in repo.rsplit("/", 1)[-1]:
+            repo = repo.rsplit(":", 1)[0]
+        return f"{repo}@{digest}"
+    name = ref.rsplit("/", 1)[-1]
+    if ":" not in name:
+        ref = f"{ref}:latest"
+    return ref
+
+
+class ImagePrewarmer:
+    """Tracks job image pulls in DinD and pre-pulls the hottest ones."""
+
+    def __init__(self, settings: Settings, client: DockerClient | None = None):
+        self.settings = settings
+        self.client = client or DockerClient(settings.dind_host)
+        self._state_file = state_path(settings, STATE_FILE)
+        state = load_json(self._state_file, {}) or {}
+        self.images: dict[str, dict] = dict(state.get("images", {}))
+        self.events_since: float = float(state.get("events_since", time.time()))
+        self._daemon_up = True
+        # (ref, start, end) of our own pulls - their events are not job demand
+        self._own_pulls: list[tuple[str, float, float]] = []
+
+    def save(self) -> None:
+        save_json(self._state_file, {"images": self.images, "events_since": self.events_since})
+
+    # ---- Scoring ----
+
+    def _decayed(self, entry: dict, now: float) -> float:
+        half_life = self.settings.prewarm_half_life_hours * 3600
+        age = max(now - entry.get("last_seen", now), 0.0)
+        return entry.get("score", 0.0) * math.pow(0.5, age / half_life)
+
+    def record_pull(self, ref: str, ts: float) -> None:
+        ref = normalize_ref(ref)
+        entry = self.images.setdefault(ref, {"count": 0, "score": 0.0, "last_seen": ts})
+        entry["score"] = self._decayed(entry, ts) + 1.0
+        entry["count"] = entry.get("count", 0) + 1
+        entry["last_seen"] = max(entry.get("last_seen", ts), ts)
+
+    def hottest(self, now: float | None = None) -> list[tuple[str, float]]:
+        now = now or time.time()
+        ranked = sorted(
+            ((ref, self._decayed(e, now)) for ref, e in self.images.items()),
+            key=lambda x: x[1],
+            reverse=True,
+        )
+        return [(ref, score) for ref, score in ranked[: self.settings.prewarm_top_n] if score >= 0.05]
+
+    # ---- Daemon interaction ----
+
+    def _observe(self, now: float) -> None:
+        events = self.client.events(self.events_since, now, {"type": ["image"], "event": ["pull"]})
+        for ev in events:
+            ref = (ev.get("Actor") or {}).get("ID") or ev.get("id") or ""
+            ts = ev.get("timeNano", 0) / 1e9 or float(ev.get("time") or now)
+            if not ref or ref.startswith("sha256:") or self._is_own_pull(ref, ts):
+                continue
+            self.record_pull(ref, ts)
+        self.events_since = now
+        self._own_pulls = [p for p in self._own_pulls if p[2] >= now]
+
+    def _is_own_pull(self, ref: str, ts: float) -> bool:
+        ref = normalize_ref(ref)
+        return any(r == ref and start <= ts <= end for r, start, end in self._own_pulls)
+
+    def _present_refs(self) -> set[str]:
+        refs: set[str] = set()
+        for img in self.client.images():
+            # Pinned workflows pull by digest, which only RepoDigests lists
+            for ref in (img.get("RepoTags") or []) + (img.get("RepoDigests") or []):
+                if not ref.startswith("<none>"):
+                    refs.add(normalize_ref(ref))
+        return refs
+
+    def _pull(self, ref: str, reason: str) -> None:
+        start = time.time()
+        try:
+            self.client.pull(ref)
+        except (OSError, DockerAPIError) as e:
+            self._own_pulls.append((ref, start, time.time() + 1))
+            cleanup_logger.warning(f"Pre-pull of {ref} failed: {e}")
+            return
+        latency = time.time() - start
+        self._own_pulls.append((ref, start, time.time() + 1))
+        entry = self.images.setdefault(ref, {"count": 0, "score": 0.0, "last_seen": start})
+        samples = entry.setdefault("latencies", [])
+        samples.append(round(latency, 2))
+        del samples[:-MAX_LATENCY_SAMPLES]
+        entry["last_prewarm"] = time.time()
+        cleanup_logger.status(f"  pre-pulled {ref} ({reason}) in {latency:.1f}s")
+
+    def tick(self) -> None:
+        now = time.time()
+        if not self.client.ping():
+            if self._daemon_up:
+                cleanup_logger.warning("DinD daemon unreachable, waiting for it to come back")
+            self._daemon_up = False
+            return
+        restarted = not self._daemon_up
+        self._daemon_up = True
+        if restarted:
+            cleanup_logger.info("DinD daemon is back, restoring hot images")
+
+        self._observe(now)
+        hot = self.hottest(now)
+        if not hot:
+            self.save()
+            return
+
+        present = self._present_refs()
+        missing = [ref for ref, _ in hot if ref not in present]
+        for ref in missing:
+            self._pull(ref, "missing")
+
+        running = len(self.client.containers())
+        if running <= self.settings.prewarm_idle_max_containers:
+            refresh_after = self.settings.prewarm_refresh_hours * 3600
+            for ref, _ in hot:
+                if ref in missing:
+                    continue
+                if now - self.images[ref].get("last_prewarm", 0) >= refresh_after:
+                    self._pull(ref, "idle refresh")
+        self.save()
+
+
+def print_report(settings: Settings) -> None:
+    """Print the heat ranking and pre-pull latencies from persisted state."""
+    from rich.table import Table
+
+    warmer = ImagePrewarmer(settings)
+    now = time.time()
+
+    table = Table(title="DinD image pulls (hottest first)")
+    for col in ("Image", "Score", "Pulls", "Last pull", "Pre-pulls", "p50", "p95", "Last"):
+        table.add_column(col, justify="left" if col == "Image" else "right")
+    ranked = sorted(warmer.images.items(), key=lambda kv: warmer._decayed(kv[1], now), reverse=True)
+    for ref, e in ranked:
+        lat = e.get("latencies", [])
+        table.add_row(
+            ref,
+            f"{warmer._decayed(e, now):.2f}",
+            str(e.get("count", 0)),
+            f"{fmt_duration(now - e['last_seen'])} ago" if e.get("last_seen") else "-",
+            str(len(lat)),
+            f"{_percentile(lat, 50):.1f}s" if lat else "-",
+            f"{_percentile(lat, 95):.1f}s" if lat else "-",
+            f"{lat[-1]:.1f}s" if lat else "-",
+        )
+    console.print(table)
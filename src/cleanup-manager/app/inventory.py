@@ -0,0 +1,206 @@
+"""
+Cleanup Manager - Runner Inventory Server
+
+Dashboards and scripts that list runners straight from GitHub spend the
+same bucket CLEANUP_RESERVE_PCT tries to protect. This service keeps
+one copy of the runner inventory and serves it on the runner network
+(and 127.0.0.1 on the host) instead:
+
+    GET /runners?status=online&busy=false&label=linux&prefix=self-hosted
+        runners matching every given filter, from the in-memory snapshot
+    GET /summary    counts by status and busy, snapshot age
+    GET /healthz
+
+Without a snapshot yet, a request reads through to GitHub. Every
+INVENTORY_INTERVAL_SECONDS the inventory is refreshed page by
+page with conditional requests (If-None-Match with each page's ETag).
+Unchanged pages come back as 304, which GitHub does not count against
+the rate limit, so a quiet fleet costs close to nothing. The snapshot
+and its ETags are persisted, so a restart serves at once and keeps
+polling conditionally.
+"""
+
+import threading
+import time
+import urllib.error
+
+from auth import resolve_token
+from config import Settings
+from console import cleanup_logger
+from github_api import fetch_runner_page
+from httpd import start_server
+from jit_broker import API_TOKEN_TTL
+from rate_limit import RateLimit
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "runner-inventory.json"
+PAGE_SIZE = 100
+
+_API_ERRORS = (urllib.error.URLError, OSError, ValueError, RuntimeError, KeyError)
+
+
+def runner_labels(runner: dict) -> set[str]:
+    return {(lbl.get("name") or "").lower() for lbl in runner.get("labels") or []}
+
+
+class RunnerInventory:
+    """Conditionally polled runner list, served to internal consumers."""
+
+    def __init__(self, settings: Settings, state_file: str = STATE_FILE):
+        self.settings = settings
+        self.scope = settings.api_scope
+        self.rate = RateLimit(reserve_pct=settings.cleanup_reserve_pct)
+        self._lock = threading.Lock()
+        # One refresh at a time: the service loop or a read-through request
+        self._refresh_lock = threading.Lock()
+        self._state_file = state_path(settings, state_file)
+        state = load_json(self._state_file, {}) or {}
+        if state.get("scope") != self.scope:
+            state = {}
+        # One entry per page: {"etag": ..., "runners": [...]}
+        self.pages: list[dict] = list(state.get("pages", []))
+        self.fetched_at: float = float(state.get("fetched_at", 0.0))
+        self.version: int = int(state.get("version", 0))
+        self.stats = {"requests": 0, "not_modified": 0, "refreshes": 0, "errors": 0}
+        self._token: str | None = None
+        self._token_at = 0.0
+
+    def save(self) -> None:
+        with self._lock:
+            doc = {
+                "scope": self.scope,
+                "pages": list(self.pages),
+                "fetched_at": self.fetched_at,
+                "version": self.version,
+            }
+        save_json(self._state_file, doc)
+
+    def _github_token(self) -> str:
+        if self._token is None or time.time() - self._token_at > API_TOKEN_TTL:
+            self._token, _ = resolve_token(self.settings)
+            self._token_at = time.time()
+        return self._token
+
+    # ---- Refresh ----
+
+    def refresh(self) -> bool:
+        """Re-poll every page conditionally. True if anything changed."""
+        token = self._github_token()
+        pages: list[dict] = []
+        changed = False
+        page = 1
+        while True:
+            cached = self.pages[page - 1] if page <= len(self.pages) else {}
+            runners, etag = fetch_runner_page(
+                self.scope, token, page, cached.get("etag", ""), self.rate
+            )
+            self.stats["requests"] += 1
+            if runners is None:
+                self.stats["not_modified"] += 1
+                runners = cached["runners"]
+            else:
+                changed = True
+            pages.append({"etag": etag, "runners": runners})
+            if len(runners) < PAGE_SIZE:
+                break
+            page += 1
+        changed = changed or len(pages) != len(self.pages)
+        with self._lock:
+            self.pages = pages
+            self.fetched_at = time.time()
+            if changed:
+                self.version += 1
+        self.stats["refreshes"] += 1
+        return changed
+
+    def tick(self) -> None:
+        try:
+            with self._refresh_lock:
+                changed = self.refresh()
+        except _API_ERRORS as e:
+            self.stats["errors"] += 1
+            cleanup_logger.warning(f"Inventory refresh failed, serving the last snapshot: {e}")
+            return
+        if changed:
+            cleanup_logger.status(
+                f"Inventory v{self.version}: {len(self.runners())} runners "
+                f"({self.rate.remaining}/{self.rate.limit} quota left)"
+            )
+        self.save()
+
+    # ---- Queries ----
+
+    def runners(self) -> list[dict]:
+        with self._lock:
+            return [r for p in self.pages for r in p["runners"]]
+
+    def query(
+        self, status: str = "", busy: str = "", label: str = "", prefix: str = ""
+    ) -> list[dict]:
+        out = self.runners()
+        if status:
+            out = [r for r in out if r.get("status") == status]
+        if busy:
+            want = busy.lower() in ("1", "true", "yes")
+            out = [r for r in out if bool(r.get("busy")) == want]
+        for lbl in (x.strip().lower() for x in label.split(",") if x.strip()):
+            out = [r for r in out if lbl in runner_labels(r)]
+        if prefix:
+            out = [r for r in out if (r.get("name") or "").startswith(prefix)]
+        return out
+
+    def summary(self) -> dict:
+        runners = self.runners()
+        by_status: dict[str, int] = {}
+        for r in runners:
+            status = r.get("status", "unknown")
+            by_status[status] = by_status.get(status, 0) + 1
+        return {
+            "scope": self.scope,
+            "total": len(runners),
+            "by_status": by_status,
+            "busy": sum(1 for r in runners if r.get("busy")),
+            "version": self.version,
+            "fetched_at": self.fetched_at,
+            "age_seconds": round(time.time() - self.fetched_at, 1) if self.fetched_at else None,
+            "polling": dict(self.stats),
+        }
+
+    # ---- Service ----
+
+    def routes(self) -> dict:
+        def runners(query, _body, _handler):
+            if not self.fetched_at:
+                # Read through on a cold start (no snapshot on disk yet)
+                self.tick()
+            if not self.fetched_at:
+                return 503, {"error": "inventory not loaded yet"}
+            found = self.query(
+                query.get("status", ""),
+                query.get("busy", ""),
+                query.get("label", ""),
+                query.get("prefix", ""),
+            )
+            return 200, {
+                "version": self.version,
+                "fetched_at": self.fetched_at,
+                "age_seconds": round(time.time() - self.fetched_at, 1),
+                "total_count": len(found),
+                "runners": found,
+            }
+
+        def summary(_query, _body, _handler):
+            return 200, self.summary()
+
+        def health(_query, _body, _handler):
+            return 200, "ok"
+
+        return {
+            ("GET", "/runners"): runners,
+            ("GET", "/summary"): summary,
+            ("GET", "/healthz"): health,
+        }
+
+    def serve(self) -> None:
+        start_server(self.settings.inventory_bind, self.settings.inventory_port, self.routes())
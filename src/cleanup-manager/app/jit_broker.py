@@ -0,0 +1,278 @@
+"""
+Cleanup Manager - JIT Runner Config Broker
+
+Without the broker every ephemeral agent container authenticates on its
+own (PAT, or App JWT -> installation token), asks for a registration
+token and runs config.sh before it can take a job - on every restart.
+The broker does the GitHub side once, ahead of time:
+
+    jit mode (default)
+        Keeps JIT_POOL_SIZE just-in-time runner configs
+        (POST .../actions/runners/generate-jitconfig) ready. An agent
+        leases one over the unix socket and starts the listener with
+        `run.sh --jitconfig` directly - no config.sh, no credentials in
+        the agent. Every config is single-use.
+    token mode
+        Caches one registration token (valid 1h, reusable) and hands it
+        to every agent, which then runs the normal entrypoint with
+        RUNNER_TOKEN set - one API call per hour instead of per start.
+
+Bookkeeping (jit mode), persisted in jit-broker.json without the
+configs themselves (they are credentials):
+  - Pooled configs older than JIT_POOL_MAX_AGE_SECONDS are deleted from
+    GitHub and replaced, so the pool never hands out stale registrations.
+  - Leased configs are checked after JIT_LEASE_TIMEOUT_SECONDS: gone
+    (404) means the ephemeral runner ran and deregistered itself;
+    online means a job is running; still offline means the agent never
+    used it, so the registration is deleted.
+  - After a broker restart the pooled configs are lost with the process,
+    so their registrations are deleted on startup.
+"""
+
+import threading
+import time
+import urllib.error
+import uuid
+from collections import deque
+
+from auth import resolve_token
+from config import Settings
+from console import cleanup_logger
+from github_api import (
+    create_registration_token,
+    delete_runner,
+    generate_jitconfig,
+    get_runner,
+    parse_iso8601,
+    runner_group_id,
+)
+from httpd import parse_json_body, start_unix_server
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "jit-broker.json"
+# Installation tokens live 60 min; PATs ignore this
+API_TOKEN_TTL = 50 * 60
+# Refresh a cached registration token this long before it expires
+REG_TOKEN_MARGIN = 10 * 60
+
+_API_ERRORS = (urllib.error.URLError, OSError, ValueError, RuntimeError, KeyError)
+
+
+class JitBroker:
+    """Pre-generated runner registrations handed out to agents."""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.scope = settings.api_scope
+        self.mode = settings.jit_broker_mode
+        self._lock = threading.Lock()
+        self._auth_lock = threading.Lock()
+        self._pool: deque[dict] = deque()
+        self._leased: dict[str, dict] = {}
+        self._reg_token: dict | None = None
+        self._api_token: str | None = None
+        self._api_token_at = 0.0
+        self._group_id: int | None = None
+        self._state_file = state_path(settings, STATE_FILE)
+        self.handed_out = 0
+        self.pool_misses = 0
+
+    # ---- GitHub side ----
+
+    def _token(self) -> str:
+        with self._auth_lock:
+            if self._api_token is None or time.time() - self._api_token_at > API_TOKEN_TTL:
+                self._api_token, _ = resolve_token(self.settings)
+                self._api_token_at = time.time()
+            return self._api_token
+
+    def _labels(self) -> list[str]:
+        labels: list[str] = []
+        for raw in (self.settings.jit_base_labels, self.settings.runner_labels):
+            for label in raw.split(","):
+                label = label.strip()
+                if label and label not in labels:
+                    labels.append(label)
+        return labels
+
+    def _generate(self) -> dict:
+        token = self._token()
+        if self._group_id is None:
+            self._group_id = runner_group_id(self.scope, token, self.settings.runner_group)
+        name = f"{self.settings.runner_name_prefix}-jit-{uuid.uuid4().hex[:8]}"
+        data = generate_jitconfig(
+            self.scope, token, name, self._labels(), self._group_id, self.settings.runner_workdir
+        )
+        runner = data.get("runner") or {}
+        return {
+            "id": runner["id"],
+            "name": runner.get("name", name),
+            "config": data["encoded_jit_config"],
+            "created_at": time.time(),
+        }
+
+    def _delete(self, runner_id, name: str, why: str) -> None:
+        ok, _, errmsg, _ = delete_runner(self.scope, runner_id, self._token())
+        if ok:
+            cleanup_logger.status(f"  removed JIT registration {name} ({why})")
+        else:
+            cleanup_logger.warning(f"Could not remove JIT registration {name}: {errmsg}")
+
+    def _registration_token(self) -> dict:
+        with self._lock:
+            cached = self._reg_token
+        if cached and cached["expires_at"] - time.time() > REG_TOKEN_MARGIN:
+            return cached
+        data = create_registration_token(self.scope, self._token())
+        fresh = {"token": data["token"], "expires_at": parse_iso8601(data.get("expires_at", ""))}
+        if fresh["expires_at"] <= 0:
+            fresh["expires_at"] = time.time() + 3600
+        with self._lock:
+            self._reg_token = fresh
+        return fresh
+
+    # ---- Agent side ----
+
+    def lease(self, client: str) -> dict:
+        """Hand one config (or the registration token) to agent `client`."""
+        if self.mode == "token":
+            reg = self._registration_token()
+            self.handed_out += 1
+            return {"mode": "token", "token": reg["token"], "expires_at": reg["expires_at"]}
+
+        with self._lock:
+            entry = self._pool.popleft() if self._pool else None
+        if entry is None:
+            # Pool drained by a burst of agent starts: generate on demand
+            self.pool_misses += 1
+            entry = self._generate()
+        with self._lock:
+            self._leased[str(entry["id"])] = {
+                "name": entry["name"],
+                "client": client,
+                "leased_at": time.time(),
+                "checked_at": 0.0,
+            }
+            self.handed_out += 1
+        self.save()
+        cleanup_logger.status(f"  leased {entry['name']} to {client or 'agent'}")
+        return {
+            "mode": "jit",
+            "runner_id": entry["id"],
+            "name": entry["name"],
+            "encoded_jit_config": entry["config"],
+        }
+
+    # ---- Maintenance ----
+
+    def recover(self) -> None:
+        """Clean up pool entries a previous broker process left behind."""
+        if self.mode != "jit":
+            return
+        state = load_json(self._state_file, {}) or {}
+        self._leased = dict(state.get("leased", {}))
+        orphans = state.get("pool", [])
+        for entry in orphans:
+            try:
+                self._delete(entry["id"], entry.get("name", "?"), "config lost on restart")
+            except _API_ERRORS as e:
+                cleanup_logger.warning(f"Could not remove orphaned JIT registration: {e}")
+        self.save()
+
+    def save(self) -> None:
+        with self._lock:
+            doc = {
+                "pool": [
+                    {"id": e["id"], "name": e["name"], "created_at": e["created_at"]}
+                    for e in self._pool
+                ],
+                "leased": dict(self._leased),
+            }
+        save_json(self._state_file, doc)
+
+    def _expire_pool(self, now: float) -> None:
+        max_age = self.settings.jit_pool_max_age_seconds
+        with self._lock:
+            stale = [e for e in self._pool if now - e["created_at"] > max_age]
+            self._pool = deque(e for e in self._pool if e not in stale)
+        for entry in stale:
+            self._delete(entry["id"], entry["name"], "unclaimed past pool max age")
+
+    def _check_leases(self, now: float) -> None:
+        timeout = self.settings.jit_lease_timeout_seconds
+        with self._lock:
+            due = [
+                (rid, dict(lease))
+                for rid, lease in self._leased.items()
+                if now - lease["leased_at"] > timeout and now - lease["checked_at"] > timeout
+            ]
+        for rid, lease in due:
+            runner = get_runner(self.scope, int(rid), self._token())
+            if runner is None:
+                outcome = "used"
+            elif runner.get("status") == "online":
+                with self._lock:
+                    if rid in self._leased:
+                        self._leased[rid]["checked_at"] = now
+                continue
+            else:
+                self._delete(int(rid), lease["name"], f"never used by {lease.get('client') or 'agent'}")
+                outcome = "unused"
+            with self._lock:
+                self._leased.pop(rid, None)
+            cleanup_logger.debug(f"JIT lease {lease['name']} closed ({outcome})")
+
+    def _refill(self) -> None:
+        while True:
+            with self._lock:
+                missing = self.settings.jit_pool_size - len(self._pool)
+            if missing <= 0:
+                return
+            entry = self._generate()
+            with self._lock:
+                self._pool.append(entry)
+
+    def tick(self) -> None:
+        if self.mode == "token":
+            self._registration_token()
+            return
+        now = time.time()
+        try:
+            self._expire_pool(now)
+            self._check_leases(now)
+            self._refill()
+        finally:
+            self.save()
+
+    def routes(self) -> dict:
+        def lease(query, body, _handler):
+            data = {**query, **parse_json_body(body)}
+            try:
+                return 200, self.lease(str(data.get("client", ""))[:128])
+            except _API_ERRORS as e:
+                cleanup_logger.warning(f"Lease failed: {e}")
+                return 503, {"error": str(e)}
+
+        def status(_query, _body, _handler):
+            with self._lock:
+                return 200, {
+                    "mode": self.mode,
+                    "scope": self.scope,
+                    "pool": len(self._pool),
+                    "leased": len(self._leased),
+                    "handed_out": self.handed_out,
+                    "pool_misses": self.pool_misses,
+                }
+
+        def healthz(_query, _body, _handler):
+            return 200, "ok"
+
+        return {
+            ("POST", "/lease"): lease,
+            ("GET", "/status"): status,
+            ("GET", "/healthz"): healthz,
+        }
+
+    def serve(self) -> None:
+        start_unix_server(self.settings.jit_broker_socket, self.routes())
@@ -0,0 +1,89 @@
+"""
+Cleanup Manager - Pass Lease
+
+Mutual exclusion for cleanup passes across processes: the scheduled
+service, a one-off `runner.sh cleanup-runners` container and a second
+replica all share the cleanup-state volume. Holding the lease means
+"I am the only one listing and deleting runners right now".
+
+The lease is a small JSON document (owner + expiry) updated under an
+flock. A heartbeat thread renews it while held, so a crashed holder's
+lease simply expires after CLEANUP_LEASE_TTL seconds.
+"""
+
+import fcntl
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from config import Settings
+from console import cleanup_logger
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "cleanup-lease.json"
+
+
+class PassLease:
+    """Expiring, heartbeat-renewed lease on the cleanup pass."""
+
+    def __init__(self, settings: Settings):
+        self.ttl = settings.cleanup_lease_ttl
+        self._path = state_path(settings, STATE_FILE)
+        self._lock_path = self._path.with_suffix(".lock")
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self._stop = threading.Event()
+        self._heartbeat: threading.Thread | None = None
+
+    @contextmanager
+    def _locked(self):
+        self._lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._lock_path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def holder(self) -> dict | None:
+        """Current unexpired lease document, or None."""
+        doc = load_json(self._path, None)
+        if not doc or doc.get("expires_at", 0) <= time.time():
+            return None
+        return doc
+
+    def acquire(self) -> bool:
+        with self._locked():
+            doc = self.holder()
+            if doc and doc.get("owner") != self.owner:
+                return False
+            now = time.time()
+            save_json(self._path, {"owner": self.owner, "acquired_at": now, "expires_at": now + self.ttl})
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._renew_loop, name="lease-heartbeat", daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def _renew_loop(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            with self._locked():
+                doc = load_json(self._path, None) or {}
+                if doc.get("owner") != self.owner:
+                    cleanup_logger.warning("Cleanup lease was taken over by another process")
+                    return
+                doc["expires_at"] = time.time() + self.ttl
+                save_json(self._path, doc)
+
+    def release(self) -> None:
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.join(timeout=5)
+        with self._locked():
+            doc = load_json(self._path, None) or {}
+            if doc.get("owner") == self.owner:
+                try:
+                    self._path.unlink()
+                except OSError:
+                    pass
@@ -5,6 +5,38 @@ GitHub Runner Cleanup Manager - Entry Point
 Modes:
     python main.py            Service mode (scheduled, blocks until SIGTERM)
     python main.py --now      Run one cleanup pass immediately, then exit
+    python main.py --dind-gc  DinD image/build-cache manager (add --once for one check)
+    python main.py --tool-cache-broker
+                              Single-writer broker for the shared tool-cache volume
+    python main.py --jit-broker
+                              Hand pre-generated JIT runner configs to agents
+    python main.py --dind-telemetry
+                              Attribute DinD CPU/memory/IO to jobs (/metrics, /report)
+    python main.py --dind-telemetry-report
+                              Print top DinD consumers and saturation periods
+    python main.py --dind-placement
+                              Place agents on the least-loaded of several DinD shards
+    python main.py --prewarm  Pre-pull the hottest job images into DinD
+    python main.py --prewarm-report
+                              Print image heat ranking and pull latencies
+    python main.py --simulate-pacing [--days D] [--every H] [--policies plan,even]
+                              Replay D days of cleanup traffic per pacing policy
+    python main.py --status [--json]
+                              GitHub runners, agent/DinD containers and quota, joined
+    python main.py --report [N]
+                              Trends and regressions over the last N passes (20)
+    python main.py --agent-watch
+                              Deregister agents that die without deregistering
+    python main.py --inventory
+                              Serve the runner inventory (ETag-polled) over HTTP
+    python main.py --utilization
+                              Sample online/busy runners per label and group
+    python main.py --utilization-report [--days D]
+                              Utilization percentiles, hourly heatmap and sizing hints
+    python main.py --agent-bench [--burst N [--rounds R] | --duration SEC]
+                              Measure agent start -> online -> deregistered latency
+    python main.py --agent-bench-report
+                              Print recorded agent latency percentiles per image
 
 Reads configuration from environment variables (or .env if present in
 the working directory). The same variable names used by the runner
@@ -15,10 +47,13 @@ import os
 import sys
 from pathlib import Path
 
+import tracing
+from auth import parse_extra_apps, pem_env_var
 from config import Settings
 from console import cleanup_logger, console, print_banner, setup_logging
-from github_api import run_cleanup
+from github_api import probe_circuit, run_cleanup
 from scheduler import setup_scheduler
+from shutdown import install_signal_handlers, run_service
 
 
 # Constants for the unprivileged user baked into the Dockerfile.
@@ -34,7 +69,8 @@ def _drop_privileges_after_reading_secrets() -> None:
     Pattern:
       1. While still uid 0, read the GitHub App PEM (typically 0600
          root:root on the host) into an env var so the rest of the
-         process can use it without filesystem access.
+         process can use it without filesystem access. Same for the
+         PEMs of extra pooled Apps (EXTRA_APPS).
       2. Drop GID then UID to the cleanup user. After this point the
          process cannot regain root, even if a subsequent code path
          is compromised.
@@ -46,10 +82,19 @@ def _drop_privileges_after_reading_secrets() -> None:
     if os.geteuid() != 0:
         return
 
-    pem_path = Path(os.environ.get("APP_PRIVATE_KEY_FILE", "/opt/github-app.pem"))
-    if pem_path.is_file():
+    pems = [("APP_PRIVATE_KEY", Path(os.environ.get("APP_PRIVATE_KEY_FILE", "/opt/github-app.pem")))]
+    try:
+        pems += [
+            (pem_env_var(app_id), path)
+            for app_id, path in parse_extra_apps(os.environ.get("EXTRA_APPS", ""))
+        ]
+    except ValueError as e:
+        print(f"warning: {e}", file=sys.stderr)
+    for env_var, pem_path in pems:
+        if not pem_path.is_file():
+            continue
         try:
-            os.environ["APP_PRIVATE_KEY"] = pem_path.read_text(encoding="ascii")
+            os.environ[env_var] = pem_path.read_text(encoding="ascii")
         except (OSError, UnicodeDecodeError) as e:
             # auth.py will surface a clearer error later if the key is needed
             print(f"warning: could not preload PEM into env: {e}", file=sys.stderr)
@@ -78,18 +123,213 @@ def main() -> int:
         return 2
 
     setup_logging(settings.log_level)
+    tracing.configure(settings)
+    # JSON output goes to stdout alone: keep the banner and logs out of it
+    console.quiet = "--json" in sys.argv
     print_banner()
 
     immediate_mode = "--now" in sys.argv
 
+    if "--dind-gc" in sys.argv:
+        from dind_cache import DindCacheManager
+
+        manager = DindCacheManager(settings)
+        if "--once" in sys.argv:
+            manager.tick()
+            return 0
+        return run_service(
+            "DinD cache manager", settings.dind_gc_interval_seconds, manager.tick
+        )
+
     if immediate_mode:
         cleanup_logger.info("Running cleanup pass immediately (--now)...")
+        install_signal_handlers()
         success = run_cleanup(settings)
         return 0 if success else 1
 
+    if "--tool-cache-broker" in sys.argv:
+        from tool_cache import ToolCacheBroker
+
+        broker = ToolCacheBroker(settings)
+        broker.serve()
+        return run_service("tool-cache GC", 3600, broker.gc)
+
+    if "--status" in sys.argv:
+        from fleet_status import gather, print_json, print_status
+
+        try:
+            status = gather(settings)
+        except (ValueError, FileNotFoundError, RuntimeError, OSError) as e:
+            if "--json" in sys.argv:
+                print_json({"errors": {"auth": str(e)}})
+            cleanup_logger.error(f"Status failed: {e}")
+            return 1
+        if "--json" in sys.argv:
+            print_json(status)
+        else:
+            print_status(status)
+        return 1 if status["errors"] else 0
+
+    if "--report" in sys.argv:
+        from history import print_report
+
+        idx = sys.argv.index("--report")
+        try:
+            limit = int(sys.argv[idx + 1])
+        except (IndexError, ValueError):
+            limit = 20
+        print_report(settings, limit)
+        return 0
+
+    if "--simulate-pacing" in sys.argv:
+        from pacing_sim import print_results, run
+
+        def _num(flag: str, default: float) -> float:
+            if flag not in sys.argv:
+                return default
+            try:
+                return float(sys.argv[sys.argv.index(flag) + 1])
+            except (IndexError, ValueError):
+                return default
+
+        policies = ["plan", "even"]
+        if "--policies" in sys.argv and sys.argv.index("--policies") + 1 < len(sys.argv):
+            policies = sys.argv[sys.argv.index("--policies") + 1].split(",")
+        days = _num("--days", 7)
+        results = run(
+            settings,
+            [p for p in policies if p in ("plan", "even")],
+            days=days,
+            every_hours=_num("--every", 4),
+            leaks_per_hour=_num("--leaks-per-hour", 200),
+            others_per_hour=_num("--others-per-hour", 1500),
+        )
+        print_results(results, days)
+        return 0
+
+    if "--jit-broker" in sys.argv:
+        from jit_broker import JitBroker
+
+        broker = JitBroker(settings)
+        broker.recover()
+        broker.serve()
+        return run_service(
+            "JIT config broker", settings.jit_refill_interval_seconds, broker.tick
+        )
+
+    if "--agent-watch" in sys.argv:
+        from agent_watch import CrashWatcher
+
+        watcher = CrashWatcher(settings)
+        watcher.serve()
+        return run_service(
+            "crashed-agent watcher", settings.agent_watch_interval_seconds, watcher.tick
+        )
+
+    if "--inventory" in sys.argv:
+        from inventory import RunnerInventory
+
+        inventory = RunnerInventory(settings)
+        inventory.serve()
+        return run_service(
+            "runner inventory", settings.inventory_interval_seconds, inventory.tick
+        )
+
+    if "--utilization-report" in sys.argv:
+        from utilization import print_report
+
+        days = 7.0
+        if "--days" in sys.argv:
+            try:
+                days = float(sys.argv[sys.argv.index("--days") + 1])
+            except (IndexError, ValueError):
+                pass
+        print_report(settings, days)
+        return 0
+
+    if "--utilization" in sys.argv:
+        from utilization import UtilizationSampler
+
+        sampler = UtilizationSampler(settings)
+        return run_service(
+            "utilization sampler", settings.utilization_interval_seconds, sampler.tick
+        )
+
+    if "--agent-bench-report" in sys.argv:
+        from agent_bench import print_summary
+
+        print_summary(settings)
+        return 0
+
+    if "--agent-bench" in sys.argv:
+        from agent_bench import AgentBench, print_summary
+
+        def _opt(flag: str, default: int) -> int:
+            if flag not in sys.argv:
+                return default
+            try:
+                return int(sys.argv[sys.argv.index(flag) + 1])
+            except (IndexError, ValueError):
+                return default
+
+        install_signal_handlers()
+        bench = AgentBench(settings)
+        try:
+            if "--burst" in sys.argv:
+                bench.burst(_opt("--burst", 4), _opt("--rounds", 1))
+            else:
+                bench.observe(_opt("--duration", 3600))
+        except RuntimeError as e:
+            cleanup_logger.error(str(e))
+            return 1
+        finally:
+            bench.save()
+        print_summary(settings, bench.done)
+        return 0
+
+    if "--dind-telemetry-report" in sys.argv:
+        from dind_telemetry import print_report
+
+        print_report(settings)
+        return 0
+
+    if "--dind-telemetry" in sys.argv:
+        from dind_telemetry import DindTelemetry
+
+        telemetry = DindTelemetry(settings)
+        telemetry.serve()
+        return run_service(
+            "DinD job telemetry", settings.dind_telemetry_bucket_seconds, telemetry.tick
+        )
+
+    if "--dind-placement" in sys.argv:
+        from dind_placement import PlacementController
+
+        controller = PlacementController(settings)
+        controller.serve()
+        return run_service(
+            "DinD placement controller", settings.dind_placement_interval_seconds, controller.tick
+        )
+
+    if "--prewarm-report" in sys.argv:
+        from image_prewarm import print_report
+
+        print_report(settings)
+        return 0
+
+    if "--prewarm" in sys.argv:
+        from image_prewarm import ImagePrewarmer
+
+        warmer = ImagePrewarmer(settings)
+        return run_service("image pre-warmer", settings.prewarm_interval_seconds, warmer.tick)
+
     # Service mode (default): scheduler blocks the process
     cleanup_logger.info("Starting GitHub Runner Cleanup Manager (service mode)")
-    scheduler = setup_scheduler(settings, lambda: run_cleanup(settings))
+    scheduler = setup_scheduler(
+        settings,
+        lambda resume=False: run_cleanup(settings, resume=resume),
+        lambda: probe_circuit(settings),
+    )
     try:
         scheduler.start()
     except KeyboardInterrupt:
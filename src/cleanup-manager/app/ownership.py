@@ -0,0 +1,78 @@
+"""
+Cleanup Manager - Runner Ownership
+
+In a shared organization the runner list holds every team's
+registrations. With CLEANUP_OWNED_ONLY a cleanup pass only ever lists
+and deletes the runners this stack registered:
+
+    server side  with a dedicated RUNNER_GROUP (org scope) only that
+                 group's runners are listed, so listing cost scales with
+                 our fleet instead of the whole organization
+    local        a runner is ours if its name starts with
+                 RUNNER_NAME_PREFIX- and it carries every RUNNER_LABELS
+                 label; anything else listed is never touched
+
+GitHub's `name` filter only matches exact names, so it serves single
+lookups (find_runner) - ephemeral agents register under a new name
+every time, which rules it out for discovering leaked runners.
+The group name -> id lookup is cached in the state directory.
+"""
+
+from config import Settings
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "owned-scope.json"
+
+
+def split_labels(raw: str) -> set[str]:
+    return {x.strip().lower() for x in raw.split(",") if x.strip()}
+
+
+class Ownership:
+    """Which runners of the scope belong to this stack."""
+
+    def __init__(self, settings: Settings, scope: str):
+        self.settings = settings
+        self.scope = scope
+        self.prefix = f"{settings.runner_name_prefix}-"
+        self.labels = split_labels(settings.runner_labels)
+        self.group = settings.runner_group
+        self._state_file = state_path(settings, STATE_FILE)
+
+    @property
+    def uses_group(self) -> bool:
+        """Whether the group narrows the listing (a shared Default group does not)."""
+        return self.scope.startswith("orgs/") and bool(self.group) and self.group != "Default"
+
+    def group_id(self, resolve) -> int | None:
+        """Id of RUNNER_GROUP to list from, or None to list the whole scope.
+
+        `resolve(name)` looks the id up on GitHub; the answer is cached.
+        """
+        if not self.uses_group:
+            return None
+        cached = load_json(self._state_file, {}) or {}
+        if cached.get("scope") == self.scope and cached.get("group") == self.group:
+            return int(cached["id"])
+        group_id = resolve(self.group)
+        save_json(self._state_file, {"scope": self.scope, "group": self.group, "id": group_id})
+        return group_id
+
+    def forget_group(self) -> None:
+        """Drop the cached group id (the group was deleted or renamed)."""
+        save_json(self._state_file, {})
+
+    def owns(self, runner: dict) -> bool:
+        if not (runner.get("name") or "").startswith(self.prefix):
+            return False
+        labels = {(lbl.get("name") or "").lower() for lbl in runner.get("labels") or []}
+        return self.labels <= labels
+
+    def describe(self) -> str:
+        parts = [f"prefix '{self.prefix}'"]
+        if self.labels:
+            parts.append(f"labels {','.join(sorted(self.labels))}")
+        if self.uses_group:
+            parts.append(f"group '{self.group}'")
+        return ", ".join(parts)
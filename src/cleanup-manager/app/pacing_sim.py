@@ -0,0 +1,372 @@
+"""
+Cleanup Manager - Pacing Simulator
+
+Replays days of cleanup traffic in seconds to compare pacing policies
+without live quota. The real pass code runs unchanged: run_cleanup,
+QuotaPlanner, RateLimit, TokenPool and CircuitBreaker, with their
+`time` and `shutdown` module globals swapped for a VirtualClock (every
+sleep advances virtual time instantly) and the GitHub calls of
+github_api answered by GitHubModel:
+
+    primary limit    5000/h bucket, hourly reset windows
+    secondary limit  900 points per rolling minute (GET 1, DELETE 5);
+                     once exceeded every request is refused with
+                     403 + Retry-After 60 until that has passed
+    competitors      other consumers of the same token at
+                     --others-per-hour, doubled during working hours,
+                     who go without once the bucket is empty
+    5xx bursts       a few minutes of 502s, a few times a day
+    leaks            offline runners leaking at --leaks-per-hour
+
+A pass starts every --every hours (or as soon as the previous one
+ended). Each policy replays the same seeded world: leaks, competitor
+demand and bursts each draw from their own random stream, so they do
+not depend on when the pass sends its requests. Time stops at the end
+of the horizon for every policy - a pass still running then is
+interrupted like a shutdown - so the report shows throughput, reserve
+violations (our requests that ate into the reserve) and completion time
+per policy over the same span.
+"""
+
+import math
+import random
+import tempfile
+import time
+import urllib.error
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import circuit
+import github_api
+import history
+import priority
+import quota_plan
+import rate_limit
+import token_pool
+from config import Settings
+from console import console, fmt_duration
+
+WINDOW_SECONDS = 3600
+LIMIT = 5000
+SECONDARY_POINTS = 900
+SECONDARY_WINDOW = 60
+SECONDARY_RETRY_AFTER = 60
+POINTS = {"GET": 1, "DELETE": 5}
+# Virtual seconds one API round trip takes
+LATENCY = 0.25
+BURST_RETRY_AFTER = 10
+# Virtual start: a Monday 00:00 UTC, so working hours line up
+EPOCH = datetime(2026, 1, 5, tzinfo=timezone.utc).timestamp()
+
+_PATCHED = (circuit, github_api, history, priority, quota_plan, rate_limit, token_pool)
+
+
+class VirtualClock:
+    """Stands in for the `time` and `shutdown` modules of the pass code."""
+
+    def __init__(self, start: float, stop_at: float = math.inf):
+        self.now = start
+        self.stop_at = stop_at
+
+    # time
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += max(seconds, 0.0)
+
+    # shutdown
+    def requested(self) -> bool:
+        return self.now >= self.stop_at
+
+    def wait(self, seconds: float) -> bool:
+        self.sleep(min(seconds, max(self.stop_at - self.now, 0.0)))
+        return self.requested()
+
+
+@contextmanager
+def virtual_time(clock: VirtualClock, model: "GitHubModel"):
+    """Run the pass code on `clock` against `model` instead of GitHub."""
+    saved = [(m, m.time) for m in _PATCHED]
+    api = {
+        name: getattr(github_api, name)
+        for name in ("shutdown", "list_runners", "delete_runner", "fetch_rate_limit")
+    }
+    quiet = console.quiet
+    for m in _PATCHED:
+        m.time = clock
+    github_api.shutdown = clock
+    github_api.list_runners = model.list_runners
+    github_api.delete_runner = model.delete_runner
+    github_api.fetch_rate_limit = model.fetch_rate_limit
+    console.quiet = True
+    try:
+        yield
+    finally:
+        for m, original in saved:
+            m.time = original
+        for name, original in api.items():
+            setattr(github_api, name, original)
+        console.quiet = quiet
+
+
+@dataclass
+class SimResult:
+    policy: str
+    passes: int = 0
+    deleted: int = 0
+    requests: int = 0
+    pass_sec: list[float] = field(default_factory=list)
+    # Passes that left nothing old enough behind
+    cleared: int = 0
+    backlog_end: int = 0
+    reserve_violations: int = 0
+    secondary_hits: int = 0
+    server_errors: int = 0
+    others_starved: int = 0
+
+
+class GitHubModel:
+    """GitHub's runner API and rate limits, in virtual time."""
+
+    def __init__(self, clock: VirtualClock, seed: int, reserve_pct: float,
+                 days: float, leaks_per_hour: float, others_per_hour: float):
+        self.clock = clock
+        self.start = clock.now
+        self.end = clock.now + days * 86400
+        # One stream per process: how much of it a policy's requests use
+        # must not change the world the next policy sees
+        self.leak_rng = random.Random(f"{seed}-leaks")
+        self.error_rng = random.Random(f"{seed}-errors")
+        others_rng = random.Random(f"{seed}-others")
+        # Competitor demand jitter per rate-limit window
+        self.others_jitter = [
+            others_rng.uniform(0.7, 1.3) for _ in range(math.ceil(days * 24) + 1)
+        ]
+        self.reserve = int(LIMIT * reserve_pct)
+        self.leaks_per_hour = leaks_per_hour
+        self.others_per_hour = others_per_hour
+        self.window_start = clock.now
+        self.remaining = LIMIT
+        self.updated_at = clock.now
+        self.others_debt = 0.0
+        self.points: list[tuple[float, int]] = []
+        self.blocked_until = 0.0
+        self.runners: dict[int, dict] = {}
+        self.next_id = 1
+        self.leaked_until = clock.now
+        self.bursts = self._plan_bursts(random.Random(f"{seed}-bursts"))
+        self.result: SimResult | None = None
+
+    def _plan_bursts(self, rng: random.Random) -> list[tuple[float, float]]:
+        bursts = []
+        t = self.clock.now
+        while True:
+            t += rng.expovariate(3 / 86400)  # ~3 a day
+            if t >= self.end:
+                return bursts
+            bursts.append((t, t + rng.uniform(120, 600)))
+
+    # ---- World between requests ----
+
+    def _others_rate(self, at: float) -> float:
+        hour = datetime.fromtimestamp(at, timezone.utc)
+        busy = hour.weekday() < 5 and 8 <= hour.hour < 18
+        return self.others_per_hour * (2.0 if busy else 1.0) / 3600
+
+    def advance(self) -> None:
+        """Apply resets, competing consumers and leaks up to now (at most the end)."""
+        now = min(self.clock.now, self.end)
+        t = self.updated_at
+        while t < now:
+            reset_at = self.window_start + WINDOW_SECONDS
+            step_end = min(now, reset_at)
+            jitter = self.others_jitter[int((self.window_start - self.start) // WINDOW_SECONDS)]
+            self.others_debt += self._others_rate(t) * (step_end - t) * jitter
+            spend = int(self.others_debt)
+            self.others_debt -= spend
+            served = min(spend, self.remaining)
+            self.remaining -= served
+            if self.result is not None:
+                self.result.others_starved += spend - served
+            if step_end >= reset_at:
+                self.window_start = reset_at
+                self.remaining = LIMIT
+            t = step_end
+        self.updated_at = max(self.updated_at, now)
+        while self.leaked_until + 3600 <= now:
+            self.leaked_until += 3600
+            for _ in range(self._poisson(self.leaks_per_hour)):
+                created = self.leaked_until - self.leak_rng.uniform(0, 3600)
+                self.runners[self.next_id] = {
+                    "id": self.next_id,
+                    "name": f"sim-{self.next_id}",
+                    "status": "offline",
+                    "busy": False,
+                    "created_at": datetime.fromtimestamp(created, timezone.utc).strftime(
+                        "%Y-%m-%dT%H:%M:%SZ"
+                    ),
+                }
+                self.next_id += 1
+
+    def _poisson(self, mean: float) -> int:
+        if mean <= 0:
+            return 0
+        # Normal approximation is plenty for a traffic model
+        return max(int(round(self.leak_rng.gauss(mean, math.sqrt(mean)))), 0)
+
+    # ---- API surface ----
+
+    def _headers(self) -> dict:
+        return {
+            "X-RateLimit-Limit": str(LIMIT),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(int(self.window_start + WINDOW_SECONDS)),
+        }
+
+    def _call(self, method: str) -> tuple[int, int | None]:
+        """Account one request; (status, retry_after)."""
+        self.clock.sleep(LATENCY)
+        self.advance()
+        now = self.clock.now
+        res = self.result
+        res.requests += 1
+        if now < self.blocked_until:
+            return 403, max(int(self.blocked_until - now), 1)
+        self.points = [(t, p) for t, p in self.points if now - t < SECONDARY_WINDOW]
+        self.points.append((now, POINTS[method]))
+        if sum(p for _, p in self.points) > SECONDARY_POINTS:
+            res.secondary_hits += 1
+            self.blocked_until = now + SECONDARY_RETRY_AFTER
+            return 403, SECONDARY_RETRY_AFTER
+        if any(start <= now < end for start, end in self.bursts) and self.error_rng.random() < 0.5:
+            res.server_errors += 1
+            return 502, BURST_RETRY_AFTER
+        if self.remaining <= 0:
+            return 403, None
+        self.remaining -= 1
+        if self.remaining < self.reserve:
+            res.reserve_violations += 1
+        return 200, None
+
+    def fetch_rate_limit(self, _token: str) -> dict:
+        self.advance()
+        return {
+            "limit": LIMIT,
+            "remaining": self.remaining,
+            "reset": int(self.window_start + WINDOW_SECONDS),
+        }
+
+    def list_runners(self, _scope: str, _token: str, rate, _hedger=None, _group_id=None):
+        self.advance()
+        runners = list(self.runners.values())
+        pages = max(math.ceil(len(runners) / 100), 1)
+        for page in range(pages):
+            status, _ = self._call("GET")
+            rate.update(self._headers())
+            if status != 200:
+                # A failed listing ends the pass, as with the real API
+                err = urllib.error.HTTPError("/actions/runners", status, "simulated", {}, None)
+                err.body_text = f"simulated HTTP {status}"  # type: ignore[attr-defined]
+                raise err
+            yield from runners[page * 100:(page + 1) * 100]
+
+    def delete_runner(self, _scope: str, runner_id: int, _token: str):
+        status, retry_after = self._call("DELETE")
+        if status == 200:
+            if self.runners.pop(runner_id, None) is not None and self.clock.now <= self.end:
+                self.result.deleted += 1
+            return True, self._headers(), None, None
+        msg = "HTTP 403 - secondary rate limit" if status == 403 else f"HTTP {status}"
+        if status == 403 and retry_after is None:
+            msg = "HTTP 403 - API rate limit exceeded"
+        return False, self._headers(), msg, retry_after
+
+
+def simulate(settings: Settings, policy: str, days: float = 7.0, every_hours: float = 4.0,
+             leaks_per_hour: float = 200.0, others_per_hour: float = 1500.0,
+             seed: int = 1) -> SimResult:
+    """Replay `days` of traffic with CLEANUP_PACING=`policy`."""
+    end = EPOCH + days * 86400
+    clock = VirtualClock(EPOCH, stop_at=end)
+    model = GitHubModel(
+        clock, seed, settings.cleanup_reserve_pct,
+        days, leaks_per_hour, others_per_hour,
+    )
+    result = model.result = SimResult(policy)
+    min_age = settings.cleanup_min_age_days * 86400
+    with tempfile.TemporaryDirectory(prefix="pacing-sim-") as state_dir:
+        sim_settings = settings.model_copy(update={
+            "cleanup_pacing": policy,
+            "github_access_token": "simulated",
+            "extra_access_tokens": "",
+            "extra_apps": "",
+            "runner_scope": "org",
+            "org_name": settings.org_name or "simulated",
+            "state_dir": state_dir,
+            "cleanup_trace_file": "",
+            # Hedging needs real threads and wall-clock deadlines
+            "cleanup_list_hedge": False,
+            "cleanup_owned_only": False,
+            "otel_exporter_otlp_endpoint": "",
+        })
+        next_pass = EPOCH + every_hours * 3600
+        with virtual_time(clock, model):
+            while next_pass < end:
+                clock.now = max(clock.now, next_pass)
+                model.advance()
+                started = clock.now
+                github_api.run_cleanup(sim_settings)
+                result.passes += 1
+                result.pass_sec.append(min(clock.now, end) - started)
+                cutoff = clock.now - min_age
+                if not any(
+                    github_api.parse_iso8601(r["created_at"]) < cutoff
+                    for r in model.runners.values()
+                ):
+                    result.cleared += 1
+                next_pass += every_hours * 3600
+        clock.now = max(clock.now, end)
+        model.advance()
+    result.backlog_end = len(model.runners)
+    return result
+
+
+def print_results(results: list[SimResult], days: float) -> None:
+    from rich.table import Table
+
+    table = Table(title=f"Pacing policies over {days:g} simulated days")
+    for col in (
+        "Policy", "Passes", "Cleared", "Deleted", "Backlog", "Requests", "del/h",
+        "Pass p50", "Pass max", "Reserve viol.", "2nd hits", "5xx", "Others starved",
+    ):
+        table.add_column(col, justify="left" if col == "Policy" else "right")
+    hours = days * 24
+    for r in results:
+        durations = sorted(r.pass_sec) or [0.0]
+        table.add_row(
+            r.policy,
+            str(r.passes),
+            str(r.cleared),
+            str(r.deleted),
+            str(r.backlog_end),
+            str(r.requests),
+            f"{r.deleted / hours:.0f}",
+            fmt_duration(durations[len(durations) // 2]),
+            fmt_duration(durations[-1]),
+            str(r.reserve_violations),
+            str(r.secondary_hits),
+            str(r.server_errors),
+            str(r.others_starved),
+        )
+    console.print(table)
+
+
+def run(settings: Settings, policies: list[str], **kwargs) -> list[SimResult]:
+    results = []
+    for policy in policies:
+        wall = time.time()
+        results.append(simulate(settings, policy, **kwargs))
+        console.print(f"[dim]{policy}: simulated in {time.time() - wall:.1f}s[/]")
+    return results
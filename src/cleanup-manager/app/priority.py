@@ -0,0 +1,125 @@
+"""
+Cleanup Manager - Deletion Priority
+
+A pass that runs out of quota at the reserve floor leaves whatever was
+last in API order for later. With CLEANUP_PRIORITY the candidates are
+held in a priority queue instead, so the deletes that matter most go
+out in the first reset window. The ranking is an ordered list of keys,
+compared one after the other (ties fall through to the next key, then
+to API order):
+
+    labels     runners with a CLEANUP_PRIORITY_LABELS label first
+    group_cap  runners of the fullest runner group first (GitHub caps a
+               group at GROUP_RUNNER_CAP registrations)
+    offline    longest offline first (offline since first seen offline
+               by a listing of this cleanup manager)
+    age        oldest registration first
+
+group_cap changes as the pass deletes runners from a group: a popped
+runner whose score got worse than the next one is pushed back with its
+new score (lazy rescoring), so the queue stays in order without a
+re-sort after every delete.
+
+observe() records, from every full listing, when each runner was first
+seen offline and how many runners each group holds.
+"""
+
+import heapq
+import time
+from datetime import datetime
+
+from config import Settings
+from ownership import split_labels
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "cleanup-priority.json"
+# GitHub's limit on self-hosted runners per runner group
+GROUP_RUNNER_CAP = 10000
+
+
+def _created_at(runner: dict) -> float:
+    raw = (runner.get("created_at") or "").replace("Z", "+00:00")
+    try:
+        return datetime.fromisoformat(raw).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def observe(settings: Settings, scope: str, runners: list[dict]) -> None:
+    """Update offline-since and group sizes from a full listing."""
+    path = state_path(settings, STATE_FILE)
+    state = load_json(path, {}) or {}
+    known = state.get("offline_since", {}) if state.get("scope") == scope else {}
+    now = time.time()
+    offline_since = {}
+    sizes: dict[str, int] = {}
+    for r in runners:
+        if r.get("status") == "offline":
+            rid = str(r.get("id"))
+            offline_since[rid] = known.get(rid, now)
+        gid = r.get("runner_group_id")
+        if gid is not None:
+            sizes[str(gid)] = sizes.get(str(gid), 0) + 1
+    save_json(path, {"scope": scope, "offline_since": offline_since, "group_sizes": sizes})
+
+
+class DeletionQueue:
+    """Candidates in deletion order, rescored as the pass runs."""
+
+    def __init__(self, settings: Settings, scope: str, candidates: list[dict]):
+        self.ranking = [k.strip() for k in settings.cleanup_priority.split(",") if k.strip()]
+        self.labels = split_labels(settings.cleanup_priority_labels)
+        state = load_json(state_path(settings, STATE_FILE), {}) or {}
+        if state.get("scope") != scope:
+            state = {}
+        self.offline_since: dict[str, float] = state.get("offline_since", {})
+        self.group_sizes: dict[str, int] = state.get("group_sizes", {})
+        self._now = time.time()
+        self._heap = [(self._score(r), n, r) for n, r in enumerate(candidates)]
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _score(self, runner: dict) -> tuple:
+        score = []
+        for key in self.ranking:
+            if key == "labels":
+                names = {(lbl.get("name") or "").lower() for lbl in runner.get("labels") or []}
+                score.append(0 if names & self.labels else 1)
+            elif key == "group_cap":
+                size = self.group_sizes.get(str(runner.get("runner_group_id")), 0)
+                score.append(-size / GROUP_RUNNER_CAP)
+            elif key == "offline":
+                score.append(self.offline_since.get(str(runner.get("id")), self._now))
+            elif key == "age":
+                score.append(_created_at(runner))
+        return tuple(score)
+
+    def ordered(self) -> list[dict]:
+        """The candidates in their current order (for the checkpoint)."""
+        return [r for _, _, r in sorted(self._heap)]
+
+    def __iter__(self):
+        while self._heap:
+            score, n, runner = heapq.heappop(self._heap)
+            fresh = self._score(runner)
+            if fresh != score and self._heap and (fresh, n) > self._heap[0][:2]:
+                heapq.heappush(self._heap, (fresh, n, runner))
+                continue
+            yield runner
+
+    def done(self, runner: dict, deleted: bool) -> None:
+        """Account a processed candidate; its group shrinks if deleted."""
+        gid = str(runner.get("runner_group_id"))
+        if deleted and gid in self.group_sizes:
+            self.group_sizes[gid] -= 1
+
+    def describe(self) -> str:
+        if not self.ranking:
+            return "API order"
+        return " > ".join(
+            f"labels ({','.join(sorted(self.labels))})" if k == "labels" else k
+            for k in self.ranking
+        )
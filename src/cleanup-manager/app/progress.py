@@ -0,0 +1,93 @@
+"""
+Cleanup Manager - Pass Progress Checkpoint
+
+Records how far the current cleanup pass got: the candidates still to
+delete plus running counters. Flushed every PROGRESS_FLUSH_EVERY
+requests and whenever a pass stops early (deadline, shutdown), so a
+restart or Watchtower update never loses more than a few requests of
+state.
+"""
+
+import time
+
+from config import Settings
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "cleanup-progress.json"
+PROGRESS_FLUSH_EVERY = 50
+
+# The pass currently in flight, so shutdown can flush it from another thread
+_active: "PassProgress | None" = None
+
+
+class PassProgress:
+    """Checkpoint of one cleanup pass."""
+
+    def __init__(self, settings: Settings, scope: str):
+        self._path = state_path(settings, STATE_FILE)
+        self.scope = scope
+        self.started_at = time.time()
+        self.remaining: list[dict] = []
+        self.deleted = 0
+        self.failed = 0
+        self._dirty = 0
+
+    def start(self, candidates: list[dict]) -> None:
+        global _active
+        # Plus what CLEANUP_PRIORITY ranks by, so a resumed pass keeps its order
+        self.remaining = [
+            {k: r[k] for k in ("id", "name", "created_at", "labels", "runner_group_id") if k in r}
+            for r in candidates
+        ]
+        self.flush()
+        _active = self
+
+    def advance(self, runner_id, ok: bool) -> None:
+        """Mark one candidate as processed (deleted or failed)."""
+        if self.remaining and self.remaining[0].get("id") == runner_id:
+            self.remaining.pop(0)
+        else:
+            self.remaining = [r for r in self.remaining if r.get("id") != runner_id]
+        if ok:
+            self.deleted += 1
+        else:
+            self.failed += 1
+        self._dirty += 1
+        if self._dirty >= PROGRESS_FLUSH_EVERY:
+            self.flush()
+
+    def flush(self, status: str = "running") -> None:
+        save_json(self._path, {
+            "scope": self.scope,
+            "status": status,
+            "started_at": self.started_at,
+            "updated_at": time.time(),
+            "deleted": self.deleted,
+            "failed": self.failed,
+            "remaining": self.remaining,
+        })
+        self._dirty = 0
+
+    def finish(self, status: str) -> None:
+        """Final flush: 'complete', 'deferred' or 'interrupted'."""
+        global _active
+        self.flush(status)
+        if _active is self:
+            _active = None
+
+
+def flush_active() -> None:
+    """Flush the in-flight pass (if any) as interrupted."""
+    if _active is not None:
+        _active.flush("interrupted")
+
+
+def load_resumable(settings: Settings, scope: str, max_age_sec: float) -> list[dict]:
+    """Candidates left by the previous pass, if it stopped early recently."""
+    doc = load_json(state_path(settings, STATE_FILE), {}) or {}
+    if doc.get("scope") != scope or doc.get("status") == "complete":
+        return []
+    if time.time() - float(doc.get("updated_at") or 0) > max_age_sec:
+        return []
+    return list(doc.get("remaining") or [])
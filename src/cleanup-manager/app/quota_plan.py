@@ -0,0 +1,198 @@
+"""
+Cleanup Manager - Time-Sliced Quota Planner
+
+Plans a whole cleanup pass across rate-limit reset windows instead of
+deciding one request at a time:
+
+    window 0   now .. reset_at            budget = usable() right now
+    window 1   reset_at .. reset_at+1h    budget = limit - reserve - others
+    window 2   ...
+
+Each window's budget is additionally capped by the time it actually
+has before the pass deadline (at floor_delay per request). The deadline
+is the earlier of CLEANUP_MAX_DURATION_MINUTES after the pass started
+and the end of the CLEANUP_WINDOW maintenance window.
+
+Both policies pace from that plan, rebuilt from the RateLimit state
+before every request, so a reset arriving early or other consumers
+draining the bucket are picked up at once:
+
+    plan (default)  spend the current window's budget as early as
+                    possible (floor_delay between requests)
+    even            spread the current window's budget - at most the
+                    work left - over the time the window has before the
+                    deadline (RateLimit.proactive_delay's pacing, made
+                    deadline-aware)
+
+Once the current window's budget is spent, the pass waits for the next
+window only if the plan gives that window a budget (it opens before the
+deadline and other consumers leave something); otherwise it stops
+cleanly and leaves the rest for the next pass.
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from config import Settings
+from console import fmt_duration
+from rate_limit import QuotaView
+
+WINDOW_SECONDS = 3600
+# Grace after X-RateLimit-Reset before the bucket is trusted to be full
+RESET_GRACE = 2
+
+
+@dataclass
+class Window:
+    start: float
+    end: float
+    budget: int
+
+
+@dataclass
+class Decision:
+    delay: float
+    stop: bool = False
+    reason: str = ""
+
+
+def parse_window(spec: str) -> tuple[tuple[int, int], tuple[int, int]] | None:
+    """Parse "HH:MM-HH:MM" into ((h, m), (h, m)); empty spec -> None."""
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    try:
+        start_s, end_s = spec.split("-")
+        sh, sm = (int(x) for x in start_s.strip().split(":"))
+        eh, em = (int(x) for x in end_s.strip().split(":"))
+    except ValueError as e:
+        raise ValueError(f"Invalid window '{spec}'. Use HH:MM-HH:MM, e.g. 01:00-06:00") from e
+    if not (0 <= sh <= 23 and 0 <= eh <= 23 and 0 <= sm <= 59 and 0 <= em <= 59):
+        raise ValueError(f"Invalid window '{spec}'. Hours 0-23, minutes 0-59")
+    if (sh, sm) == (eh, em):
+        raise ValueError(f"Invalid window '{spec}': start and end are equal")
+    return (sh, sm), (eh, em)
+
+
+def window_end(settings: Settings, now: float) -> float | None:
+    """End of the CLEANUP_WINDOW occurrence containing `now`.
+
+    Returns None if no window is configured, and `now` itself if `now`
+    lies outside the window (nothing may run).
+    """
+    parsed = parse_window(settings.cleanup_window)
+    if parsed is None:
+        return None
+    (sh, sm), (eh, em) = parsed
+    try:
+        tz = ZoneInfo(settings.time_zone)
+    except (ZoneInfoNotFoundError, ValueError):
+        tz = None
+    local = datetime.fromtimestamp(now, tz)
+    day = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    for offset in (-1, 0):
+        start = day + timedelta(days=offset, hours=sh, minutes=sm)
+        end = day + timedelta(days=offset, hours=eh, minutes=em)
+        if end <= start:
+            end += timedelta(days=1)
+        if start <= local < end:
+            return end.timestamp()
+    return now
+
+
+class QuotaPlanner:
+    """Per-window request budget for one cleanup pass."""
+
+    def __init__(self, settings: Settings, rate: QuotaView, started_at: float | None = None):
+        self.rate = rate
+        self.policy = settings.cleanup_pacing
+        started_at = started_at or time.time()
+        limits = []
+        if settings.cleanup_max_duration_minutes > 0:
+            limits.append(started_at + settings.cleanup_max_duration_minutes * 60)
+        end = window_end(settings, started_at)
+        if end is not None:
+            limits.append(end)
+        self.deadline: float | None = min(limits) if limits else None
+
+    def _per_request(self) -> float:
+        return max(self.rate.floor_delay, 0.05)
+
+    def windows(self, now: float | None = None, max_windows: int = 24) -> list[Window]:
+        """Budgeted windows from now until the deadline (or max_windows)."""
+        now = now or time.time()
+        rate = self.rate
+        out: list[Window] = []
+        start = now
+        end = max(float(rate.reset_at), now)
+        budget = rate.usable()
+        full_budget = rate.window_budget()
+        for _ in range(max_windows):
+            if self.deadline is not None:
+                if start >= self.deadline:
+                    break
+                usable_time = min(end, self.deadline) - start
+                budget = min(budget, int(usable_time / self._per_request()))
+            out.append(Window(start, end, max(budget, 0)))
+            if self.deadline is None and len(out) >= 2:
+                # Without a deadline two windows tell the whole story
+                break
+            start = end + RESET_GRACE
+            end = start + WINDOW_SECONDS
+            budget = full_budget
+        return out
+
+    def summary(self, work_left: int) -> str:
+        now = time.time()
+        wins = self.windows(now)
+        parts = [
+            f"w{i}: {w.budget} req until +{fmt_duration(w.end - now)}"
+            for i, w in enumerate(wins[:4])
+        ]
+        if len(wins) > 4:
+            parts.append(f"... {len(wins)} windows")
+        total = sum(w.budget for w in wins)
+        deadline = (
+            f"deadline in {fmt_duration(self.deadline - now)}" if self.deadline else "no deadline"
+        )
+        if self.deadline is not None and total < work_left:
+            tail = f", {work_left - total} of {work_left} will be left for the next pass"
+        else:
+            tail = f", covers all {work_left}"
+        return f"plan ({self.policy}, {deadline}): {'; '.join(parts)}{tail}"
+
+    def remaining_time(self) -> float | None:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.time()
+
+    def fits(self, seconds: float) -> bool:
+        """True if sleeping `seconds` still ends before the deadline."""
+        left = self.remaining_time()
+        return left is None or seconds < left
+
+    def next_delay(self, work_left: int) -> Decision:
+        """How long to wait before the next request, or whether to stop."""
+        now = time.time()
+        if self.deadline is not None and now >= self.deadline:
+            return Decision(0.0, True, "pass deadline reached")
+        if work_left <= 0:
+            return Decision(0.0)
+
+        wins = self.windows(now, max_windows=2)
+        current = wins[0]
+        if current.budget > 0:
+            delay = self.rate.floor_delay
+            if self.policy == "even" and current.budget < work_left:
+                span = current.end if self.deadline is None else min(current.end, self.deadline)
+                delay = max((span - now) / current.budget, delay)
+            if not self.fits(delay):
+                return Decision(0.0, True, "pass deadline reached")
+            return Decision(delay)
+
+        # Current window spent: wait for the next one if the plan gives it a budget
+        if len(wins) < 2 or wins[1].budget <= 0:
+            return Decision(0.0, True, "quota at reserve floor and no budget before the deadline")
+        return Decision(max(wins[1].start - now, 0.0), reason="waiting for rate-limit reset")
@@ -3,15 +3,56 @@ Cleanup Manager - Rate Limit State
 
 Tracks GitHub's primary and secondary rate limits and computes the
 right pacing for delete requests. Same algorithm as
-scripts/cleanup-runners.py, extracted to a module for reuse.
+scripts/cleanup-runners.py, extracted to a module for reuse, plus an
+AIMD-tuned floor_delay that is persisted per scope across passes.
+
+The quota model is persisted too: the last-known bucket (limit,
+remaining, reset) and the request rate of the other consumers sharing
+the credential. A pass seeds its bucket from the free /rate_limit
+endpoint (apply_preflight), falling back to the persisted bucket, so
+its first requests are paced on real numbers instead of an assumed
+full 5000.
 """
 
 import time
 
+from config import Settings
 from console import fmt_duration
+from state import load_json, save_json, state_path
 
 
-class RateLimit:
+STATE_FILE = "rate-tuning.json"
+WINDOW_SECONDS = 3600
+# Consumption is only estimated from gaps at least this long
+MIN_OBSERVE_SECONDS = 60
+# Weight of the newest observation in the others_per_sec average
+OTHERS_EWMA_ALPHA = 0.5
+
+
+class QuotaView:
+    """Read-only quota state: what pacing and reporting look at.
+
+    Subclasses provide limit, remaining, reset_at, floor_delay,
+    secondary_hits, others_per_sec, reserved(), usable() and
+    window_budget(). RateLimit is one bucket; token_pool.PoolRate
+    combines the bucket of every pooled credential.
+    """
+
+    def seconds_to_reset(self) -> int:
+        return max(self.reset_at - int(time.time()), 0)
+
+    def quota_summary(self) -> str:
+        usable = self.usable()
+        pct = (self.remaining / self.limit * 100) if self.limit else 0
+        others = f", others ~{self.others_per_sec * 3600:.0f}/h" if self.others_per_sec else ""
+        return (
+            f"quota: {self.remaining}/{self.limit} ({pct:.0f}%, "
+            f"reset in {fmt_duration(self.seconds_to_reset())}, "
+            f"reserve {self.reserved()}{others}, usable {usable})"
+        )
+
+
+class RateLimit(QuotaView):
     """Two-layer rate-limit handling.
 
     Primary (proactive): X-RateLimit-Limit/-Remaining/-Reset on every
@@ -19,21 +60,45 @@ class RateLimit:
     `reserve_pct * limit` quota - that headroom is left for gh CLI,
     workflows, dashboards and the runner's own registration calls
     sharing the same App-installation token.
+    Once the rate of those other consumers is known (others_per_sec),
+    the headroom is whichever is larger: the reserve or what they are
+    expected to spend until the reset.
 
     Secondary (reactive): only signaled by 403/429 + Retry-After.
-    On hit, sleep that exact duration and double `floor_delay` for
-    the rest of the run. floor_delay never auto-decreases.
+    On hit, sleep that exact duration and double `floor_delay`
+    (multiplicative backoff). With `recover_after` > 0, every
+    `recover_after` successful requests in a row shave `recover_step`
+    off floor_delay again (additive recovery, never below `min_floor`),
+    so the pace converges on the fastest one GitHub tolerates. With
+    the default recover_after=0 floor_delay never auto-decreases.
     """
 
     SECONDARY_FLOOR_CAP = 5.0
 
-    def __init__(self, reserve_pct: float = 0.10, floor_delay: float = 0.5):
+    def __init__(
+        self,
+        reserve_pct: float = 0.10,
+        floor_delay: float = 0.5,
+        min_floor: float | None = None,
+        recover_after: int = 0,
+        recover_step: float = 0.05,
+    ):
         self.limit = 5000
         self.remaining = 5000
         self.reset_at = int(time.time()) + 3600
         self.reserve_pct = max(0.0, min(reserve_pct, 0.5))
         self.floor_delay = max(0.0, floor_delay)
+        self.min_floor = self.floor_delay if min_floor is None else max(0.0, min_floor)
+        self.recover_after = max(0, recover_after)
+        self.recover_step = max(0.0, recover_step)
         self.secondary_hits = 0
+        # Requests/s other consumers of this credential are spending
+        self.others_per_sec = 0.0
+        self._streak = 0
+
+    def seed(self, limit: int, remaining: int, reset_at: int) -> None:
+        """Start from a known bucket instead of the assumed full one."""
+        self.limit, self.remaining, self.reset_at = limit, remaining, reset_at
 
     def update(self, headers: dict) -> None:
         try:
@@ -46,14 +111,23 @@ class RateLimit:
     def reserved(self) -> int:
         return int(self.limit * self.reserve_pct)
 
+    def others_until_reset(self) -> int:
+        """Requests other consumers are expected to spend before the reset."""
+        return int(self.others_per_sec * self.seconds_to_reset())
+
     def usable(self) -> int:
-        return max(0, self.remaining - self.reserved())
+        return max(0, self.remaining - self.reserved() - self.others_until_reset())
 
-    def seconds_to_reset(self) -> int:
-        return max(self.reset_at - int(time.time()), 0)
+    def window_budget(self) -> int:
+        """Usable requests in a full future window."""
+        return max(self.limit - self.reserved() - int(self.others_per_sec * WINDOW_SECONDS), 0)
 
     def proactive_delay(self, candidates_left: int) -> float:
-        """How long to sleep before the next request, based on the primary bucket."""
+        """How long to sleep before the next request, based on the primary bucket.
+
+        Even pacing over the current window only. Cleanup passes pace
+        from QuotaPlanner's per-window plan instead.
+        """
         usable = self.usable()
         if usable == 0:
             return float(self.seconds_to_reset() + 2)
@@ -62,16 +136,100 @@ class RateLimit:
         pacing = self.seconds_to_reset() / max(usable, 1)
         return max(pacing, self.floor_delay)
 
+    def record_success(self) -> None:
+        """Additive decrease of floor_delay after a run of successes."""
+        if self.recover_after <= 0:
+            return
+        self._streak += 1
+        if self._streak < self.recover_after:
+            return
+        self._streak = 0
+        if self.floor_delay > self.min_floor:
+            self.floor_delay = max(self.min_floor, round(self.floor_delay - self.recover_step, 3))
+
     def react_to_secondary(self, retry_after_sec: int) -> None:
         self.secondary_hits += 1
+        self._streak = 0
         new_floor = min(max(self.floor_delay * 2, 1.0), self.SECONDARY_FLOOR_CAP)
         self.floor_delay = new_floor
 
-    def quota_summary(self) -> str:
-        usable = self.usable()
-        pct = (self.remaining / self.limit * 100) if self.limit else 0
-        return (
-            f"quota: {self.remaining}/{self.limit} ({pct:.0f}%, "
-            f"reset in {fmt_duration(self.seconds_to_reset())}, "
-            f"reserve {self.reserved()}, usable {usable})"
+
+def tuned_rate_limit(settings: Settings, scope: str) -> RateLimit:
+    """RateLimit for `scope`, starting at the floor_delay learned by earlier passes.
+
+    A learned value is dropped when CLEANUP_FLOOR_DELAY changed since it
+    was recorded - the operator's new setting wins.
+    """
+    learned = (load_json(state_path(settings, STATE_FILE), {}) or {}).get(scope, {})
+    floor = settings.cleanup_floor_delay
+    if learned.get("configured") == settings.cleanup_floor_delay:
+        try:
+            floor = float(learned.get("floor_delay", floor))
+        except (TypeError, ValueError):
+            pass
+    floor = min(max(floor, settings.cleanup_floor_delay_min), RateLimit.SECONDARY_FLOOR_CAP)
+    rate = RateLimit(
+        reserve_pct=settings.cleanup_reserve_pct,
+        floor_delay=floor,
+        min_floor=settings.cleanup_floor_delay_min,
+        recover_after=settings.cleanup_floor_recover_after,
+        recover_step=settings.cleanup_floor_recover_step,
+    )
+    rate.others_per_sec = float(learned.get("others_per_sec", 0.0))
+    quota = learned.get("quota") or {}
+    now = time.time()
+    if quota.get("reset_at", 0) > now:
+        # Same window as last seen: what is left minus what others spent since
+        spent = rate.others_per_sec * (now - quota.get("seen_at", now))
+        rate.seed(quota["limit"], max(int(quota["remaining"] - spent), 0), quota["reset_at"])
+    elif quota.get("limit"):
+        rate.seed(quota["limit"], quota["limit"], int(now) + WINDOW_SECONDS)
+    return rate
+
+
+def apply_preflight(settings: Settings, scope: str, rate: RateLimit, core: dict) -> None:
+    """Seed `rate` from a /rate_limit "core" entry and learn others' usage.
+
+    Whatever the bucket lost since the last persisted sample was spent by
+    other consumers (no pass ran in between - the pass lease guarantees
+    that); in a new window that is everything it lost since the window
+    opened.
+    """
+    try:
+        limit, remaining, reset_at = int(core["limit"]), int(core["remaining"]), int(core["reset"])
+    except (KeyError, TypeError, ValueError):
+        return
+    quota = (load_json(state_path(settings, STATE_FILE), {}) or {}).get(scope, {}).get("quota") or {}
+    now = time.time()
+    if quota.get("reset_at") == reset_at:
+        spent, since = quota.get("remaining", remaining) - remaining, quota.get("seen_at", now)
+    else:
+        spent, since = limit - remaining, max(reset_at - WINDOW_SECONDS, quota.get("seen_at", 0))
+    if now - since >= MIN_OBSERVE_SECONDS:
+        # Cannot exceed the whole bucket; guards against a clock-skewed sample
+        observed = min(max(spent, 0) / (now - since), limit / WINDOW_SECONDS)
+        rate.others_per_sec = (
+            observed if not quota
+            else OTHERS_EWMA_ALPHA * observed + (1 - OTHERS_EWMA_ALPHA) * rate.others_per_sec
         )
+    rate.seed(limit, remaining, reset_at)
+
+
+def save_tuned_floor(settings: Settings, scope: str, rate: RateLimit) -> None:
+    """Persist the floor_delay this pass converged on for the next one."""
+    path = state_path(settings, STATE_FILE)
+    doc = load_json(path, {}) or {}
+    doc[scope] = {
+        "configured": settings.cleanup_floor_delay,
+        "floor_delay": rate.floor_delay,
+        "secondary_hits": rate.secondary_hits,
+        "others_per_sec": round(rate.others_per_sec, 4),
+        "quota": {
+            "limit": rate.limit,
+            "remaining": rate.remaining,
+            "reset_at": rate.reset_at,
+            "seen_at": time.time(),
+        },
+        "updated_at": time.time(),
+    }
+    save_json(path, doc)
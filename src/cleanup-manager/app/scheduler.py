@@ -5,31 +5,131 @@ Mirrors the BackupScheduler shape from CS-GitHubBackup so the operational
 behavior is familiar across the BAUER GROUP container fleet.
 """
 
+import os
 import signal
+import sys
+import threading
 from typing import Callable
 
 from apscheduler import Event, JobReleased, Scheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
+import shutdown
+import tracing
+from circuit import CircuitBreaker
 from config import Settings
 from console import cleanup_logger, console, print_scheduler_info
+from progress import flush_active
 
 
 class CleanupScheduler:
     """Drives one cleanup pass per scheduled trigger."""
 
-    def __init__(self, settings: Settings, cleanup_func: Callable[[], bool]):
+    def __init__(
+        self,
+        settings: Settings,
+        cleanup_func: Callable[..., bool],
+        probe_func: Callable[[], bool] | None = None,
+    ):
         self.settings = settings
         self.cleanup_func = cleanup_func
+        # Half-open probe of the GitHub API circuit; True once it closed
+        self.probe_func = probe_func
+        self._recovery: threading.Thread | None = None
         self.scheduler: Scheduler | None = None
-
-    def _run_cleanup(self) -> None:
+        # Set while no pass is running; shutdown drains against it
+        self._idle = threading.Event()
+        self._idle.set()
+        # One pass at a time; triggers that fire meanwhile are coalesced
+        self._pass_lock = threading.Lock()
+        self._pending = False
+
+    def _run_cleanup(self, resume: bool = False) -> None:
+        if shutdown.requested():
+            return
+        if not self._pass_lock.acquire(blocking=False):
+            # A long pass (large fleet, paced by the planner) outlived the
+            # trigger interval. Any number of such triggers collapse into
+            # a single follow-up pass that resumes from the checkpoint.
+            self._pending = True
+            cleanup_logger.info("Cleanup pass still running - trigger coalesced into one follow-up pass")
+            return
+        self._idle.clear()
         try:
-            self.cleanup_func()
+            while True:
+                self.cleanup_func(resume=resume)
+                if not self._pending or shutdown.requested():
+                    break
+                self._pending = False
+                resume = True
+                cleanup_logger.info("Running coalesced follow-up pass")
         except Exception as e:
             cleanup_logger.error(f"Cleanup execution failed: {e}")
             raise
+        finally:
+            self._pass_lock.release()
+            self._idle.set()
+        self._watch_recovery()
+
+    def _watch_recovery(self) -> None:
+        """After a pass stopped on the open GitHub API circuit, probe it
+        and run the follow-up pass as soon as GitHub answers again,
+        instead of leaving the rest to the next scheduled trigger."""
+        if self.probe_func is None or not self.settings.cleanup_circuit_follow_up:
+            return
+        if self._recovery is not None and self._recovery.is_alive():
+            return
+        if not CircuitBreaker(self.settings).is_open:
+            return
+
+        def watch() -> None:
+            while not shutdown.requested():
+                breaker = CircuitBreaker(self.settings)
+                if not breaker.is_open:
+                    # Closed by a scheduled pass meanwhile
+                    return
+                if shutdown.wait(max(breaker.retry_in(), 1.0)):
+                    return
+                if self.probe_func():
+                    cleanup_logger.info("GitHub API recovered - running follow-up pass now")
+                    self._run_cleanup(resume=True)
+
+        cleanup_logger.info("Watching the GitHub API circuit for an early follow-up pass")
+        self._recovery = threading.Thread(target=watch, name="circuit-recovery", daemon=True)
+        self._recovery.start()
+
+    def _install_signal_handlers(self) -> None:
+        """SIGTERM/SIGINT wake every pacing wait and stop the scheduler."""
+
+        def signal_handler(signum, _frame):
+            signal_name = signal.Signals(signum).name
+            shutdown.request(f"Received {signal_name}")
+            if self.scheduler:
+                self.scheduler.stop()
+
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+
+    def _drain(self) -> None:
+        """Give an in-flight pass CLEANUP_SHUTDOWN_BUDGET seconds to stop.
+
+        The pass notices the shutdown at its next wait and checkpoints
+        itself. If it is stuck inside an HTTP request past the budget,
+        flush its progress from here and exit hard instead of letting
+        Docker SIGKILL us mid-write.
+        """
+        budget = self.settings.cleanup_shutdown_budget
+        if self._idle.wait(budget):
+            return
+        cleanup_logger.warning(
+            f"Cleanup pass still busy after {budget:.0f}s shutdown budget, "
+            "saving progress and exiting"
+        )
+        flush_active()
+        tracing.flush()
+        sys.stdout.flush()
+        os._exit(0)
 
     def _on_job_event(self, event: Event) -> None:
         if not isinstance(event, JobReleased):
@@ -80,6 +180,8 @@ class CleanupScheduler:
             cleanup_logger.warning("Scheduler is disabled (CLEANUP_SCHEDULE_ENABLED=false)")
             return
 
+        self._install_signal_handlers()
+
         # Optional: run immediately on startup before entering the schedule loop
         if self.settings.cleanup_run_on_startup:
             cleanup_logger.info("CLEANUP_RUN_ON_STARTUP=true - running immediate pass")
@@ -87,21 +189,14 @@ class CleanupScheduler:
                 self._run_cleanup()
             except Exception as e:
                 cleanup_logger.error(f"Startup cleanup failed: {e}")
+            if shutdown.requested():
+                return
 
         trigger = self._create_trigger()
         print_scheduler_info(self._describe_schedule())
 
         with Scheduler() as scheduler:
             self.scheduler = scheduler
-
-            def signal_handler(signum, _frame):
-                signal_name = signal.Signals(signum).name
-                cleanup_logger.info(f"Received {signal_name}, stopping scheduler...")
-                scheduler.stop()
-
-            signal.signal(signal.SIGINT, signal_handler)
-            signal.signal(signal.SIGTERM, signal_handler)
-
             scheduler.subscribe(self._on_job_event, {JobReleased})
             schedule_id = scheduler.add_schedule(
                 self._run_cleanup, trigger, id="runner_cleanup"
@@ -119,7 +214,13 @@ class CleanupScheduler:
                 scheduler.run_until_stopped()
             except (KeyboardInterrupt, SystemExit):
                 cleanup_logger.debug("Scheduler stopped")
+            finally:
+                self._drain()
 
 
-def setup_scheduler(settings: Settings, cleanup_func: Callable[[], bool]) -> CleanupScheduler:
-    return CleanupScheduler(settings, cleanup_func)
+def setup_scheduler(
+    settings: Settings,
+    cleanup_func: Callable[..., bool],
+    probe_func: Callable[[], bool] | None = None,
+) -> CleanupScheduler:
+    return CleanupScheduler(settings, cleanup_func, probe_func)
@@ -0,0 +1,61 @@
+"""
+Cleanup Manager - Shutdown Signalling
+
+A process-wide stop event shared by every long-running loop. SIGTERM
+(docker stop) and SIGINT set it; loops wait on it instead of sleeping
+so they exit promptly.
+"""
+
+import signal
+import threading
+
+from console import cleanup_logger
+
+_stop = threading.Event()
+
+
+def requested() -> bool:
+    """True once a shutdown has been requested."""
+    return _stop.is_set()
+
+
+def request(reason: str = "") -> None:
+    if not _stop.is_set() and reason:
+        cleanup_logger.info(f"{reason}, shutting down...")
+    _stop.set()
+
+
+def wait(seconds: float) -> bool:
+    """Sleep up to `seconds`; return True if woken by a shutdown request."""
+    if seconds <= 0:
+        return _stop.is_set()
+    return _stop.wait(seconds)
+
+
+def install_signal_handlers() -> None:
+    """Route SIGTERM/SIGINT into the shared stop event."""
+
+    def handler(signum, _frame):
+        request(f"Received {signal.Signals(signum).name}")
+
+    signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, handler)
+
+
+def run_service(name: str, interval_sec: float, tick) -> int:
+    """Call `tick()` every `interval_sec` seconds until shutdown.
+
+    Exceptions from a tick are logged and the loop carries on; a
+    maintenance sidecar must not crash-loop on a transient daemon error.
+    """
+    install_signal_handlers()
+    cleanup_logger.info(f"Starting {name} (every {int(interval_sec)}s)")
+    while not requested():
+        try:
+            tick()
+        except Exception as e:
+            cleanup_logger.error(f"{name} iteration failed: {e}")
+        if wait(interval_sec):
+            break
+    cleanup_logger.info(f"{name} stopped")
+    return 0
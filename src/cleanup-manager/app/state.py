@@ -0,0 +1,54 @@
+"""
+Cleanup Manager - Persistent State
+
+Small JSON documents kept in STATE_DIR (a named volume in compose) so
+the services remember what they learned across restarts and image
+updates. Writes go through a temp file + os.replace so a SIGKILL never
+leaves a half-written document behind.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from config import Settings
+from console import cleanup_logger
+
+
+def state_path(settings: Settings, name: str) -> Path:
+    """Return the path of state document `name` inside STATE_DIR."""
+    return Path(settings.state_dir) / name
+
+
+def load_json(path: Path, default=None):
+    """Load a JSON document, returning `default` if missing or unreadable."""
+    try:
+        with path.open(encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        cleanup_logger.warning(f"Ignoring unreadable state file {path}: {e}")
+        return default
+
+
+def save_json(path: Path, data) -> bool:
+    """Atomically write `data` as JSON. Returns False (and logs) on failure."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return True
+    except OSError as e:
+        cleanup_logger.warning(f"Could not persist state to {path}: {e}")
+        return False
@@ -0,0 +1,192 @@
+"""
+Cleanup Manager - Credential Pool
+
+Every PAT owner and every GitHub App installation has its own primary
+rate-limit bucket (5000/h) and its own secondary limits. With extra
+credentials configured (EXTRA_ACCESS_TOKENS, EXTRA_APPS) a cleanup pass
+spreads its deletes over all of them, so backlog clearing scales with
+the number of credentials:
+
+    - each credential has its own RateLimit (floor_delay tuned and
+      persisted separately)
+    - every request goes to the in-rotation credential with the most
+      usable quota
+    - a secondary-limit hit takes the credential out of rotation for
+      its Retry-After; the request is retried at once on another one
+
+PoolRate presents the in-rotation credentials as one read-only
+QuotaView (summed buckets, combined request rate) to QuotaPlanner and
+the pass stats.
+PATs of the same user share one bucket - pool different users' tokens.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from auth import get_installation_token, make_jwt, parse_extra_apps, pem_env_var, resolve_token
+from config import Settings
+from console import cleanup_logger
+from rate_limit import QuotaView, RateLimit, save_tuned_floor, tuned_rate_limit
+
+
+# Installation tokens live 1h; refresh with margin
+INSTALLATION_TOKEN_TTL = 50 * 60
+
+
+@dataclass
+class Credential:
+    """One token with its own rate-limit bucket."""
+
+    label: str
+    # Key under which its floor_delay is tuned (the scope for the primary)
+    tuning_key: str
+    rate: RateLimit
+    token: str = ""
+    # Re-issues the token (App installations); None for PATs
+    refresh: Callable[[], str] | None = None
+    fetched_at: float = 0.0
+    benched_until: float = 0.0
+    used_at: float = 0.0
+
+    def current_token(self) -> str:
+        """The token, re-issued once an installation token nears expiry."""
+        if self.refresh and time.time() - self.fetched_at > INSTALLATION_TOKEN_TTL:
+            try:
+                self.token = self.refresh()
+                self.fetched_at = time.time()
+            except (ValueError, FileNotFoundError, RuntimeError, OSError) as e:
+                cleanup_logger.warning(f"Could not refresh {self.label}: {e}")
+        return self.token
+
+
+class PoolRate(QuotaView):
+    """The pool's in-rotation credentials seen as one bucket (read-only:
+    responses update the picked credential's own RateLimit)."""
+
+    def __init__(self, pool: "TokenPool"):
+        self.pool = pool
+
+    def _rates(self) -> list[RateLimit]:
+        return [c.rate for c in self.pool.in_rotation() or self.pool.credentials]
+
+    @property
+    def limit(self) -> int:
+        return sum(r.limit for r in self._rates())
+
+    @property
+    def remaining(self) -> int:
+        return sum(r.remaining for r in self._rates())
+
+    @property
+    def reset_at(self) -> int:
+        # Earliest point more quota becomes available
+        return min(r.reset_at for r in self._rates())
+
+    @property
+    def floor_delay(self) -> float:
+        # Credentials are paced independently: their request rates add up
+        return 1.0 / sum(1.0 / max(r.floor_delay, 0.05) for r in self._rates())
+
+    @property
+    def secondary_hits(self) -> int:
+        return sum(c.rate.secondary_hits for c in self.pool.credentials)
+
+    @property
+    def others_per_sec(self) -> float:
+        return sum(r.others_per_sec for r in self._rates())
+
+    def reserved(self) -> int:
+        return sum(r.reserved() for r in self._rates())
+
+    def window_budget(self) -> int:
+        return sum(r.window_budget() for r in self._rates())
+
+    def usable(self) -> int:
+        return sum(r.usable() for r in self._rates())
+
+
+class TokenPool:
+    """Credentials for one cleanup pass, picked by usable quota."""
+
+    def __init__(self, settings: Settings, scope: str):
+        self.settings = settings
+        self.scope = scope
+        self.credentials: list[Credential] = []
+        self.rate = PoolRate(self)
+
+    def load(self) -> None:
+        """Resolve every configured credential. The primary one must work."""
+        token, label = resolve_token(self.settings)
+        self.credentials.append(Credential(
+            label,
+            self.scope,
+            tuned_rate_limit(self.settings, self.scope),
+            token,
+            (lambda: resolve_token(self.settings)[0]) if not self.settings.has_pat_auth else None,
+            time.time(),
+        ))
+        extra_pats = [t.strip() for t in self.settings.extra_access_tokens.split(",") if t.strip()]
+        for n, pat in enumerate(extra_pats, 1):
+            self._add(f"extra PAT #{n} (EXTRA_ACCESS_TOKENS)", f"pat-{n}", lambda pat=pat: pat, False)
+        for app_id, pem_path in parse_extra_apps(self.settings.extra_apps):
+            def issue(app_id=app_id, pem_path=pem_path) -> str:
+                app_jwt = make_jwt(app_id, pem_path, pem_env_var(app_id))
+                return get_installation_token(app_jwt, self.settings.app_install_scope)
+            self._add(f"GitHub App {app_id} (EXTRA_APPS)", f"app-{app_id}", issue, True)
+
+    def _add(self, label: str, key: str, issue: Callable[[], str], refreshes: bool) -> None:
+        """Add an extra credential; one that fails to resolve is skipped."""
+        tuning_key = f"{self.scope}#{key}"
+        try:
+            token = issue()
+        except (ValueError, FileNotFoundError, RuntimeError, OSError) as e:
+            cleanup_logger.warning(f"Skipping pooled credential {label}: {e}")
+            return
+        self.credentials.append(Credential(
+            label,
+            tuning_key,
+            tuned_rate_limit(self.settings, tuning_key),
+            token,
+            issue if refreshes else None,
+            time.time(),
+        ))
+
+    @property
+    def labels(self) -> str:
+        return ", ".join(c.label for c in self.credentials)
+
+    def in_rotation(self) -> list[Credential]:
+        now = time.time()
+        return [c for c in self.credentials if c.benched_until <= now]
+
+    def pick(self) -> Credential:
+        """Credential for the next request: most usable quota in rotation.
+
+        Credentials whose own floor_delay has not passed since their last
+        request come second; with every credential benched, the one that
+        recovers first is used.
+        """
+        now = time.time()
+        ready = self.in_rotation()
+        if not ready:
+            cred = min(self.credentials, key=lambda c: c.benched_until)
+        else:
+            cred = max(ready, key=lambda c: (
+                now - c.used_at >= c.rate.floor_delay, c.rate.usable(), -c.used_at
+            ))
+        cred.used_at = now
+        return cred
+
+    def bench(self, cred: Credential, seconds: float) -> None:
+        """Take `cred` out of rotation after a secondary-limit hit."""
+        cred.benched_until = time.time() + seconds
+        cred.rate.react_to_secondary(int(seconds))
+        if len(self.credentials) > 1:
+            cleanup_logger.warning(
+                f"{cred.label} hit a secondary limit, out of rotation for {int(seconds)}s"
+            )
+
+    def save_tuning(self) -> None:
+        for cred in self.credentials:
+            save_tuned_floor(self.settings, cred.tuning_key, cred.rate)
@@ -0,0 +1,336 @@
+"""
+Cleanup Manager - Shared Tool-Cache Broker
+
+Single writer for the shared `tool-cache` volume. Agents mount the
+volume read-only and never write to it; instead they ask the broker to
+populate a tool version, either from an upstream archive URL or by
+uploading the tarball of a version they just installed locally (the
+job-completed hook in scripts/agent-hooks/ does the latter).
+
+Layout follows @actions/tool-cache, so setup-* actions find entries
+without any changes:
+
+    <root>/<tool>/<version>/<arch>/...        tool files
+    <root>/<tool>/<version>/<arch>.complete   marker written last
+
+Guarantees:
+  - Exactly once: each (tool, version, arch) key is populated by one
+    worker under a per-key lock (threading lock in-process, flock
+    across processes). Concurrent requests for the same key wait for
+    that worker instead of downloading again.
+  - Atomic: content is staged under <root>/.staging and renamed into
+    place, then the marker is written. Readers either see a complete
+    version or none at all.
+  - Garbage collection: versions not used for TOOL_CACHE_GC_DAYS are
+    renamed into <root>/.trash (atomic) and deleted from there.
+"""
+
+import fcntl
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+import zipfile
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlparse
+
+from config import Settings
+from console import cleanup_logger, fmt_duration
+from httpd import parse_json_body, start_server
+from state import load_json, save_json, state_path
+
+
+STATE_FILE = "tool-cache.json"
+_SEGMENT = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._+-]{0,127}$")
+
+
+def _key(tool: str, version: str, arch: str) -> tuple[str, str, str]:
+    for part in (tool, version, arch):
+        if not _SEGMENT.match(part or ""):
+            raise ValueError(f"invalid tool-cache path segment '{part}'")
+    return tool, version, arch
+
+
+def _key_str(key: tuple[str, str, str]) -> str:
+    return "/".join(key)
+
+
+class ToolCacheBroker:
+    """Populate-once, read-many manager for the shared tool cache."""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.root = Path(settings.tool_cache_dir)
+        self._staging = self.root / ".staging"
+        self._trash = self.root / ".trash"
+        self._locks_dir = self.root / ".locks"
+        for d in (self._staging, self._trash, self._locks_dir):
+            d.mkdir(parents=True, exist_ok=True)
+        self._inflight: dict[tuple[str, str, str], Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._state_file = state_path(settings, STATE_FILE)
+        self._usage: dict[str, float] = dict(load_json(self._state_file, {}) or {})
+        self._usage_lock = threading.Lock()
+        self.allowed_hosts = {
+            h.strip().lower() for h in settings.tool_cache_allowed_hosts.split(",") if h.strip()
+        }
+
+    # ---- Paths ----
+
+    def _dir(self, key) -> Path:
+        return self.root.joinpath(*key)
+
+    def _marker(self, key) -> Path:
+        tool, version, arch = key
+        return self.root / tool / version / f"{arch}.complete"
+
+    def is_complete(self, key) -> bool:
+        return self._marker(key).is_file() and self._dir(key).is_dir()
+
+    # ---- Locking ----
+
+    @contextmanager
+    def _file_lock(self, key):
+        """Cross-process exclusive lock for one key (broker replicas)."""
+        path = self._locks_dir / (_key_str(key).replace("/", "__") + ".lock")
+        with open(path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _touch(self, key) -> None:
+        with self._usage_lock:
+            self._usage[_key_str(key)] = time.time()
+
+    def save(self) -> None:
+        with self._usage_lock:
+            snapshot = dict(self._usage)
+        save_json(self._state_file, snapshot)
+
+    # ---- Populate ----
+
+    def ensure(self, key, populate) -> str:
+        """Make sure `key` is in the cache, running `populate(staging_dir)` once.
+
+        Returns "hit" if it was already present, "populated" if this call
+        (or a concurrent one it joined) filled it.
+        """
+        if self.is_complete(key):
+            self._touch(key)
+            return "hit"
+        if populate is None:
+            raise ValueError(f"{_key_str(key)} is not cached and no source was given")
+
+        with self._inflight_lock:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._inflight[key] = fut
+
+        if not owner:
+            cleanup_logger.debug(f"Joining in-flight populate of {_key_str(key)}")
+            fut.result(timeout=self.settings.tool_cache_populate_timeout)
+            self._touch(key)
+            return "populated"
+
+        try:
+            with self._file_lock(key):
+                if self.is_complete(key):
+                    result = "hit"
+                else:
+                    self._populate_locked(key, populate)
+                    result = "populated"
+            self._touch(key)
+            fut.set_result(result)
+            return result
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _populate_locked(self, key, populate) -> None:
+        start = time.time()
+        work = Path(tempfile.mkdtemp(dir=self._staging, prefix=_key_str(key).replace("/", "_") + "."))
+        try:
+            content = populate(work)
+            target = self._dir(key)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.exists():
+                # Leftover from a writer that died before the marker
+                os.rename(target, self._trash / f"{uuid.uuid4().hex}")
+            os.rename(content, target)
+            marker = self._marker(key)
+            tmp_marker = marker.with_name(f".{marker.name}.{uuid.uuid4().hex}")
+            tmp_marker.write_text("")
+            os.rename(tmp_marker, marker)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        cleanup_logger.success(
+            f"Populated {_key_str(key)} in {fmt_duration(time.time() - start)}"
+        )
+
+    def _check_url(self, url: str) -> None:
+        parsed = urlparse(url)
+        if parsed.scheme != "https":
+            raise ValueError("only https:// sources are accepted")
+        host = (parsed.hostname or "").lower()
+        if self.allowed_hosts and not any(
+            host == h or host.endswith(f".{h}") for h in self.allowed_hosts
+        ):
+            raise ValueError(f"host '{host}' is not in TOOL_CACHE_ALLOWED_HOSTS")
+
+    def from_url(self, url: str):
+        """populate() callback that downloads and unpacks an archive."""
+        self._check_url(url)
+
+        def populate(work: Path) -> Path:
+            archive = work / "archive"
+            req = urllib.request.Request(url, headers={"User-Agent": "bauer-group-tool-cache"})
+            with urllib.request.urlopen(req, timeout=self.settings.tool_cache_populate_timeout) as resp, \
+                    archive.open("wb") as out:
+                shutil.copyfileobj(resp, out, 1024 * 1024)
+            return _extract(archive, work / "out", strip=True)
+
+        return populate
+
+    def from_stream(self, stream, length: int):
+        """populate() callback that unpacks an uploaded tar stream."""
+
+        def populate(work: Path) -> Path:
+            archive = work / "archive.tar"
+            remaining = length
+            with archive.open("wb") as out:
+                while remaining > 0:
+                    chunk = stream.read(min(remaining, 1024 * 1024))
+                    if not chunk:
+                        raise ValueError("upload ended early")
+                    out.write(chunk)
+                    remaining -= len(chunk)
+            return _extract(archive, work / "out", strip=False)
+
+        return populate
+
+    # ---- Garbage collection ----
+
+    def _last_used(self, key) -> float:
+        """Newest of broker-recorded use and filesystem atime (relatime)."""
+        recorded = self._usage.get(_key_str(key), 0.0)
+        newest = recorded
+        base = self._dir(key)
+        try:
+            for depth, (dirpath, dirnames, filenames) in enumerate(os.walk(base)):
+                for name in filenames:
+                    newest = max(newest, os.stat(os.path.join(dirpath, name)).st_atime)
+                if depth >= 2:
+                    dirnames[:] = []
+        except OSError:
+            pass
+        return newest or self._marker(key).stat().st_mtime
+
+    def entries(self) -> list[tuple[tuple[str, str, str], float]]:
+        out = []
+        for marker in self.root.glob("*/*/*.complete"):
+            tool, version = marker.parent.parent.name, marker.parent.name
+            key = (tool, version, marker.name[: -len(".complete")])
+            if self._dir(key).is_dir():
+                out.append((key, self._last_used(key)))
+        return sorted(out)
+
+    def gc(self) -> None:
+        max_idle = self.settings.tool_cache_gc_days * 86400
+        now = time.time()
+        removed = 0
+        for key, last in self.entries():
+            if now - last < max_idle:
+                continue
+            with self._file_lock(key):
+                marker = self._marker(key)
+                if not marker.exists():
+                    continue
+                # Marker first: readers stop treating the version as valid
+                # before its files disappear.
+                marker.unlink()
+                os.rename(self._dir(key), self._trash / uuid.uuid4().hex)
+            with self._usage_lock:
+                self._usage.pop(_key_str(key), None)
+            removed += 1
+            cleanup_logger.status(f"GC: removed {_key_str(key)} (idle {fmt_duration(now - last)})")
+        for leftover in list(self._trash.iterdir()) + [
+            p for p in self._staging.iterdir() if now - p.stat().st_mtime > 86400
+        ]:
+            shutil.rmtree(leftover, ignore_errors=True)
+        if removed:
+            cleanup_logger.success(f"Tool-cache GC removed {removed} unused versions")
+        self.save()
+
+    # ---- HTTP API ----
+
+    def routes(self) -> dict:
+        def ensure(query, body, _handler):
+            data = {**query, **parse_json_body(body)}
+            key = _key(data.get("tool", ""), data.get("version", ""), data.get("arch", "x64"))
+            url = data.get("url", "")
+            if not url and not self.is_complete(key):
+                raise ValueError("url is required for versions not in the cache")
+            result = self.ensure(key, self.from_url(url) if url else None)
+            return 200, {"status": result, "path": str(self._dir(key))}
+
+        def upload(query, _body, handler):
+            key = _key(query.get("tool", ""), query.get("version", ""), query.get("arch", "x64"))
+            length = int(handler.headers.get("Content-Length") or 0)
+            if self.is_complete(key):
+                # Someone else already promoted this version; drop the upload
+                self._touch(key)
+                return 200, {"status": "hit", "path": str(self._dir(key))}
+            if length <= 0:
+                raise ValueError("Content-Length is required")
+            if length > self.settings.tool_cache_max_upload_mb * 1024 * 1024:
+                raise ValueError("upload exceeds TOOL_CACHE_MAX_UPLOAD_MB")
+            result = self.ensure(key, self.from_stream(handler.rfile, length))
+            return 200, {"status": result, "path": str(self._dir(key))}
+
+        def listing(_query, _body, _handler):
+            return 200, [
+                {"tool": k[0], "version": k[1], "arch": k[2], "last_used": int(t)}
+                for k, t in self.entries()
+            ]
+
+        def health(_query, _body, _handler):
+            return 200, "ok"
+
+        return {
+            ("POST", "/ensure"): ensure,
+            ("PUT", "/upload"): upload,
+            ("GET", "/tools"): listing,
+            ("GET", "/healthz"): health,
+        }
+
+    def serve(self) -> None:
+        start_server(self.settings.tool_cache_bind, self.settings.tool_cache_port, self.routes())
+
+
+def _extract(archive: Path, dest: Path, strip: bool) -> Path:
+    """Unpack a tar/zip archive; with `strip`, descend into a lone top-level dir."""
+    dest.mkdir()
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            zf.extractall(dest)
+    else:
+        with tarfile.open(archive) as tf:
+            tf.extractall(dest, filter="data")
+    children = list(dest.iterdir())
+    if strip and len(children) == 1 and children[0].is_dir():
+        return children[0]
+    return dest
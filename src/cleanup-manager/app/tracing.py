@@ -0,0 +1,208 @@
+"""
+Cleanup Manager - Span Tracing
+
+Minimal span tracer for cleanup passes, exported as OTLP/JSON
+(ExportTraceServiceRequest) without pulling in the OpenTelemetry SDK:
+
+    CLEANUP_TRACE_FILE            append one JSON batch per line
+    OTEL_EXPORTER_OTLP_ENDPOINT   POST batches to <endpoint>/v1/traces
+
+Either, both or neither may be set; with neither, span() is a no-op.
+Spans nest through a context variable, so `run_cleanup` becomes the
+root and every list page, delete, token exchange and sleep below it a
+child. Finished spans are buffered and exported when a root span ends
+and every EXPORT_BATCH spans, so a multi-hour pass streams out in
+batches a trace viewer merges by trace ID.
+"""
+
+import contextvars
+import json
+import os
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+from config import Settings
+from console import cleanup_logger
+
+
+EXPORT_BATCH = 500
+SERVICE_NAME = "cleanup-manager"
+
+# OTLP enum values
+KIND_INTERNAL = 1
+KIND_CLIENT = 3
+STATUS_ERROR = 2
+
+_current: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("span", default=None)
+
+
+def _attr_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attrs: dict) -> list[dict]:
+    return [{"key": k, "value": _attr_value(v)} for k, v in attrs.items() if v is not None]
+
+
+class Span:
+    """One timed operation. Attributes may be added until it ends."""
+
+    def __init__(self, name: str, parent: "Span | None", kind: int, attrs: dict):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else ""
+        self.kind = kind
+        self.attrs = dict(attrs)
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.error: str | None = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attrs[key] = value
+
+    def fail(self, message: str) -> None:
+        self.error = message
+
+    def to_otlp(self) -> dict:
+        doc = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _attributes(self.attrs),
+        }
+        if self.parent_id:
+            doc["parentSpanId"] = self.parent_id
+        if self.error is not None:
+            doc["status"] = {"code": STATUS_ERROR, "message": self.error}
+        return doc
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def fail(self, message: str) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Tracer:
+    """Buffers finished spans and exports them to file and/or collector."""
+
+    def __init__(self, trace_file: str = "", endpoint: str = ""):
+        self.trace_file = trace_file
+        self.endpoint = endpoint.rstrip("/")
+        self.enabled = bool(trace_file or endpoint)
+        self._buffer: list[dict] = []
+        self._lock = threading.Lock()
+        self._export_failed = False
+        self._resource = {
+            "attributes": _attributes({
+                "service.name": SERVICE_NAME,
+                "host.name": socket.gethostname(),
+                "process.pid": os.getpid(),
+            })
+        }
+
+    def finished(self, span: Span) -> None:
+        with self._lock:
+            self._buffer.append(span.to_otlp())
+            full = len(self._buffer) >= EXPORT_BATCH
+        if full or not span.parent_id:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        if not spans:
+            return
+        batch = {
+            "resourceSpans": [{
+                "resource": self._resource,
+                "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+            }]
+        }
+        payload = json.dumps(batch, separators=(",", ":"))
+        if self.trace_file:
+            try:
+                os.makedirs(os.path.dirname(self.trace_file) or ".", exist_ok=True)
+                with open(self.trace_file, "a", encoding="utf-8") as f:
+                    f.write(payload + "\n")
+            except OSError as e:
+                self._warn(f"Could not write traces to {self.trace_file}: {e}")
+        if self.endpoint:
+            req = urllib.request.Request(
+                f"{self.endpoint}/v1/traces",
+                data=payload.encode(),
+                method="POST",
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                with urllib.request.urlopen(req, timeout=10) as resp:
+                    resp.read()
+            except (urllib.error.URLError, OSError) as e:
+                self._warn(f"Could not export traces to {self.endpoint}: {e}")
+
+    def _warn(self, message: str) -> None:
+        # Once per process - a missing collector must not flood the log
+        if not self._export_failed:
+            self._export_failed = True
+            cleanup_logger.warning(message)
+
+
+_tracer = Tracer()
+
+
+def configure(settings: Settings) -> None:
+    """Enable export according to CLEANUP_TRACE_FILE / OTEL_EXPORTER_OTLP_ENDPOINT."""
+    global _tracer
+    _tracer = Tracer(settings.cleanup_trace_file, settings.otel_exporter_otlp_endpoint)
+
+
+@contextmanager
+def span(name: str, attributes: dict | None = None, kind: int = KIND_INTERNAL):
+    """Time the enclosed block as a child of the current span.
+
+    An exception escaping the block marks the span as failed and is
+    re-raised unchanged.
+    """
+    tracer = _tracer
+    if not tracer.enabled:
+        yield _NOOP
+        return
+    s = Span(name, _current.get(), kind, attributes or {})
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.fail(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current.reset(token)
+        s.end_ns = time.time_ns()
+        tracer.finished(s)
+
+
+def current():
+    """The innermost open span (a no-op span when tracing is off)."""
+    return _current.get() or _NOOP
+
+
+def flush() -> None:
+    _tracer.flush()
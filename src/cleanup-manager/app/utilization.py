@@ -0,0 +1,270 @@
+"""
+Cleanup Manager - Runner Utilization Sampler
+
+Sizing `./runner.sh scale N` and DIND_CPU_LIMIT / DIND_MEMORY_LIMIT from
+data instead of guesses. Every UTILIZATION_INTERVAL_SECONDS the runner
+list is polled the way the inventory server does it (If-None-Match per
+page; unchanged pages come back as 304 and cost no quota) and one
+sample of online / busy counts is recorded per dimension:
+
+    all         every runner in the scope
+    owned       runners named RUNNER_NAME_PREFIX-* (this stack)
+    label:<l>   runners carrying label <l> (the MAX_LABELS most common)
+    group:<id>  runners of one runner group
+
+Samples go to a small SQLite time series on the cleanup-state volume
+(utilization.db). It is a ring buffer by age: rows older than
+UTILIZATION_RETENTION_DAYS are dropped on every sample.
+
+`main.py --utilization-report [--days N]` prints busy/online
+percentiles per dimension, a weekday x hour heatmap of busy owned
+runners and sizing hints: agents for the p95 busy count plus
+UTILIZATION_HEADROOM_PCT, and DinD limits for that many concurrent jobs
+from the per-job CPU and memory recorded by --dind-telemetry (if any).
+"""
+
+import math
+import sqlite3
+import time
+import urllib.error
+from datetime import datetime
+
+from config import Settings
+from console import cleanup_logger, console
+from dind_cache import fmt_bytes
+from dind_telemetry import STATE_FILE as TELEMETRY_STATE_FILE, UNATTRIBUTED
+from inventory import RunnerInventory, runner_labels
+from ownership import Ownership
+from state import load_json, state_path
+
+
+DB_FILE = "utilization.db"
+INVENTORY_STATE_FILE = "utilization-inventory.json"
+# Label dimensions kept per sample (most common first)
+MAX_LABELS = 30
+PERCENTILES = (50, 90, 95, 99)
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+_API_ERRORS = (urllib.error.URLError, OSError, ValueError, RuntimeError, KeyError)
+
+
+def _pct(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _connect(settings: Settings) -> sqlite3.Connection:
+    path = state_path(settings, DB_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS samples "
+        "(t INTEGER, dim TEXT, key TEXT, online INTEGER, busy INTEGER)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS samples_dim_t ON samples (dim, key, t)")
+    return conn
+
+
+def count(runners: list[dict], owned: Ownership) -> list[tuple[str, str, int, int]]:
+    """(dim, key, online, busy) rows for one sample."""
+    totals: dict[tuple[str, str], list[int]] = {}
+
+    def add(dim: str, key: str, runner: dict) -> None:
+        entry = totals.setdefault((dim, key), [0, 0])
+        if runner.get("status") == "online":
+            entry[0] += 1
+            if runner.get("busy"):
+                entry[1] += 1
+
+    label_seen: dict[str, int] = {}
+    for r in runners:
+        add("all", "", r)
+        if (r.get("name") or "").startswith(owned.prefix):
+            add("owned", "", r)
+        if r.get("runner_group_id") is not None:
+            add("group", str(r["runner_group_id"]), r)
+        for lbl in runner_labels(r):
+            label_seen[lbl] = label_seen.get(lbl, 0) + 1
+    top = set(sorted(label_seen, key=label_seen.get, reverse=True)[:MAX_LABELS])
+    for r in runners:
+        for lbl in runner_labels(r) & top:
+            add("label", lbl, r)
+    totals.setdefault(("owned", ""), [0, 0])
+    return [(dim, key, online, busy) for (dim, key), (online, busy) in sorted(totals.items())]
+
+
+class UtilizationSampler:
+    """Periodic online/busy samples of the runner fleet."""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.retention = settings.utilization_retention_days * 86400
+        # Its own conditionally polled copy (not the inventory server's file)
+        self.inventory = RunnerInventory(settings, INVENTORY_STATE_FILE)
+        self.owned = Ownership(settings, self.inventory.scope)
+
+    def tick(self) -> None:
+        try:
+            self.inventory.refresh()
+        except _API_ERRORS as e:
+            cleanup_logger.warning(f"Utilization sample skipped, listing failed: {e}")
+            return
+        self.inventory.save()
+        now = int(time.time())
+        rows = count(self.inventory.runners(), self.owned)
+        conn = _connect(self.settings)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO samples VALUES (?, ?, ?, ?, ?)",
+                    [(now, *row) for row in rows],
+                )
+                conn.execute("DELETE FROM samples WHERE t < ?", (now - self.retention,))
+        except sqlite3.Error as e:
+            cleanup_logger.warning(f"Could not record utilization sample: {e}")
+            return
+        finally:
+            conn.close()
+        owned = next(r for r in rows if r[0] == "owned")
+        stats = self.inventory.stats
+        cleanup_logger.debug(
+            f"Utilization: owned {owned[3]}/{owned[2]} busy/online "
+            f"({stats['not_modified']} of {stats['requests']} page requests unchanged so far)"
+        )
+
+
+# ---- Report ----
+
+
+def load_series(settings: Settings, days: float) -> tuple[list[int], dict]:
+    """Sample times and {(dim, key): {t: (online, busy)}} of the last `days`."""
+    if not state_path(settings, DB_FILE).exists():
+        return [], {}
+    conn = _connect(settings)
+    try:
+        rows = conn.execute(
+            "SELECT t, dim, key, online, busy FROM samples WHERE t >= ? ORDER BY t",
+            (int(time.time() - days * 86400),),
+        ).fetchall()
+    finally:
+        conn.close()
+    times = sorted({t for t, *_ in rows})
+    series: dict[tuple[str, str], dict[int, tuple[int, int]]] = {}
+    for t, dim, key, online, busy in rows:
+        series.setdefault((dim, key), {})[t] = (online, busy)
+    return times, series
+
+
+def _column(times: list[int], points: dict, idx: int) -> list[float]:
+    # A dimension missing from a sample had nothing online then
+    return [float(points.get(t, (0, 0))[idx]) for t in times]
+
+
+def _job_footprint(settings: Settings) -> tuple[float, float] | None:
+    """p90 (cores, memory bytes) of one finished job, from --dind-telemetry."""
+    state = load_json(state_path(settings, TELEMETRY_STATE_FILE), {}) or {}
+    jobs = [
+        j for j in state.get("jobs", [])
+        if j.get("key") != UNATTRIBUTED and j.get("ended") and j["ended"] > j["started"]
+    ]
+    if len(jobs) < 5:
+        return None
+    cores = [j["cpu_sec"] / (j["ended"] - j["started"]) for j in jobs]
+    return _pct(cores, 90), _pct([j["mem_peak"] for j in jobs], 90)
+
+
+def print_report(settings: Settings, days: float = 7.0) -> None:
+    from rich.table import Table
+
+    times, series = load_series(settings, days)
+    if not times:
+        console.print("[dim]No utilization samples recorded yet.[/]")
+        return
+
+    span = (times[-1] - times[0]) / 3600
+    table = Table(title=f"Runner utilization, {len(times)} samples over {span:.1f}h")
+    for col in ("Dimension", "Online p50", "Online max",
+                *(f"Busy p{p}" for p in PERCENTILES), "Busy max", "Util p95"):
+        table.add_column(col, justify="left" if col == "Dimension" else "right")
+    order = {"all": 0, "owned": 1, "group": 2, "label": 3}
+    ranked = sorted(series.items(), key=lambda kv: (order.get(kv[0][0], 9), kv[0][1]))
+    for (dim, key), points in ranked:
+        online = _column(times, points, 0)
+        busy = _column(times, points, 1)
+        util = [b / o for o, b in zip(online, busy) if o]
+        if not any(online):
+            continue
+        table.add_row(
+            f"{dim}:{key}" if key else dim,
+            f"{_pct(online, 50):.0f}",
+            f"{max(online):.0f}",
+            *(f"{_pct(busy, p):.1f}" for p in PERCENTILES),
+            f"{max(busy):.0f}",
+            f"{_pct(util, 95):.0%}" if util else "-",
+        )
+    console.print(table)
+
+    owned = series.get(("owned", ""), {})
+    busy_owned = _column(times, owned, 1)
+    _print_heatmap(times, owned)
+
+    p95 = _pct(busy_owned, 95)
+    agents = max(math.ceil(p95 * (1 + settings.utilization_headroom_pct)), 1)
+    console.print(
+        f"\n[bold]Sizing[/] (owned runners, busy p95 {p95:.1f}, p99 {_pct(busy_owned, 99):.1f}, "
+        f"max {max(busy_owned):.0f})"
+    )
+    console.print(
+        f"  Agents:  ./runner.sh scale {agents}   "
+        f"[dim](p95 + {settings.utilization_headroom_pct:.0%} headroom)[/]"
+    )
+    footprint = _job_footprint(settings)
+    if footprint is None:
+        console.print(
+            "  DinD:    [dim]no per-job footprint yet - run --dind-telemetry "
+            "(docker-compose.dind-telemetry.yml) to size DIND_CPU_LIMIT / DIND_MEMORY_LIMIT[/]"
+        )
+        return
+    cores, mem = footprint
+    console.print(
+        f"  DinD:    DIND_CPU_LIMIT={max(math.ceil(cores * agents), 1)}  "
+        f"DIND_MEMORY_LIMIT={max(math.ceil(mem * agents / 1024 ** 3), 1)}g   "
+        f"[dim]({agents} concurrent jobs x p90 job: {cores:.2f} cores, {fmt_bytes(mem)}; "
+        f"now {settings.dind_cpu_limit:g} / {settings.dind_memory_limit})[/]"
+    )
+
+
+def _print_heatmap(times: list[int], points: dict) -> None:
+    """p90 busy owned runners per weekday and hour (local time)."""
+    from rich.table import Table
+
+    cells: dict[tuple[int, int], list[float]] = {}
+    for t in times:
+        at = datetime.fromtimestamp(t)
+        cells.setdefault((at.weekday(), at.hour), []).append(float(points.get(t, (0, 0))[1]))
+    peak = max((_pct(v, 90) for v in cells.values()), default=0.0) or 1.0
+
+    table = Table(
+        title="Busy owned runners by hour (p90)", show_edge=False, pad_edge=False,
+        padding=(0, 0),
+    )
+    table.add_column("")
+    for hour in range(24):
+        table.add_column(f"{hour:02d}", justify="right")
+    for day in range(7):
+        row = []
+        for hour in range(24):
+            values = cells.get((day, hour))
+            if not values:
+                row.append("[dim] .[/]")
+                continue
+            v = _pct(values, 90)
+            style = "red" if v >= peak * 0.8 else "yellow" if v >= peak * 0.5 else "green"
+            row.append(f"[{style}]{v:>3.0f}[/]")
+        table.add_row(WEEKDAYS[day], *row)
+    console.print(table)